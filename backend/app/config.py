@@ -18,6 +18,10 @@ class Settings(BaseSettings):
     ollama_base_url: str = "http://localhost:11434"
 
     sample_docs_dir: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "sample_docs")
+    document_index_poll_seconds: int = 30  # Rescan interval of the sample documents index
+    # WebP thumbnails/page previews (memory backend caps; sample thumbnails are pre-generated)
+    preview_cache_max_entries: int = 10000
+    preview_cache_max_bytes: int = 256 * 1024 * 1024  # 256 MB
 
     admin_password: str = ""
 
@@ -27,12 +31,28 @@ class Settings(BaseSettings):
     jwt_secret: str = ""
     jwt_expiry_minutes: int = 1440  # 24 hours
 
+    # Shared state (battle documents, in-flight battles, generated secrets).
+    # "memory" is per process; use "sqlite" when running several workers/nodes.
+    state_backend: str = "memory"
+    state_sqlite_path: str = "./data/shared_state.db"
+    # Memory backend caps per namespace (e.g. in-flight battle documents); LRU eviction
+    state_memory_max_entries: int = 50
+    state_memory_max_bytes: int = 500 * 1024 * 1024  # 500 MB
+    # Keep uploads after their last battle finished, so finished battles can be re-streamed
+    # and re-viewed (default: the document TTL; 0 = delete right away)
+    upload_retention_seconds: int = 1800
+
     # Upload limits
     max_upload_size: int = 50 * 1024 * 1024  # 50 MB
+    upload_spool_threshold: int = 8 * 1024 * 1024  # Larger uploads go to an mmapped, unlinked temp file
+    upload_spool_dir: str = ""  # Temp dir for spilled uploads (system default if empty)
 
     # PDF processing
     max_pdf_pages: int = 50
     pdf_dpi: float = 216.0
+    # Downscale images to the most the provider makes use of (see image_profiles);
+    # off by default, since it changes what every existing model is sent
+    image_auto_resize: bool = False
 
     # ELO
     elo_k_factor: int = 20
@@ -43,18 +63,52 @@ class Settings(BaseSettings):
     # Streaming
     stream_timeout_seconds: int = 300
 
+    # Admission control (global across battles and playground runs)
+    max_inflight_jobs: int = 8
+    max_queued_jobs: int = 32
+    admission_retry_after_seconds: int = 5
+    pdf_page_concurrency: int = 8  # Concurrent page requests per PDF job
+    tile_concurrency: int = 4  # Concurrent tile requests per tiled image (see services/tiling.py)
+    hedge_min_samples: int = 20  # TTFT samples a model needs before requests are hedged
+
+    # Provider circuit breaker
+    circuit_error_threshold: float = 0.5  # EWMA error rate that opens the circuit
+    circuit_min_samples: int = 5  # Calls before the error rate is trusted
+    circuit_ewma_alpha: float = 0.2
+    circuit_open_seconds: int = 30  # Cool-down before a half-open probe
+    health_check_interval_seconds: int = 10
+    provider_test_deadline_seconds: float = 12.0  # Whole "Test All" sweep
+    model_catalog_ttl_seconds: int = 600  # Upstream model lists in the settings UI
+
     # Ollama timeouts
     ollama_connect_timeout: float = 10.0
     ollama_read_timeout: float = 120.0
 
+    # Record / replay of provider streams (deterministic performance runs)
+    record_ocr_streams: bool = False  # Record real provider output; contains OCR text of documents
+    ocr_recordings_dir: str = "./data/recordings"
+    replay_speed: float = 1.0  # 1.0 = original timing, 2.0 = twice as fast, 0 = no delay
+
+    # Mock provider (benchmarks / local testing); the "mock" type is unknown unless enabled
+    enable_mock_provider: bool = False
+    mock_ttft_ms: float = 200.0
+    mock_chunk_count: int = 100
+    mock_chunk_interval_ms: float = 10.0
+    mock_error_rate: float = 0.0
+    mock_native_pdf: bool = False  # Emulate a provider that accepts whole PDFs
+
     model_config = {"env_file": ".env", "extra": "ignore"}
 
     def get_jwt_secret(self) -> str:
         if self.jwt_secret:
             return self.jwt_secret
-        # Generate a random secret per process (tokens won't survive restart)
+        # Generate a random secret once and share it between workers through the
+        # state backend (with the memory backend tokens won't survive a restart)
         if not hasattr(self, "_runtime_jwt_secret"):
-            object.__setattr__(self, "_runtime_jwt_secret", secrets.token_hex(32))
+            from app.services.shared_state import get_shared_state
+
+            secret = get_shared_state().setdefault("secrets", "jwt", secrets.token_hex(32).encode())
+            object.__setattr__(self, "_runtime_jwt_secret", secret.decode())
         return self._runtime_jwt_secret
 
 
@@ -1,3 +1,4 @@
+import asyncio
 import sys
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
@@ -5,8 +6,13 @@ from fastapi.middleware.cors import CORSMiddleware
 from loguru import logger
 
 from app.config import get_settings
-from app.models.database import init_db
+from app.models.database import async_session, init_db
 from app.routers import battle, leaderboard, playground, documents, admin
+from app.services.document_index import get_document_index
+from app.services.ocr_service import preload_provider_classes
+from app.services.previews import run_sample_thumbnails
+from app.services.provider_health import close_http_client, get_health
+from app.services.shared_state import close_shared_state, get_shared_state, run_janitor
 
 # Configure loguru: remove default handler, add custom format
 logger.remove()
@@ -20,16 +26,33 @@ logger.add(
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    async with async_session() as db:
+        loaded = await preload_provider_classes(db)
+    logger.info(f"Loaded OCR providers: {', '.join(loaded) or 'none'}")
 
     settings = get_settings()
+    logger.info(f"Shared state backend: {get_shared_state().name}")
     if not settings.admin_password:
         logger.warning(
             "ADMIN_PASSWORD is not set — admin endpoints are unprotected. "
             "Set ADMIN_PASSWORD in .env for production use."
         )
 
+    background = [
+        asyncio.create_task(get_health().run_monitor()),
+        asyncio.create_task(run_janitor()),
+        asyncio.create_task(get_document_index().run_monitor()),
+        asyncio.create_task(run_sample_thumbnails()),
+    ]
+
     yield
 
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+    await close_http_client()
+    close_shared_state()
+
 
 settings = get_settings()
 
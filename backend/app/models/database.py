@@ -1,6 +1,6 @@
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
-from sqlalchemy import String, Integer, Float, Boolean, Text, JSON, ForeignKey, DateTime, Index
+from sqlalchemy import String, Integer, Float, Boolean, Text, JSON, ForeignKey, DateTime, Index, inspect, text
 from datetime import datetime, timezone
 import uuid
 
@@ -20,6 +20,11 @@ class ProviderSetting(Base):
     api_key: Mapped[str] = mapped_column(String, default="")
     base_url: Mapped[str] = mapped_column(String, default="")
     is_enabled: Mapped[bool] = mapped_column(Boolean, default=False)
+    rpm_limit: Mapped[int] = mapped_column(Integer, default=0)  # requests/minute, 0 = unlimited
+    tpm_limit: Mapped[int] = mapped_column(Integer, default=0)  # estimated tokens/minute, 0 = unlimited
+    max_retries: Mapped[int] = mapped_column(Integer, default=0)  # retries before the first token
+    retry_backoff_ms: Mapped[int] = mapped_column(Integer, default=500)
+    hedge_requests: Mapped[bool] = mapped_column(Boolean, default=False)
 
 
 class PromptSetting(Base):
@@ -57,7 +62,9 @@ class Battle(Base):
     __tablename__ = "battles"
 
     id: Mapped[str] = mapped_column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    document_path: Mapped[str] = mapped_column(String, nullable=False)
+    document_path: Mapped[str] = mapped_column(String, nullable=False)  # display name
+    document_hash: Mapped[str | None] = mapped_column(String, nullable=True)  # sha256 in the document store
+    region: Mapped[dict | None] = mapped_column(JSON, nullable=True)  # pages / crop OCR'd (services.regions)
     model_a_id: Mapped[str] = mapped_column(String, ForeignKey("ocr_models.id"))
     model_b_id: Mapped[str] = mapped_column(String, ForeignKey("ocr_models.id"))
     model_a_result: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -80,9 +87,36 @@ engine = create_async_engine(get_settings().database_url, echo=False)
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
+# Columns added after a table was first released. create_all() only creates
+# missing tables, so existing databases get these via ALTER TABLE at startup.
+_ADDED_COLUMNS: dict[str, dict[str, str]] = {
+    "provider_settings": {
+        "rpm_limit": "INTEGER DEFAULT 0",
+        "tpm_limit": "INTEGER DEFAULT 0",
+        "max_retries": "INTEGER DEFAULT 0",
+        "retry_backoff_ms": "INTEGER DEFAULT 500",
+        "hedge_requests": "BOOLEAN DEFAULT 0",
+    },
+    "battles": {
+        "document_hash": "VARCHAR",
+        "region": "JSON",
+    },
+}
+
+
+def _add_missing_columns(conn) -> None:
+    inspector = inspect(conn)
+    for table, columns in _ADDED_COLUMNS.items():
+        existing = {c["name"] for c in inspector.get_columns(table)}
+        for name, ddl in columns.items():
+            if name not in existing:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
+
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
 
 
 async def get_db():
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, field_serializer
+from pydantic import BaseModel, Field, field_serializer
 from datetime import datetime
 
 
@@ -83,6 +83,11 @@ class ProviderSettingOut(BaseModel):
     api_key: str
     base_url: str
     is_enabled: bool
+    rpm_limit: int = 0
+    tpm_limit: int = 0
+    max_retries: int = 0
+    retry_backoff_ms: int = 500
+    hedge_requests: bool = False
 
     model_config = {"from_attributes": True}
 
@@ -98,6 +103,11 @@ class ProviderSettingCreate(BaseModel):
     api_key: str = ""
     base_url: str = ""
     is_enabled: bool = True
+    rpm_limit: int = Field(default=0, ge=0)
+    tpm_limit: int = Field(default=0, ge=0)
+    max_retries: int = Field(default=0, ge=0, le=10)
+    retry_backoff_ms: int = Field(default=500, ge=0, le=60000)
+    hedge_requests: bool = False
 
 
 class ProviderSettingUpdate(BaseModel):
@@ -105,6 +115,11 @@ class ProviderSettingUpdate(BaseModel):
     api_key: str | None = None
     base_url: str | None = None
     is_enabled: bool | None = None
+    rpm_limit: int | None = Field(default=None, ge=0)
+    tpm_limit: int | None = Field(default=None, ge=0)
+    max_retries: int | None = Field(default=None, ge=0, le=10)
+    retry_backoff_ms: int | None = Field(default=None, ge=0, le=60000)
+    hedge_requests: bool | None = None
 
 
 class BattleStartResponse(BaseModel):
@@ -15,6 +15,14 @@ Rules:
 
 class OcrProvider(ABC):
     extra_config: dict = {}
+    # Sends PDFs whole (application/pdf in process_image) unless the model config sets
+    # "native_pdf": false. Hosted LLMs that accept PDFs leave this off and are opted in
+    # per model, since one request then has to fit every page in its output budget.
+    # Whole PDFs are capped at native_pdf_max_bytes (0 = no limit).
+    native_pdf_default: bool = False
+    native_pdf_max_bytes: int = 0
+    # Reads only PDFs (e.g. a text layer), so it is never drawn for image battles
+    pdf_only: bool = False
 
     @abstractmethod
     async def process_image(self, image_data: bytes, mime_type: str, prompt: str = "") -> OcrResult:
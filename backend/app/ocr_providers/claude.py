@@ -8,6 +8,8 @@ from app.utils.error_sanitizer import sanitize_error
 
 
 class ClaudeOcrProvider(OcrProvider):
+    native_pdf_max_bytes = 32 * 1024 * 1024
+
     def __init__(self, model_id: str = "claude-sonnet-4-20250514", api_key: str = "", base_url: str = "", extra_config: dict | None = None):
         kwargs = {}
         if api_key:
@@ -16,7 +18,7 @@ class ClaudeOcrProvider(OcrProvider):
             kwargs["base_url"] = base_url
         self.client = anthropic.AsyncAnthropic(**kwargs)
         self.model_id = model_id
-        self.extra_config = extra_config or {}
+        self.extra_config = {"max_tokens": 4096, **(extra_config or {})}
 
     def _build_messages(self, b64_image: str, mime_type: str) -> list:
         return [
@@ -24,7 +26,7 @@ class ClaudeOcrProvider(OcrProvider):
                 "role": "user",
                 "content": [
                     {
-                        "type": "image",
+                        "type": "document" if mime_type == "application/pdf" else "image",
                         "source": {
                             "type": "base64",
                             "media_type": mime_type,
@@ -44,8 +46,7 @@ class ClaudeOcrProvider(OcrProvider):
         start = time.time()
         try:
             b64_image = base64.b64encode(image_data).decode("utf-8")
-            api_kwargs = {"max_tokens": 4096}
-            api_kwargs.update(self.extra_config)
+            api_kwargs = dict(self.extra_config)
             response = await self.client.messages.create(
                 model=self.model_id,
                 system=system_prompt,
@@ -64,8 +65,7 @@ class ClaudeOcrProvider(OcrProvider):
     ) -> AsyncGenerator[str, None]:
         system_prompt = prompt or DEFAULT_OCR_PROMPT
         b64_image = base64.b64encode(image_data).decode("utf-8")
-        api_kwargs = {"max_tokens": 4096}
-        api_kwargs.update(self.extra_config)
+        api_kwargs = dict(self.extra_config)
         async with self.client.messages.stream(
             model=self.model_id,
             system=system_prompt,
@@ -5,6 +5,7 @@ from openai import AsyncOpenAI
 from app.ocr_providers.base import OcrProvider, DEFAULT_OCR_PROMPT
 from app.models.schemas import OcrResult
 from app.utils.error_sanitizer import sanitize_error
+from app.ocr_providers.openai_gpt import file_content_part
 
 
 class CustomOcrProvider(OcrProvider):
@@ -27,12 +28,7 @@ class CustomOcrProvider(OcrProvider):
             {
                 "role": "user",
                 "content": [
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:{mime_type};base64,{b64_image}",
-                        },
-                    },
+                    file_content_part(b64_image, mime_type),
                     {
                         "type": "text",
                         "text": "Convert this document to markdown.",
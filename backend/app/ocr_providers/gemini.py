@@ -8,6 +8,8 @@ from app.utils.error_sanitizer import sanitize_error
 
 
 class GeminiOcrProvider(OcrProvider):
+    native_pdf_max_bytes = 20 * 1024 * 1024  # inline request data limit
+
     def __init__(self, model_id: str = "gemini-2.0-flash", api_key: str = "", base_url: str = "", extra_config: dict | None = None):
         kwargs = {}
         if api_key:
@@ -18,7 +20,7 @@ class GeminiOcrProvider(OcrProvider):
 
     def _build_contents(self, image_data: bytes, mime_type: str) -> list:
         return [
-            types.Part.from_bytes(data=image_data, mime_type=mime_type),
+            types.Part.from_bytes(data=bytes(image_data), mime_type=mime_type),
             "Convert this document to markdown.",
         ]
 
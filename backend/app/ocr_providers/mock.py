@@ -0,0 +1,67 @@
+import asyncio
+import base64
+import random
+import time
+from collections.abc import AsyncGenerator
+
+from app.config import get_settings
+from app.models.schemas import OcrResult
+from app.ocr_providers.base import OcrProvider
+
+_WORDS = (
+    "invoice total amount date customer address table revenue quarter report "
+    "summary section figure page number account balance payment due reference"
+).split()
+
+
+class MockOcrProvider(OcrProvider):
+    """Local provider with synthetic latency, for benchmarks and testing.
+
+    Timing comes from the MOCK_* settings. The image is still base64-encoded
+    like a real request so payload costs show up in profiles. With
+    MOCK_NATIVE_PDF it accepts whole PDFs like Claude or Gemini do.
+    """
+
+    def __init__(self, model_id: str = "mock", api_key: str = "", base_url: str = "", extra_config: dict | None = None):
+        settings = get_settings()
+        self.model_id = model_id
+        self.extra_config = extra_config or {}
+        self.ttft = settings.mock_ttft_ms / 1000
+        self.chunk_count = settings.mock_chunk_count
+        self.chunk_interval = settings.mock_chunk_interval_ms / 1000
+        self.error_rate = settings.mock_error_rate
+        self.native_pdf_default = settings.mock_native_pdf
+
+    def _chunks(self, image_data: bytes) -> list[str]:
+        rng = random.Random(len(image_data))
+        chunks = [f"# {self.model_id} output\n\n"]
+        for i in range(1, self.chunk_count):
+            word = rng.choice(_WORDS)
+            chunks.append(f"{word}\n\n" if i % 12 == 0 else f"{word} ")
+        return chunks
+
+    def _maybe_fail(self) -> None:
+        if self.error_rate and random.random() < self.error_rate:
+            raise RuntimeError("Mock provider error (HTTP 503)")
+
+    async def process_image(self, image_data: bytes, mime_type: str, prompt: str = "") -> OcrResult:
+        start = time.time()
+        try:
+            base64.b64encode(image_data)
+            await asyncio.sleep(self.ttft + self.chunk_interval * self.chunk_count)
+            self._maybe_fail()
+            latency = int((time.time() - start) * 1000)
+            return OcrResult(text="".join(self._chunks(image_data)), latency_ms=latency)
+        except Exception as e:
+            latency = int((time.time() - start) * 1000)
+            return OcrResult(text="", latency_ms=latency, error=str(e))
+
+    async def process_image_stream(
+        self, image_data: bytes, mime_type: str, prompt: str = ""
+    ) -> AsyncGenerator[str, None]:
+        base64.b64encode(image_data)
+        await asyncio.sleep(self.ttft)
+        self._maybe_fail()
+        for chunk in self._chunks(image_data):
+            yield chunk
+            await asyncio.sleep(self.chunk_interval)
@@ -7,7 +7,19 @@ from app.models.schemas import OcrResult
 from app.utils.error_sanitizer import sanitize_error
 
 
+def file_content_part(b64_data: str, mime_type: str) -> dict:
+    """Content part for an image, or for a whole PDF (chat completions file input)."""
+    if mime_type == "application/pdf":
+        return {
+            "type": "file",
+            "file": {"filename": "document.pdf", "file_data": f"data:{mime_type};base64,{b64_data}"},
+        }
+    return {"type": "image_url", "image_url": {"url": f"data:{mime_type};base64,{b64_data}"}}
+
+
 class OpenAIOcrProvider(OcrProvider):
+    native_pdf_max_bytes = 32 * 1024 * 1024
+
     def __init__(self, model_id: str = "gpt-4o", api_key: str = "", base_url: str = "", extra_config: dict | None = None):
         kwargs = {}
         if api_key:
@@ -25,12 +37,7 @@ class OpenAIOcrProvider(OcrProvider):
             {
                 "role": "user",
                 "content": [
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:{mime_type};base64,{b64_image}",
-                        },
-                    },
+                    file_content_part(b64_image, mime_type),
                     {
                         "type": "text",
                         "text": "Convert this document to markdown.",
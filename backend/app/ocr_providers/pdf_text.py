@@ -0,0 +1,180 @@
+"""Markdown from a PDF's embedded text layer, with no model and no network call.
+
+Born-digital PDFs already carry their text. This provider reads it with
+pypdfium2 and rebuilds basic structure from font metrics:
+- lines set well above the body font size become headings,
+- short all-bold lines become sub-headings,
+- bullet glyphs become list items,
+- soft-wrapped lines are joined into paragraphs, split at vertical gaps.
+
+It takes whole PDFs (``native_pdf_default``), so it runs in milliseconds
+as a baseline contestant or playground fast path. Scanned PDFs and images
+have no text layer and return an error.
+"""
+import asyncio
+import ctypes
+import re
+import statistics
+import time
+from collections.abc import AsyncGenerator
+
+import pypdfium2 as pdfium
+import pypdfium2.raw as pdfium_c
+
+from app.models.schemas import OcrResult
+from app.ocr_providers.base import OcrProvider
+from app.utils.spool import BufferReader
+
+_H1_RATIO = 1.6  # font size relative to the body text
+_H2_RATIO = 1.2
+_BOLD_WEIGHT = 600
+_PARAGRAPH_GAP = 1.3  # baseline distance, in usual line pitches, that starts a new paragraph
+_BULLET = re.compile(r"^[•●▪◦‣∙·\-–*]\s+")
+_NO_TEXT = "PDF has no text layer (scanned document?)"
+_NUMBERED = re.compile(r"^\(?\d{1,3}[.)]\s+")
+
+
+def _page_lines(
+    textpage: pdfium.PdfTextPage, cropbox: tuple[float, float, float, float],
+) -> list[tuple[str, float, bool, float]]:
+    """(text, font size, bold, baseline y) per text line of a page, for lines starting inside ``cropbox``."""
+    left, bottom, right, top = cropbox
+    text = textpage.get_text_range()
+    x, y = ctypes.c_double(), ctypes.c_double()
+    lines = []
+    index = 0
+    for raw_line in text.split("\r\n"):
+        stripped = raw_line.strip()
+        first = index + (len(raw_line) - len(raw_line.lstrip()))
+        index += len(raw_line) + 2
+        if not stripped:
+            continue
+        pdfium_c.FPDFText_GetCharOrigin(textpage.raw, first, x, y)
+        # Text outside the crop box (region-of-interest OCR) is not part of the page
+        if left <= x.value <= right and bottom <= y.value <= top:
+            size = pdfium_c.FPDFText_GetFontSize(textpage.raw, first)
+            bold = pdfium_c.FPDFText_GetFontWeight(textpage.raw, first) >= _BOLD_WEIGHT
+            # pdfium rejoins words hyphenated at a line break, leaving U+FFFE in the middle
+            lines.append((stripped.replace("\ufffe", ""), size, bold, y.value))
+    return lines
+
+
+def _join(paragraph: str, line: str) -> str:
+    if not paragraph:
+        return line
+    if paragraph.endswith("-") and line[:1].islower():
+        return paragraph[:-1] + line  # de-hyphenate
+    return f"{paragraph} {line}"
+
+
+def page_markdown(page: pdfium.PdfPage) -> str:
+    """Convert one page's text layer to markdown."""
+    textpage = page.get_textpage()
+    try:
+        lines = _page_lines(textpage, page.get_cropbox())
+    finally:
+        textpage.close()
+    if not lines:
+        return ""
+
+    # Body size: the font size covering most characters
+    body = statistics.median(size for text, size, *_ in lines for _ in range(len(text))) or 1.0
+    # Usual distance between consecutive baselines of body text
+    pitches = [
+        previous[3] - line[3] for previous, line in zip(lines, lines[1:])
+        if abs(line[1] - body) < 0.5 and 0 < previous[3] - line[3] < body * 3
+    ]
+    pitch = statistics.median(pitches) if pitches else body * 1.2
+
+    blocks: list[str] = []
+    paragraph = ""
+    previous_baseline: float | None = None
+
+    def flush():
+        nonlocal paragraph
+        if paragraph:
+            blocks.append(paragraph)
+            paragraph = ""
+
+    for text, size, bold, baseline in lines:
+        gap = (previous_baseline - baseline) if previous_baseline is not None else 0.0
+        previous_baseline = baseline
+
+        if size >= body * _H2_RATIO and len(text) < 120:
+            flush()
+            blocks.append(("# " if size >= body * _H1_RATIO else "## ") + text)
+        elif bold and len(text) < 80 and not text.endswith((".", ",", ";")):
+            flush()
+            blocks.append(f"### {text}")
+        elif _BULLET.match(text):
+            flush()
+            paragraph = _BULLET.sub("- ", text)
+        elif _NUMBERED.match(text):
+            flush()
+            paragraph = text
+        else:
+            if not 0 <= gap <= pitch * _PARAGRAPH_GAP:
+                flush()  # a blank line's worth of space, or a jump to another column
+            paragraph = _join(paragraph, text)
+    flush()
+    return "\n\n".join(blocks)
+
+
+def _page_separator(index: int) -> str:
+    return f"\n\n---\n\n<!-- Page {index + 1} -->\n\n" if index > 0 else ""
+
+
+class PdfTextOcrProvider(OcrProvider):
+    """Local baseline: the PDF text layer as markdown (``model_id`` is ignored)."""
+
+    native_pdf_default = True
+    pdf_only = True
+
+    def __init__(
+        self, model_id: str = "pdf-text", api_key: str = "", base_url: str = "", extra_config: dict | None = None,
+    ):
+        self.model_id = model_id
+        self.extra_config = extra_config or {}
+
+    @staticmethod
+    def _open(image_data: bytes, mime_type: str) -> pdfium.PdfDocument:
+        if mime_type != "application/pdf":
+            raise ValueError("The PDF text layer provider only reads PDF documents")
+        return pdfium.PdfDocument(image_data if isinstance(image_data, bytes) else BufferReader(image_data))
+
+    @staticmethod
+    def _convert(pdf: pdfium.PdfDocument) -> str:
+        pages = [page_markdown(pdf[i]) for i in range(len(pdf))]
+        if not any(pages):
+            raise ValueError(_NO_TEXT)
+        return "".join(_page_separator(i) + markdown for i, markdown in enumerate(pages))
+
+    async def process_image(self, image_data: bytes, mime_type: str, prompt: str = "") -> OcrResult:
+        start = time.time()
+        try:
+            def run() -> str:
+                pdf = self._open(image_data, mime_type)
+                try:
+                    return self._convert(pdf)
+                finally:
+                    pdf.close()
+
+            text = await asyncio.to_thread(run)
+            return OcrResult(text=text, latency_ms=int((time.time() - start) * 1000))
+        except Exception as e:
+            return OcrResult(text="", latency_ms=int((time.time() - start) * 1000), error=str(e))
+
+    async def process_image_stream(
+        self, image_data: bytes, mime_type: str, prompt: str = ""
+    ) -> AsyncGenerator[str, None]:
+        pdf = await asyncio.to_thread(self._open, image_data, mime_type)
+        try:
+            found_text = False
+            for i in range(len(pdf)):
+                markdown = await asyncio.to_thread(lambda i=i: page_markdown(pdf[i]))
+                found_text = found_text or bool(markdown)
+                yield _page_separator(i) + markdown
+            if not found_text:
+                raise ValueError(_NO_TEXT)
+        finally:
+            pdf.close()
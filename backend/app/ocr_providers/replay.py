@@ -0,0 +1,183 @@
+"""Record real provider streams to disk and replay them with original timing.
+
+Recordings are keyed by (model_id, sha256 of the image bytes) and stored as
+gzip-compressed JSON Lines, one file per pair:
+
+    {"v": 1, "model": "gpt-4o", "document": "<sha256>", "mime": "image/png"}
+    [0.0, "# Title"]          <- [offset_ms since request start, chunk]
+    [12.5, "\\n\\nBody"]
+    {"end_ms": 830.1}         <- or {"end_ms": ..., "error": "..."}
+
+PDF pages are rendered deterministically, so each page image hashes to the
+same key on every run and multi-page battles replay page by page.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+from collections.abc import AsyncGenerator
+
+from loguru import logger
+
+from app.config import get_settings
+from app.models.schemas import OcrResult
+from app.ocr_providers.base import OcrProvider
+from app.utils.error_sanitizer import sanitize_error
+
+FORMAT_VERSION = 1
+
+
+def recording_path(record_dir: str, model_id: str, document_key: str) -> str:
+    """Return the on-disk path for a (model, document) recording."""
+    safe_model = re.sub(r"[^\w.-]", "_", model_id) or "_"
+    return os.path.join(record_dir, safe_model, f"{document_key}.jsonl.gz")
+
+
+def replay_dir(recording_set: str = "") -> str:
+    """The recordings root, or a named set of recordings inside it.
+
+    ``recording_set`` comes from the admin-editable provider ``base_url``, so it
+    is resolved and rejected when it points outside ``ocr_recordings_dir``.
+    """
+    root = os.path.realpath(get_settings().ocr_recordings_dir)
+    if not recording_set:
+        return root
+    path = os.path.realpath(os.path.join(root, recording_set))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError("Replay recording set must be a directory inside OCR_RECORDINGS_DIR")
+    return path
+
+
+def _write_recording(path: str, header: dict, chunks: list[tuple[float, str]], footer: dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps(header, ensure_ascii=False) + "\n")
+        for offset_ms, text in chunks:
+            f.write(json.dumps([round(offset_ms, 1), text], ensure_ascii=False) + "\n")
+        f.write(json.dumps(footer) + "\n")
+    os.replace(tmp_path, path)
+
+
+def load_recording(path: str) -> tuple[dict, list[tuple[float, str]], dict]:
+    """Read a recording file. Returns (header, chunks, footer)."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    if not lines or lines[0].get("v") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported recording format: {path}")
+    header = lines[0]
+    footer = lines[-1] if len(lines) > 1 and isinstance(lines[-1], dict) else {}
+    chunks = [(float(line[0]), line[1]) for line in lines[1:] if isinstance(line, list)]
+    return header, chunks, footer
+
+
+class RecordingOcrProvider(OcrProvider):
+    """Wraps a real provider and records every response with per-chunk timestamps."""
+
+    def __init__(self, inner: OcrProvider, model_id: str, record_dir: str):
+        self.inner = inner
+        self.model_id = model_id
+        self.record_dir = record_dir
+        self.extra_config = inner.extra_config
+        self.native_pdf_default = inner.native_pdf_default
+        self.native_pdf_max_bytes = inner.native_pdf_max_bytes
+
+    async def _save(self, image_data: bytes, mime_type: str, chunks: list[tuple[float, str]], footer: dict) -> None:
+        document_key = hashlib.sha256(image_data).hexdigest()
+        path = recording_path(self.record_dir, self.model_id, document_key)
+        header = {
+            "v": FORMAT_VERSION,
+            "model": self.model_id,
+            "document": document_key,
+            "mime": mime_type,
+            "recorded_at": time.time(),
+        }
+        try:
+            await asyncio.to_thread(_write_recording, path, header, chunks, footer)
+        except OSError as e:
+            logger.warning(f"Failed to write OCR recording {path}: {e}")
+
+    async def process_image(self, image_data: bytes, mime_type: str, prompt: str = "") -> OcrResult:
+        result = await self.inner.process_image(image_data, mime_type, prompt)
+        footer = {"end_ms": float(result.latency_ms)}
+        if result.error:
+            footer["error"] = result.error
+            chunks = []
+        else:
+            chunks = [(float(result.latency_ms), result.text)]
+        await self._save(image_data, mime_type, chunks, footer)
+        return result
+
+    async def process_image_stream(
+        self, image_data: bytes, mime_type: str, prompt: str = ""
+    ) -> AsyncGenerator[str, None]:
+        start = time.perf_counter()
+        chunks: list[tuple[float, str]] = []
+        try:
+            async for chunk in self.inner.process_image_stream(image_data, mime_type, prompt):
+                chunks.append(((time.perf_counter() - start) * 1000, chunk))
+                yield chunk
+        except Exception as e:
+            footer = {"end_ms": (time.perf_counter() - start) * 1000, "error": sanitize_error(e)}
+            await self._save(image_data, mime_type, chunks, footer)
+            raise
+        await self._save(image_data, mime_type, chunks, {"end_ms": (time.perf_counter() - start) * 1000})
+
+
+class ReplayOcrProvider(OcrProvider):
+    """Replays recorded streams without any network access.
+
+    ``model_id`` selects which model's recordings to replay and ``base_url``
+    optionally names a recording set (a subdirectory of ``ocr_recordings_dir``;
+    paths outside it are rejected). Timing is scaled by
+    ``replay_speed`` (1.0 = original cadence, 2.0 = twice as fast, 0 = no delay).
+    """
+
+    def __init__(self, model_id: str, api_key: str = "", base_url: str = "", extra_config: dict | None = None):
+        settings = get_settings()
+        self.model_id = model_id
+        self.record_dir = replay_dir(base_url)
+        self.speed = settings.replay_speed
+        self.extra_config = extra_config or {}
+
+    async def _load(self, image_data: bytes) -> tuple[list[tuple[float, str]], dict]:
+        path = recording_path(self.record_dir, self.model_id, hashlib.sha256(image_data).hexdigest())
+        if not os.path.exists(path):
+            raise RuntimeError(f"No recording for model '{self.model_id}' and this document")
+        _, chunks, footer = await asyncio.to_thread(load_recording, path)
+        return chunks, footer
+
+    async def _sleep_until(self, start: float, offset_ms: float) -> None:
+        if self.speed <= 0:
+            return
+        delay = start + offset_ms / 1000 / self.speed - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def process_image(self, image_data: bytes, mime_type: str, prompt: str = "") -> OcrResult:
+        start = time.perf_counter()
+        try:
+            chunks, footer = await self._load(image_data)
+            await self._sleep_until(start, footer.get("end_ms", chunks[-1][0] if chunks else 0.0))
+            latency = int((time.perf_counter() - start) * 1000)
+            if footer.get("error"):
+                return OcrResult(text="", latency_ms=latency, error=footer["error"])
+            return OcrResult(text="".join(text for _, text in chunks), latency_ms=latency)
+        except Exception as e:
+            latency = int((time.perf_counter() - start) * 1000)
+            return OcrResult(text="", latency_ms=latency, error=sanitize_error(e))
+
+    async def process_image_stream(
+        self, image_data: bytes, mime_type: str, prompt: str = ""
+    ) -> AsyncGenerator[str, None]:
+        start = time.perf_counter()
+        chunks, footer = await self._load(image_data)
+        for offset_ms, text in chunks:
+            await self._sleep_until(start, offset_ms)
+            yield text
+        if footer.get("error"):
+            await self._sleep_until(start, footer.get("end_ms", 0.0))
+            raise RuntimeError(footer["error"])
@@ -1,13 +1,14 @@
+import asyncio
 import hmac
-import ipaddress
+import json
 import uuid
-from urllib.parse import urlparse
-import httpx
-from fastapi import APIRouter, HTTPException, Depends
+from collections.abc import AsyncGenerator
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.database import get_db, OcrModel, ProviderSetting, PromptSetting, Battle
+from app.models.database import get_db, async_session, OcrModel, ProviderSetting, PromptSetting, Battle
 from app.models.schemas import (
     OcrModelAdmin,
     OcrModelCreate,
@@ -23,7 +24,15 @@ from app.models.schemas import (
 from app.config import get_settings
 from app.auth import require_admin, create_token
 from app.vlm_registry import list_registry, match_registry
-from app.utils.error_sanitizer import sanitize_error
+from app.services.admission import get_admission
+from app.services.model_catalog import get_model_catalog, invalidate_model_catalog
+from app.services.provider_health import KEY_BASED_TYPES, URL_BASED_TYPES, check_provider, check_providers, get_health
+from app.services.image_profiles import estimate_image, parse_image_profile
+from app.services.ocr_service import resolve_image_profile
+from app.services.preprocessing import parse_preprocess_options, preprocessing_stats
+from app.services.rate_limiter import get_rate_limiter, rate_limit_usage
+from app.services.shared_state import get_shared_state
+from app.services.tiling import parse_tiling_options
 
 # Public router: no auth required
 public_router = APIRouter(prefix="/api/admin", tags=["admin"])
@@ -54,15 +63,11 @@ BUILTIN_PROVIDERS = [
     {"id": "gemini", "display_name": "Google Gemini", "provider_type": "gemini"},
     {"id": "mistral", "display_name": "Mistral AI", "provider_type": "mistral"},
     {"id": "ollama", "display_name": "Ollama (Local)", "provider_type": "ollama"},
+    {"id": "pdf_text", "display_name": "PDF Text Layer (Local)", "provider_type": "pdf_text"},
 ]
 
 BUILTIN_IDS = {p["id"] for p in BUILTIN_PROVIDERS}
 
-# Provider types that require base_url connectivity
-URL_BASED_TYPES = {"ollama", "custom"}
-# Provider types that require api_key
-KEY_BASED_TYPES = {"claude", "openai", "gemini", "mistral"}
-
 
 # ── Provider Settings ──────────────────────────────────────────
 
@@ -107,6 +112,11 @@ async def create_provider(data: ProviderSettingCreate, db: AsyncSession = Depend
         api_key=data.api_key,
         base_url=data.base_url,
         is_enabled=data.is_enabled,
+        rpm_limit=data.rpm_limit,
+        tpm_limit=data.tpm_limit,
+        max_retries=data.max_retries,
+        retry_backoff_ms=data.retry_backoff_ms,
+        hedge_requests=data.hedge_requests,
     )
     db.add(provider)
     await db.commit()
@@ -133,16 +143,35 @@ async def update_provider(
     # Skip masked api_key (frontend sends back masked value if unchanged)
     if "api_key" in updates and "***" in updates["api_key"]:
         del updates["api_key"]
-    _PROVIDER_ALLOWED_FIELDS = {"display_name", "api_key", "base_url", "is_enabled"}
+    _PROVIDER_ALLOWED_FIELDS = {
+        "display_name", "api_key", "base_url", "is_enabled",
+        "rpm_limit", "tpm_limit", "max_retries", "retry_backoff_ms", "hedge_requests",
+    }
     for field, value in updates.items():
         if field in _PROVIDER_ALLOWED_FIELDS:
             setattr(provider, field, value)
 
     await db.commit()
     await db.refresh(provider)
+    if "api_key" in updates or "base_url" in updates:
+        invalidate_model_catalog(provider.id)
+    if "rpm_limit" in updates or "tpm_limit" in updates:
+        get_rate_limiter(provider.id, provider.rpm_limit, provider.tpm_limit)
     return ProviderSettingOut.model_validate(provider)
 
 
+@router.get("/providers/usage")
+async def get_provider_usage():
+    """Current rate-limit budget use per provider (last 60 seconds)."""
+    return rate_limit_usage()
+
+
+@router.get("/providers/health")
+async def get_provider_health():
+    """Circuit-breaker state, EWMA error rate and latency per provider."""
+    return get_health().stats()
+
+
 @router.delete("/providers/{provider_id}")
 async def delete_provider(provider_id: str, db: AsyncSession = Depends(get_db)):
     if provider_id in BUILTIN_IDS:
@@ -164,6 +193,7 @@ async def delete_provider(provider_id: str, db: AsyncSession = Depends(get_db)):
 
     await db.delete(provider)
     await db.commit()
+    invalidate_model_catalog(provider_id)
     return {"ok": True}
 
 
@@ -175,25 +205,8 @@ async def test_provider(provider_id: str, db: AsyncSession = Depends(get_db)):
     if not provider:
         raise HTTPException(status_code=404, detail="Provider not found")
 
-    ptype = provider.provider_type or provider_id
-    ok = False
-    message = ""
-
-    if ptype in URL_BASED_TYPES:
-        base_url = (provider.base_url or "").strip()
-        if not base_url:
-            message = "Base URL is not configured"
-        else:
-            ok, message = await _test_url(base_url, ptype, (provider.api_key or "").strip())
-    elif ptype in KEY_BASED_TYPES:
-        api_key = (provider.api_key or "").strip()
-        if not api_key:
-            message = "API key is not configured"
-        else:
-            ok, message = await _test_api_key(ptype, api_key)
-    else:
-        ok = True
-        message = "No connectivity check required"
+    ok, message = await check_provider(provider)
+    get_health().record_check(provider_id, ok, message)
 
     # Auto-deactivate/activate models based on result
     disabled_models = []
@@ -213,229 +226,73 @@ async def test_provider(provider_id: str, db: AsyncSession = Depends(get_db)):
     }
 
 
-@router.post("/providers/test-all")
-async def test_all_providers(db: AsyncSession = Depends(get_db)):
-    """Test all enabled providers and auto-deactivate models on failure."""
+async def _sweep_providers(db: AsyncSession) -> AsyncGenerator[dict, None]:
+    """Test all providers concurrently, yielding one result per provider as it finishes.
+
+    Models of failing providers are deactivated as each result arrives.
+    """
     result = await db.execute(select(ProviderSetting))
     providers = list(result.scalars().all())
+    deadline = get_settings().provider_test_deadline_seconds
 
-    results = []
-    total_disabled = []
-
-    for provider in providers:
-        ptype = provider.provider_type or provider.id
-        ok = False
-        message = ""
-
-        if ptype in URL_BASED_TYPES:
-            base_url = (provider.base_url or "").strip()
-            if not base_url:
-                message = "Base URL is not configured"
-            else:
-                ok, message = await _test_url(base_url, ptype, (provider.api_key or "").strip())
-        elif ptype in KEY_BASED_TYPES:
-            api_key = (provider.api_key or "").strip()
-            if not api_key:
-                message = "API key is not configured"
-            else:
-                ok, message = await _test_api_key(ptype, api_key)
-        else:
-            ok = True
-            message = "OK"
+    async for provider, ok, message in check_providers(providers, deadline):
+        get_health().record_check(provider.id, ok, message)
 
         # Auto-deactivate models on failure
         disabled = []
-        models_result = await db.execute(select(OcrModel).where(OcrModel.provider == provider.id))
-        models = list(models_result.scalars().all())
-        if not ok and models:
-            for m in models:
-                if m.is_active:
-                    m.is_active = False
-                    disabled.append(m.display_name)
-                    total_disabled.append(m.display_name)
-
-        results.append({
+        if not ok:
+            models_result = await db.execute(
+                select(OcrModel).where(OcrModel.provider == provider.id, OcrModel.is_active.is_(True))
+            )
+            for m in models_result.scalars().all():
+                m.is_active = False
+                disabled.append(m.display_name)
+            if disabled:
+                await db.commit()
+
+        yield {
             "provider_id": provider.id,
             "display_name": provider.display_name,
             "ok": ok,
             "message": message,
             "disabled_models": disabled,
-        })
+        }
 
-    await db.commit()
-    return {"results": results, "total_disabled": total_disabled}
 
+@router.post("/providers/test-all")
+async def test_all_providers(db: AsyncSession = Depends(get_db)):
+    """Test all providers concurrently and auto-deactivate models on failure."""
+    results = [r async for r in _sweep_providers(db)]
+    total_disabled = [name for r in results for name in r["disabled_models"]]
+    return {"results": results, "total_disabled": total_disabled}
 
-async def _test_api_key(ptype: str, api_key: str) -> tuple[bool, str]:
-    """Test API key by making a real API call (list models)."""
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            if ptype == "openai":
-                resp = await client.get(
-                    "https://api.openai.com/v1/models",
-                    headers={"Authorization": f"Bearer {api_key}"},
-                )
-            elif ptype == "claude":
-                resp = await client.get(
-                    "https://api.anthropic.com/v1/models",
-                    headers={
-                        "x-api-key": api_key,
-                        "anthropic-version": "2023-06-01",
-                    },
-                )
-            elif ptype == "gemini":
-                resp = await client.get(
-                    f"https://generativelanguage.googleapis.com/v1beta/models?key={api_key}&pageSize=1",
-                )
-            elif ptype == "mistral":
-                resp = await client.get(
-                    "https://api.mistral.ai/v1/models",
-                    headers={"Authorization": f"Bearer {api_key}"},
-                )
-            else:
-                return True, "API key is set (no test available)"
-
-            if resp.status_code == 200:
-                return True, f"Connected (HTTP {resp.status_code})"
-            elif resp.status_code == 401:
-                return False, "Invalid API key (HTTP 401)"
-            elif resp.status_code == 403:
-                return False, "Access denied (HTTP 403)"
-            else:
-                return False, f"API error (HTTP {resp.status_code})"
-    except httpx.TimeoutException:
-        return False, "Connection timed out"
-    except Exception as e:
-        return False, f"Connection failed: {sanitize_error(e)}"
 
+@router.post("/providers/test-all/stream")
+async def test_all_providers_stream():
+    """Like test-all, but streams one NDJSON line per provider as soon as its check finishes.
 
-def _is_private_url(url: str) -> bool:
-    """Check if a URL resolves to a private/loopback IP address."""
-    import socket
+    The last line is ``{"done": true, "total_disabled": [...]}``.
+    """
+    async def lines():
+        # Own session: request-scoped dependencies are closed before the body streams
+        async with async_session() as db:
+            total_disabled = []
+            async for r in _sweep_providers(db):
+                total_disabled.extend(r["disabled_models"])
+                yield json.dumps(r) + "\n"
+            yield json.dumps({"done": True, "total_disabled": total_disabled}) + "\n"
 
-    try:
-        parsed = urlparse(url)
-        hostname = parsed.hostname
-        if not hostname:
-            return True
-        try:
-            addr = ipaddress.ip_address(hostname)
-            return addr.is_private or addr.is_loopback or addr.is_link_local
-        except ValueError:
-            # hostname is a domain name — resolve via DNS and check
-            try:
-                resolved = socket.getaddrinfo(hostname, None)
-                for _, _, _, _, sockaddr in resolved:
-                    ip = ipaddress.ip_address(sockaddr[0])
-                    if ip.is_private or ip.is_loopback or ip.is_link_local:
-                        return True
-                return False
-            except socket.gaierror:
-                return True  # DNS resolution failed — block
-    except Exception:
-        return True
-
-
-async def _test_url(base_url: str, ptype: str, api_key: str = "") -> tuple[bool, str]:
-    """Test connectivity to a base URL."""
-    if ptype != "ollama" and _is_private_url(base_url):
-        return False, "Private/internal URLs are not allowed for non-Ollama providers"
-    try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            if ptype == "ollama":
-                resp = await client.get(base_url)
-            else:
-                # Custom OpenAI-compatible: try /models with auth
-                url = base_url.rstrip("/")
-                headers = {}
-                if api_key:
-                    headers["Authorization"] = f"Bearer {api_key}"
-                resp = await client.get(f"{url}/models", headers=headers)
-        if resp.status_code < 500:
-            return True, f"Connected (HTTP {resp.status_code})"
-        return False, f"Server error (HTTP {resp.status_code})"
-    except httpx.ConnectError:
-        return False, "Connection refused - server not reachable"
-    except httpx.TimeoutException:
-        return False, "Connection timed out"
-    except Exception as e:
-        return False, f"Connection failed: {sanitize_error(e)}"
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 
 @router.get("/providers/{provider_id}/models")
-async def list_provider_models(provider_id: str, db: AsyncSession = Depends(get_db)):
-    """Fetch available models from a provider's API."""
+async def list_provider_models(provider_id: str, refresh: bool = False, db: AsyncSession = Depends(get_db)):
+    """Available models from a provider's API (cached; ``refresh=true`` revalidates now)."""
     result = await db.execute(select(ProviderSetting).where(ProviderSetting.id == provider_id))
     provider = result.scalar_one_or_none()
     if not provider:
         raise HTTPException(status_code=404, detail="Provider not found")
-
-    ptype = provider.provider_type or provider_id
-    api_key = (provider.api_key or "").strip()
-    base_url = (provider.base_url or "").strip()
-    models = []
-
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            if ptype == "openai":
-                resp = await client.get(
-                    "https://api.openai.com/v1/models",
-                    headers={"Authorization": f"Bearer {api_key}"},
-                )
-                if resp.status_code == 200:
-                    data = resp.json()
-                    models = sorted(
-                        [m["id"] for m in data.get("data", []) if "gpt" in m["id"].lower()],
-                    )
-            elif ptype == "gemini":
-                resp = await client.get(
-                    f"https://generativelanguage.googleapis.com/v1beta/models?key={api_key}",
-                )
-                if resp.status_code == 200:
-                    data = resp.json()
-                    models = sorted(
-                        [m["name"].replace("models/", "") for m in data.get("models", [])
-                         if "gemini" in m.get("name", "").lower()],
-                    )
-            elif ptype == "mistral":
-                resp = await client.get(
-                    "https://api.mistral.ai/v1/models",
-                    headers={"Authorization": f"Bearer {api_key}"},
-                )
-                if resp.status_code == 200:
-                    data = resp.json()
-                    models = sorted([m["id"] for m in data.get("data", [])])
-            elif ptype == "claude":
-                resp = await client.get(
-                    "https://api.anthropic.com/v1/models",
-                    headers={
-                        "x-api-key": api_key,
-                        "anthropic-version": "2023-06-01",
-                    },
-                )
-                if resp.status_code == 200:
-                    data = resp.json()
-                    models = sorted([m["id"] for m in data.get("data", [])])
-            elif ptype == "ollama":
-                url = (base_url or "http://localhost:11434").rstrip("/")
-                resp = await client.get(f"{url}/api/tags")
-                if resp.status_code == 200:
-                    data = resp.json()
-                    models = sorted([m["name"] for m in data.get("models", [])])
-            elif ptype == "custom":
-                url = (base_url or "").rstrip("/")
-                if url:
-                    headers = {}
-                    if api_key:
-                        headers["Authorization"] = f"Bearer {api_key}"
-                    resp = await client.get(f"{url}/models", headers=headers)
-                    if resp.status_code == 200:
-                        data = resp.json()
-                        models = sorted([m["id"] for m in data.get("data", [])])
-    except Exception as e:
-        return {"models": models, "error": sanitize_error(e)}
-
-    return {"models": models}
+    return await get_model_catalog(provider, refresh=refresh)
 
 
 # ── Model Management ──────────────────────────────────────────
@@ -468,8 +325,18 @@ async def list_all_models(db: AsyncSession = Depends(get_db)):
     return items
 
 
+def _check_model_config(config: dict | None) -> None:
+    try:
+        parse_preprocess_options((config or {}).get("preprocess"))
+        parse_image_profile((config or {}).get("image_profile"))
+        parse_tiling_options((config or {}).get("tiling"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.post("/models", response_model=OcrModelAdmin)
 async def create_model(data: OcrModelCreate, db: AsyncSession = Depends(get_db)):
+    _check_model_config(data.config)
     existing = await db.execute(select(OcrModel).where(OcrModel.name == data.name))
     if existing.scalar_one_or_none():
         raise HTTPException(status_code=409, detail=f"Model '{data.name}' already exists")
@@ -503,6 +370,7 @@ async def update_model(
     if not model:
         raise HTTPException(status_code=404, detail="Model not found")
 
+    _check_model_config(data.config)
     updates = data.model_dump(exclude_none=True)
     # Skip masked api_key (frontend sends back masked value if unchanged)
     if "api_key" in updates and "***" in updates["api_key"]:
@@ -517,6 +385,28 @@ async def update_model(
     return OcrModelAdmin.model_validate(model)
 
 
+@router.get("/models/{model_id}/image-estimate")
+async def estimate_model_image(
+    model_id: str,
+    width: int = Query(..., ge=1),
+    height: int = Query(..., ge=1),
+    usd_per_mtok: float | None = Query(None, ge=0, description="Input price, for a cost estimate"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Input tokens (and cost) of a width x height image for this model, after auto-resize."""
+    result = await db.execute(select(OcrModel).where(OcrModel.id == model_id))
+    model = result.scalar_one_or_none()
+    if not model:
+        raise HTTPException(status_code=404, detail="Model not found")
+    try:
+        profile = await resolve_image_profile(db, model)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if profile is None:
+        raise HTTPException(status_code=404, detail="No image profile known for this model")
+    return estimate_image(profile, width, height, usd_per_mtok)
+
+
 @router.patch("/models/{model_id}/toggle", response_model=OcrModelAdmin)
 async def toggle_model(model_id: str, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(OcrModel).where(OcrModel.id == model_id))
@@ -678,6 +568,26 @@ async def reset_all(db: AsyncSession = Depends(get_db)):
     return {"ok": True, "message": "Factory reset complete"}
 
 
+# ── Load ──────────────────────────────────────────
+
+@router.get("/admission")
+async def get_admission_stats():
+    """Current in-flight jobs and admission queue depth."""
+    return get_admission().stats()
+
+
+@router.get("/state")
+async def get_state_stats():
+    """Shared state backend usage: entries/bytes per namespace, cache hits and evictions."""
+    return await asyncio.to_thread(get_shared_state().stats)
+
+
+@router.get("/preprocessing")
+async def get_preprocessing_stats():
+    """Bytes before/after per-model image preprocessing, keyed by model id."""
+    return preprocessing_stats()
+
+
 # ── VLM Registry ──────────────────────────────────────────
 
 @router.get("/registry")
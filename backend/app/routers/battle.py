@@ -3,67 +3,127 @@ import json
 import os
 import time as _time_module
 import uuid
-from datetime import datetime, timezone
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query
-from sqlalchemy import select, update
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Request
+from fastapi.responses import Response
+from sqlalchemy import func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sse_starlette.sse import EventSourceResponse
+from starlette.background import BackgroundTask
 
 from app.models.database import get_db, async_session, OcrModel, Battle
 from app.models.schemas import BattleStartResponse, VoteRequest, VoteResponse, OcrModelOut
-from app.services.ocr_service import select_random_models, run_ocr, run_ocr_stream, get_postprocessor_name
+from app.services.ocr_service import (
+    NoHealthyModelsError, select_random_models, run_ocr, run_ocr_stream, get_postprocessor_name,
+)
 from app.services.postprocessors import apply_postprocessor
 from app.services.elo_service import calculate_elo_change
+from app.services.admission import get_admission, AdmissionRejected, AdmissionTicket
+from app.services.document_index import get_document_index
+from app.services.document_store import (
+    DOCUMENT_TTL, get_document, is_valid_document, load_sample, release_upload, store_document,
+)
+from app.services.previews import (
+    DocumentChanged, PageNotFound, get_preview, preview_etag, read_sample, schedule_previews,
+)
+from app.services.regions import Region, check_region, extract_region, parse_region
+from app.services.shared_state import get_shared_state
 from app.config import get_settings
 from app.utils.mime import extension_to_mime, ALLOWED_EXTENSIONS
-from app.utils.file_validation import validate_file_content
 from app.utils.error_sanitizer import sanitize_error
+from app.utils.spool import Buffer, UploadTooLarge, spool_upload
 
 router = APIRouter(prefix="/api/battle", tags=["battle"])
 
-# ── In-memory file cache (no disk writes for uploads) ────────
-_battle_file_cache: dict[str, tuple[bytes, str, float]] = {}  # battle_id -> (data, mime, created_at)
-_CACHE_TTL = 1800  # 30 minutes
-_MAX_CACHE_ENTRIES = 50
-_MAX_CACHE_SIZE_BYTES = 500 * 1024 * 1024  # 500 MB total limit
-
-
-def _cleanup_stale_cache() -> None:
-    now = _time_module.time()
-    expired = [k for k, (_, _, ts) in _battle_file_cache.items() if now - ts > _CACHE_TTL]
-    for k in expired:
-        del _battle_file_cache[k]
-    # Evict oldest entries if over entry limit
-    while len(_battle_file_cache) > _MAX_CACHE_ENTRIES:
-        oldest_key = min(_battle_file_cache, key=lambda k: _battle_file_cache[k][2])
-        del _battle_file_cache[oldest_key]
-    # Evict oldest entries if over size limit
-    total_size = sum(len(data) for data, _, _ in _battle_file_cache.values())
-    while total_size > _MAX_CACHE_SIZE_BYTES and _battle_file_cache:
-        oldest_key = min(_battle_file_cache, key=lambda k: _battle_file_cache[k][2])
-        total_size -= len(_battle_file_cache[oldest_key][0])
-        del _battle_file_cache[oldest_key]
+# In-flight battle markers live in the shared state backend, like the documents
+# themselves, so that /start and /stream may be served by different workers.
+_STREAM_NS = "battle_stream"
+
+
+def _reserve_slot(kind: str, timed: bool = True) -> AdmissionTicket:
+    """Take an admission ticket, or reject with 429 + Retry-After when the queue is full.
+
+    Checking and reserving happen in one step so concurrent requests cannot all
+    slip past a capacity check. The caller must release the ticket.
+    """
+    try:
+        return get_admission().enqueue(kind, timed)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+def _is_current_sample(battle: Battle) -> bool:
+    """True when the battle's document is an unchanged sample (not an upload)."""
+    entry = get_document_index().get(battle.document_path)
+    return bool(entry and entry.sha256 == battle.document_hash)
+
+
+async def _release_document(db: AsyncSession, battle: Battle) -> None:
+    """Free an upload once its battle finished, unless another unfinished battle uses it."""
+    if not battle.document_hash or _is_current_sample(battle):
+        return
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=DOCUMENT_TTL)
+    pending = await db.scalar(
+        select(func.count()).select_from(Battle).where(
+            Battle.document_hash == battle.document_hash,
+            Battle.id != battle.id,
+            Battle.model_a_latency_ms.is_(None),
+            Battle.created_at >= cutoff,
+        )
+    )
+    if not pending:
+        await release_upload(battle.document_hash)
 
 
 @router.post("/start", response_model=BattleStartResponse)
 async def start_battle(
     file: UploadFile = File(None),
     document_name: str = Query(None),
+    pages: str = Query(None, description="Pages to OCR, e.g. 1-3,5"),
+    crop: str = Query(None, description="Normalized crop box x0,y0,x1,y1 applied to each page"),
     db: AsyncSession = Depends(get_db),
 ):
     settings = get_settings()
-    _cleanup_stale_cache()
+    ticket = _reserve_slot("upload", timed=False)
+    try:
+        # Validation and hashing count against the same capacity as battles, so wait our turn
+        async for _ in ticket.wait_turn():
+            pass
+        return await _start_battle(file, document_name, pages, crop, db, settings)
+    finally:
+        ticket.release()
+
+
+async def _start_battle(
+    file: UploadFile | None,
+    document_name: str | None,
+    pages: str | None,
+    crop: str | None,
+    db: AsyncSession,
+    settings,
+) -> BattleStartResponse:
+    try:
+        region = parse_region(pages, crop)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     if file:
         ext = os.path.splitext(file.filename or "")[1].lower()
         if ext not in ALLOWED_EXTENSIONS:
             raise HTTPException(status_code=400, detail=f"Unsupported file type: {ext}")
-        content = await file.read()
-        if len(content) > settings.max_upload_size:
+        try:
+            content, document_hash = await spool_upload(file, settings.max_upload_size)
+        except UploadTooLarge:
             raise HTTPException(status_code=413, detail="File too large (max 50 MB)")
-        if not validate_file_content(content, ext):
+        if not await is_valid_document(content, document_hash, ext):
             raise HTTPException(status_code=400, detail="File content does not match its extension")
-        mime_type = extension_to_mime(ext, default="image/png")
+        # Kept in the document store only (never written to the documents dir)
+        await store_document(content, document_hash)
+        schedule_previews(document_hash, extension_to_mime(ext), lambda: get_document(document_hash))
         doc_path = file.filename or f"upload{ext}"
     elif document_name:
         filepath = os.path.join(settings.sample_docs_dir, document_name)
@@ -71,16 +131,25 @@ async def start_battle(
             raise HTTPException(status_code=400, detail="Invalid document name")
         if not os.path.exists(filepath):
             raise HTTPException(status_code=404, detail="Document not found")
-        with open(filepath, "rb") as f:
-            content = f.read()
-        ext = os.path.splitext(document_name)[1].lower()
-        mime_type = extension_to_mime(ext, default="image/png")
+        content, document_hash = await load_sample(filepath)
         doc_path = document_name
     else:
         raise HTTPException(status_code=400, detail="Provide a file or document_name")
 
+    mime_type = extension_to_mime(os.path.splitext(doc_path)[1].lower(), default="image/png")
+    if region:
+        try:
+            await asyncio.to_thread(check_region, content, mime_type, region, settings.max_pdf_pages)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Invalid region: {e}")
+
     try:
-        models = await select_random_models(db, 2)
+        models = await select_random_models(db, 2, mime_type)
+    except NoHealthyModelsError:
+        raise HTTPException(
+            status_code=503,
+            detail="Not enough healthy models: some providers are failing and temporarily excluded.",
+        )
     except ValueError:
         raise HTTPException(
             status_code=400,
@@ -89,12 +158,11 @@ async def start_battle(
 
     battle_id = str(uuid.uuid4())
 
-    # Store file in memory cache (not on disk)
-    _battle_file_cache[battle_id] = (content, mime_type, _time_module.time())
-
     battle = Battle(
         id=battle_id,
         document_path=doc_path,
+        document_hash=document_hash,
+        region=region.to_dict() if region else None,
         model_a_id=models[0].id,
         model_b_id=models[1].id,
     )
@@ -103,12 +171,59 @@ async def start_battle(
 
     return BattleStartResponse(
         battle_id=battle.id,
-        document_url="",
+        document_url=f"/api/battle/{battle.id}/preview?size=preview&page={region.first_page if region else 1}",
         model_a_label="Model A",
         model_b_label="Model B",
     )
 
 
+@router.get("/{battle_id}/preview")
+async def get_battle_preview(
+    battle_id: str,
+    request: Request,
+    page: int = Query(1, ge=1),
+    size: str = Query("preview", pattern="^(thumb|preview)$"),
+    db: AsyncSession = Depends(get_db),
+):
+    """WebP preview of a battle's document, keyed by its content hash."""
+    result = await db.execute(select(Battle).where(Battle.id == battle_id))
+    battle = result.scalar_one_or_none()
+    if not battle:
+        raise HTTPException(status_code=404, detail="Battle not found")
+    if not battle.document_hash:
+        raise HTTPException(status_code=404, detail="Document no longer available")
+
+    etag = preview_etag(battle.document_hash, page, size)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    async def load():
+        data = await get_document(battle.document_hash)
+        if data is None:
+            # Released uploads are gone; a sample is only used while its content is unchanged
+            if _is_current_sample(battle):
+                index = get_document_index()
+                data = await read_sample(os.path.join(index.docs_dir, battle.document_path))
+        return data
+
+    ext = os.path.splitext(battle.document_path)[1].lower()
+    try:
+        image = await get_preview(
+            battle.document_hash, page, size, extension_to_mime(ext, default="image/png"), load,
+            ttl=DOCUMENT_TTL,
+        )
+    except PageNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except DocumentChanged:
+        image = None  # the sample was replaced; the battle's document is gone
+    if image is None:
+        raise HTTPException(status_code=404, detail="Document no longer available")
+    # The URL's content never changes: the hash pins it
+    return Response(image, media_type="image/webp", headers={
+        "ETag": etag, "Cache-Control": "private, max-age=31536000, immutable",
+    })
+
+
 @router.get("/{battle_id}/stream")
 async def stream_battle(battle_id: str, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(Battle).where(Battle.id == battle_id))
@@ -140,21 +255,49 @@ async def stream_battle(battle_id: str, db: AsyncSession = Depends(get_db)):
     model_b_res = await db.execute(select(OcrModel).where(OcrModel.id == battle.model_b_id))
     model_b = model_b_res.scalar_one()
 
-    # Read from in-memory cache first, fallback to disk for sample docs
-    cache_entry = _battle_file_cache.get(battle_id)
-    if cache_entry:
-        image_data, mime_type = cache_entry[0], cache_entry[1]
-    else:
+    # Read from shared state first, fallback to disk for sample docs
+    ext = os.path.splitext(battle.document_path)[1].lower()
+    mime_type = extension_to_mime(ext, default="image/png")
+    image_data = await get_document(battle.document_hash) if battle.document_hash else None
+    if image_data is None:
+        # Sample documents are re-read on demand; expired uploads are gone
         settings = get_settings()
         filepath = os.path.join(settings.sample_docs_dir, battle.document_path)
         if not os.path.exists(filepath):
             raise HTTPException(status_code=404, detail="Document no longer available")
-        with open(filepath, "rb") as f:
-            image_data = f.read()
-        ext = os.path.splitext(battle.document_path)[1].lower()
-        mime_type = extension_to_mime(ext, default="image/png")
+        image_data, sample_hash = await load_sample(filepath)
+        if battle.document_hash and sample_hash != battle.document_hash:
+            raise HTTPException(status_code=404, detail="Document no longer available")
+    region = Region.from_dict(battle.region)
+
+    ticket = _reserve_slot("battle")
+    state = get_shared_state()
+    claim_ttl = get_settings().stream_timeout_seconds
 
     async def event_stream():
+        # Only one worker may run a battle at a time; a reconnect while the previous
+        # stream is still being torn down is told to retry.
+        try:
+            if not await state.add(_STREAM_NS, battle_id, b"1", ttl=claim_ttl):
+                yield {"event": "error", "data": json.dumps({"error": "Battle is already running", "retry_after": 2})}
+                return
+            try:
+                async for position in ticket.wait_turn():
+                    yield {"event": "queue", "data": json.dumps({"position": position})}
+                # Cut once for both models, under the admission slot; the region was validated at /start
+                try:
+                    data, mime = await extract_region(image_data, mime_type, region, get_settings().max_pdf_pages)
+                except Exception as e:
+                    yield {"event": "error", "data": json.dumps({"error": f"Invalid region: {e}", "status": 400})}
+                    return
+                async for event in battle_events(data, mime):
+                    yield event
+            finally:
+                await state.delete(_STREAM_NS, battle_id)
+        finally:
+            ticket.release()
+
+    async def battle_events(image_data: Buffer, mime_type: str):
         queue: asyncio.Queue[tuple[str, str]] = asyncio.Queue()
         results: dict[str, dict] = {}
 
@@ -204,6 +347,7 @@ async def stream_battle(battle_id: str, db: AsyncSession = Depends(get_db)):
 
         done_count = 0
         _stream_timeout = get_settings().stream_timeout_seconds
+        claim_renewed = _time_module.monotonic()
         while done_count < 2:
             try:
                 event_name, event_data = await asyncio.wait_for(
@@ -220,12 +364,12 @@ async def stream_battle(battle_id: str, db: AsyncSession = Depends(get_db)):
             yield {"event": event_name, "data": event_data}
             if event_name.endswith("_done"):
                 done_count += 1
+            if _time_module.monotonic() - claim_renewed > claim_ttl / 2:
+                await state.put(_STREAM_NS, battle_id, b"1", ttl=claim_ttl)
+                claim_renewed = _time_module.monotonic()
 
         await asyncio.gather(task_a, task_b, return_exceptions=True)
 
-        # Free cached file data
-        _battle_file_cache.pop(battle_id, None)
-
         # Save results to DB (latency always; OCR text only if configured)
         settings = get_settings()
         async with async_session() as update_db:
@@ -238,10 +382,13 @@ async def stream_battle(battle_id: str, db: AsyncSession = Depends(get_db)):
                     if settings.store_ocr_results:
                         setattr(battle_to_update, f"model_{key}_result", r["text"])
             await update_db.commit()
+            await _release_document(update_db, battle_to_update)
 
         yield {"event": "done", "data": "{}"}
 
-    return EventSourceResponse(event_stream())
+    # Also release after the response: a client that disconnects before the
+    # first event never starts the generator, so its finally never runs.
+    return EventSourceResponse(event_stream(), background=BackgroundTask(ticket.release))
 
 
 @router.post("/{battle_id}/vote", response_model=VoteResponse)
@@ -1,59 +1,78 @@
+import asyncio
+import hashlib
 import os
-import random
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, Response
 
 from app.config import get_settings
 from app.utils.mime import ALLOWED_EXTENSIONS, extension_to_mime
-from app.utils.file_validation import validate_file_content
+from app.services.document_index import get_document_index
+from app.services.document_store import is_valid_document
+from app.services.previews import (
+    SAMPLE_PREVIEW_TTL, DocumentChanged, PageNotFound, get_preview, preview_etag, read_sample,
+)
+from app.utils.spool import UploadTooLarge, spool_upload
 
 router = APIRouter(prefix="/api/documents", tags=["documents"])
 
 
 @router.get("/random")
 async def get_random_document():
-    settings = get_settings()
-    docs_dir = settings.sample_docs_dir
+    index = get_document_index()
+    await index.wait_ready()
 
-    if not os.path.exists(docs_dir):
+    if not index.exists:
         raise HTTPException(status_code=404, detail="Sample documents directory not found")
 
-    files = [
-        f for f in os.listdir(docs_dir)
-        if os.path.isfile(os.path.join(docs_dir, f))
-        and os.path.splitext(f)[1].lower() in ALLOWED_EXTENSIONS
-    ]
+    # The index may lag a deletion by one poll interval
+    for _ in range(3):
+        chosen = index.random()
+        if chosen is None:
+            break
+        filepath = os.path.join(index.docs_dir, chosen.name)
+        if os.path.isfile(filepath):
+            return FileResponse(
+                filepath,
+                filename=chosen.name,
+                headers={"X-Document-Name": chosen.name},
+            )
+        await index.refresh()
+
+    raise HTTPException(status_code=404, detail="No sample documents found")
+
+
+@router.get("/random/info")
+async def get_random_document_info():
+    """Pick a random sample document without transferring it (metadata and preview only)."""
+    index = get_document_index()
+    await index.wait_ready()
+
+    if not index.exists:
+        raise HTTPException(status_code=404, detail="Sample documents directory not found")
 
-    if not files:
+    chosen = index.random()
+    if chosen is None:
         raise HTTPException(status_code=404, detail="No sample documents found")
-
-    chosen = random.choice(files)
-    return FileResponse(
-        os.path.join(docs_dir, chosen),
-        filename=chosen,
-        headers={"X-Document-Name": chosen},
-    )
+    return JSONResponse(chosen.to_dict())
 
 
 @router.get("/list")
-async def list_documents():
-    settings = get_settings()
-    docs_dir = settings.sample_docs_dir
-
-    if not os.path.exists(docs_dir):
-        return {"documents": []}
-
-    files = [
-        {
-            "name": f,
-            "path": f"/api/documents/file/{f}",
-            "extension": os.path.splitext(f)[1].lower(),
-        }
-        for f in sorted(os.listdir(docs_dir))
-        if os.path.isfile(os.path.join(docs_dir, f))
-        and os.path.splitext(f)[1].lower() in ALLOWED_EXTENSIONS
-    ]
-    return {"documents": files}
+async def list_documents(
+    q: str = Query("", description="Case-insensitive name filter"),
+    extension: str = Query("", description="e.g. pdf or .png"),
+    offset: int = Query(0, ge=0),
+    limit: int | None = Query(None, ge=1, le=1000),
+):
+    index = get_document_index()
+    await index.wait_ready()
+    total, entries = index.search(query=q, extension=extension, offset=offset, limit=limit)
+    # Plain JSON types only, so skip jsonable_encoder (dominant cost for large listings)
+    return JSONResponse({
+        "documents": [entry.to_dict() for entry in entries],
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+    })
 
 
 @router.get("/file/{filename}")
@@ -73,27 +92,87 @@ async def get_document(filename: str):
     return FileResponse(filepath, media_type=media_type)
 
 
+async def _read_hashed(filepath: str) -> tuple[bytes, str]:
+    data = await read_sample(filepath)
+    if data is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    return data, await asyncio.to_thread(lambda: hashlib.sha256(data).hexdigest())
+
+
+@router.get("/preview/{filename}")
+async def get_document_preview(
+    filename: str,
+    request: Request,
+    page: int = Query(1, ge=1),
+    size: str = Query("thumb", pattern="^(thumb|preview)$"),
+):
+    """WebP thumbnail (256 px) or page preview (1280 px) of a sample document."""
+    settings = get_settings()
+    filepath = os.path.join(settings.sample_docs_dir, filename)
+
+    if not os.path.realpath(filepath).startswith(os.path.realpath(settings.sample_docs_dir)):
+        raise HTTPException(status_code=400, detail="Invalid filename")
+
+    entry = get_document_index().get(filename)
+    sha256 = entry.sha256 if entry else None
+    if sha256 is not None:
+        try:
+            st = await asyncio.to_thread(os.stat, filepath)
+        except OSError:
+            raise HTTPException(status_code=404, detail="File not found")
+        if (st.st_mtime_ns, st.st_size) != (entry.mtime_ns, entry.size):
+            sha256 = None  # replaced since the index hashed it
+    data = None
+    if sha256 is None:
+        data, sha256 = await _read_hashed(filepath)
+
+    etag = preview_etag(sha256, page, size)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    async def load():
+        return data if data is not None else await read_sample(filepath)
+
+    mime_type = extension_to_mime(os.path.splitext(filename)[1].lower())
+    try:
+        try:
+            image = await get_preview(sha256, page, size, mime_type, load, ttl=SAMPLE_PREVIEW_TTL)
+        except DocumentChanged:
+            # Rewritten between the stat and the read: key by what was actually read
+            data, sha256 = await _read_hashed(filepath)
+            etag = preview_etag(sha256, page, size)
+            image = await get_preview(sha256, page, size, mime_type, load, ttl=SAMPLE_PREVIEW_TTL)
+    except PageNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if image is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    # Sample files can be replaced under the same name, so revalidate every time
+    return Response(image, media_type="image/webp", headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
 @router.post("/upload")
 async def upload_document(file: UploadFile = File(...)):
     """Validate an uploaded file without storing it on disk.
 
-    Returns metadata only — the file bytes are held in memory
-    by the battle endpoint, not persisted.
+    Returns metadata only — the file bytes are held by the battle
+    endpoint, not persisted.
     """
     ext = os.path.splitext(file.filename or "")[1].lower()
     if ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(status_code=400, detail=f"Unsupported file type: {ext}")
 
     settings = get_settings()
-    content = await file.read()
-    if len(content) > settings.max_upload_size:
+    try:
+        content, sha256 = await spool_upload(file, settings.max_upload_size)
+    except UploadTooLarge:
         raise HTTPException(status_code=413, detail="File too large (max 50 MB)")
 
-    if not validate_file_content(content, ext):
+    if not await is_valid_document(content, sha256, ext):
         raise HTTPException(status_code=400, detail="File content does not match its extension")
 
     return {
         "original_name": file.filename,
         "size": len(content),
         "extension": ext,
+        "sha256": sha256,
     }
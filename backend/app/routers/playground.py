@@ -1,5 +1,4 @@
 import os
-import aiofiles
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Form
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -7,10 +6,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.database import get_db, OcrModel
 from app.models.schemas import PlaygroundResponse, OcrModelOut
 from app.services.ocr_service import run_ocr, resolve_prompt
+from app.services.admission import get_admission, AdmissionRejected
+from app.services.document_store import is_valid_document, load_sample
+from app.services.regions import extract_region, parse_region
 from app.ocr_providers.base import DEFAULT_OCR_PROMPT
 from app.config import get_settings
 from app.utils.mime import extension_to_mime, ALLOWED_EXTENSIONS
-from app.utils.file_validation import validate_file_content
+from app.utils.spool import UploadTooLarge, spool_upload
 
 router = APIRouter(prefix="/api/playground", tags=["playground"])
 
@@ -57,8 +59,15 @@ async def playground_ocr(
     document_name: str = Form(None),
     prompt: str = Form(None),
     temperature: float = Form(None),
+    pages: str = Form(None),
+    crop: str = Form(None),
     db: AsyncSession = Depends(get_db),
 ):
+    try:
+        region = parse_region(pages, crop)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     result = await db.execute(select(OcrModel).where(OcrModel.id == model_id))
     model = result.scalar_one_or_none()
     if not model:
@@ -70,10 +79,11 @@ async def playground_ocr(
         ext = os.path.splitext(file.filename or "")[1].lower()
         if ext not in ALLOWED_EXTENSIONS:
             raise HTTPException(status_code=400, detail=f"Unsupported file type: {ext}")
-        image_data = await file.read()
-        if len(image_data) > settings.max_upload_size:
+        try:
+            image_data, document_hash = await spool_upload(file, settings.max_upload_size)
+        except UploadTooLarge:
             raise HTTPException(status_code=413, detail="File too large")
-        if not validate_file_content(image_data, ext):
+        if not await is_valid_document(image_data, document_hash, ext):
             raise HTTPException(status_code=400, detail="File content does not match its extension")
     elif document_name:
         filepath = os.path.join(settings.sample_docs_dir, document_name)
@@ -81,19 +91,27 @@ async def playground_ocr(
             raise HTTPException(status_code=400, detail="Invalid document name")
         if not os.path.exists(filepath):
             raise HTTPException(status_code=404, detail="Document not found")
-        async with aiofiles.open(filepath, "rb") as f:
-            image_data = await f.read()
+        image_data, _ = await load_sample(filepath)
         ext = os.path.splitext(document_name)[1].lower()
     else:
         raise HTTPException(status_code=400, detail="Provide a file or document_name")
 
     mime_type = extension_to_mime(ext, default="image/png")
-
-    ocr_result = await run_ocr(
-        model, image_data, mime_type, db,
-        prompt_override=prompt,
-        temperature_override=temperature,
-    )
+    try:
+        async with get_admission().slot("playground"):
+            # Only the selected pages / crop box are rendered and sent to the model;
+            # cutting them is CPU work too, so it happens under the admission slot
+            try:
+                image_data, mime_type = await extract_region(image_data, mime_type, region, settings.max_pdf_pages)
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Invalid region: {e}")
+            ocr_result = await run_ocr(
+                model, image_data, mime_type, db,
+                prompt_override=prompt,
+                temperature_override=temperature,
+            )
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     if ocr_result.error:
         raise HTTPException(status_code=500, detail=ocr_result.error)
 
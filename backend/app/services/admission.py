@@ -0,0 +1,162 @@
+"""Global admission control for OCR work (battles, playground runs).
+
+A fixed number of jobs may run at once; further jobs wait in a bounded FIFO
+queue and can observe their queue position. When the queue is full new work
+is rejected with a Retry-After estimate so clients back off instead of piling
+more load onto the providers.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+
+from app.config import get_settings
+
+
+class AdmissionRejected(Exception):
+    """Raised when the wait queue is full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Server is busy, please retry later")
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    """A reserved place in the admission queue. Always call release()."""
+
+    def __init__(self, controller: "AdmissionController", kind: str, timed: bool = True):
+        self.controller = controller
+        self.kind = kind
+        self.timed = timed
+        self.granted = False
+        self.released = False
+        self.granted_at = 0.0
+        self._changed = asyncio.Event()
+
+    @property
+    def position(self) -> int:
+        """1-based position in the wait queue (0 once admitted)."""
+        if self.granted:
+            return 0
+        try:
+            return self.controller._queue.index(self) + 1
+        except ValueError:
+            return 0
+
+    async def wait_turn(self) -> AsyncGenerator[int, None]:
+        """Yield the queue position every time it changes, until admitted."""
+        while not self.granted:
+            yield self.position
+            await self._changed.wait()
+            self._changed.clear()
+
+    def release(self) -> None:
+        self.controller._release(self)
+
+
+class AdmissionController:
+    def __init__(self, max_inflight: int, max_queued: int, min_retry_after: int = 1):
+        self.max_inflight = max_inflight
+        self.max_queued = max_queued
+        self.min_retry_after = min_retry_after
+        self.inflight = 0
+        self.inflight_by_kind: dict[str, int] = {}
+        self.rejected = 0
+        self._queue: deque[AdmissionTicket] = deque()
+        self._avg_job_seconds = 10.0
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def is_full(self) -> bool:
+        """True when a new job could neither run nor wait."""
+        return self.inflight >= self.max_inflight and len(self._queue) >= self.max_queued
+
+    def retry_after(self) -> int:
+        """Estimated seconds until a queue slot frees up."""
+        backlog = (len(self._queue) + 1) / max(1, self.max_inflight)
+        return max(self.min_retry_after, math.ceil(backlog * self._avg_job_seconds))
+
+    def enqueue(self, kind: str, timed: bool = True) -> AdmissionTicket:
+        """Admit immediately or join the wait queue. Raises AdmissionRejected when full.
+
+        Untimed tickets (short request handlers) are left out of the job-duration
+        average used for Retry-After.
+        """
+        if self.is_full():
+            self.rejected += 1
+            raise AdmissionRejected(self.retry_after())
+        ticket = AdmissionTicket(self, kind, timed)
+        if self.inflight < self.max_inflight and not self._queue:
+            self._grant(ticket)
+        else:
+            self._queue.append(ticket)
+        return ticket
+
+    @asynccontextmanager
+    async def slot(self, kind: str):
+        """Hold an in-flight slot for the duration of the block, waiting if queued."""
+        ticket = self.enqueue(kind)
+        try:
+            async for _ in ticket.wait_turn():
+                pass
+            yield ticket
+        finally:
+            ticket.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_inflight": self.max_inflight,
+            "max_queued": self.max_queued,
+            "inflight": self.inflight,
+            "inflight_by_kind": dict(self.inflight_by_kind),
+            "queued": len(self._queue),
+            "rejected": self.rejected,
+            "avg_job_seconds": round(self._avg_job_seconds, 2),
+        }
+
+    def _grant(self, ticket: AdmissionTicket) -> None:
+        ticket.granted = True
+        ticket.granted_at = time.monotonic()
+        self.inflight += 1
+        self.inflight_by_kind[ticket.kind] = self.inflight_by_kind.get(ticket.kind, 0) + 1
+        ticket._changed.set()
+
+    def _release(self, ticket: AdmissionTicket) -> None:
+        if ticket.released:
+            return
+        ticket.released = True
+        if ticket.granted:
+            self.inflight -= 1
+            self.inflight_by_kind[ticket.kind] -= 1
+            if ticket.timed:
+                elapsed = time.monotonic() - ticket.granted_at
+                self._avg_job_seconds = 0.8 * self._avg_job_seconds + 0.2 * elapsed
+        else:
+            try:
+                self._queue.remove(ticket)
+            except ValueError:
+                pass
+        while self._queue and self.inflight < self.max_inflight:
+            self._grant(self._queue.popleft())
+        # Everyone still waiting moved up (or at least should re-check)
+        for waiting in self._queue:
+            waiting._changed.set()
+
+
+_controller: AdmissionController | None = None
+
+
+def get_admission() -> AdmissionController:
+    global _controller
+    if _controller is None:
+        settings = get_settings()
+        _controller = AdmissionController(
+            max_inflight=settings.max_inflight_jobs,
+            max_queued=settings.max_queued_jobs,
+            min_retry_after=settings.admission_retry_after_seconds,
+        )
+    return _controller
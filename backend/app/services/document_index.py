@@ -0,0 +1,174 @@
+"""In-memory index of the sample documents directory.
+
+``sample_docs`` can hold thousands of files on a bind mount, so request
+handlers never list or stat it. A background monitor rescans it every
+``document_index_poll_seconds``. Files whose mtime and size are
+unchanged keep their entry. New or changed files get their page count
+and sha256 computed in a worker thread, published in batches, so
+listing is available before hashing finishes.
+"""
+import asyncio
+import hashlib
+import os
+import random
+import time
+
+from loguru import logger
+
+from app.config import get_settings
+from app.utils.mime import ALLOWED_EXTENSIONS, extension_to_mime
+
+_HASH_CHUNK = 1024 * 1024
+_PUBLISH_EVERY = 64  # entries enriched between yields to the event loop
+
+
+class DocumentEntry:
+    def __init__(self, name: str, size: int, mtime_ns: int):
+        self.name = name
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.extension = os.path.splitext(name)[1].lower()
+        self.mime = extension_to_mime(self.extension)
+        self.page_count: int | None = None
+        self.sha256: str | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "path": f"/api/documents/file/{self.name}",
+            "extension": self.extension,
+            "mime": self.mime,
+            "size": self.size,
+            "page_count": self.page_count,
+            "sha256": self.sha256,
+        }
+
+
+def _page_count(path: str, extension: str) -> int | None:
+    try:
+        if extension == ".pdf":
+            import pypdfium2 as pdfium
+
+            pdf = pdfium.PdfDocument(path)
+            try:
+                return len(pdf)
+            finally:
+                pdf.close()
+        from PIL import Image
+
+        with Image.open(path) as img:
+            return getattr(img, "n_frames", 1)
+    except Exception:
+        return None
+
+
+def _file_sha256(path: str) -> str | None:
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            while chunk := f.read(_HASH_CHUNK):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+class DocumentIndex:
+    def __init__(self, docs_dir: str):
+        self.docs_dir = docs_dir
+        self.exists = False
+        self.refreshed_at: float | None = None
+        self._entries: dict[str, DocumentEntry] = {}
+        self._names: list[str] = []  # sorted; random.choice over it is O(1)
+        self._ready = asyncio.Event()
+
+    def _scan(self) -> tuple[bool, dict[str, DocumentEntry]]:
+        if not os.path.isdir(self.docs_dir):
+            return False, {}
+        entries: dict[str, DocumentEntry] = {}
+        with os.scandir(self.docs_dir) as it:
+            for dirent in it:
+                if os.path.splitext(dirent.name)[1].lower() not in ALLOWED_EXTENSIONS:
+                    continue
+                try:
+                    if not dirent.is_file():
+                        continue
+                    st = dirent.stat()
+                except OSError:
+                    continue
+                previous = self._entries.get(dirent.name)
+                if previous and (previous.mtime_ns, previous.size) == (st.st_mtime_ns, st.st_size):
+                    entries[dirent.name] = previous
+                else:
+                    entries[dirent.name] = DocumentEntry(dirent.name, st.st_size, st.st_mtime_ns)
+        return True, entries
+
+    def _enrich(self, entry: DocumentEntry) -> None:
+        path = os.path.join(self.docs_dir, entry.name)
+        entry.page_count = _page_count(path, entry.extension)
+        entry.sha256 = _file_sha256(path)
+
+    async def refresh(self) -> None:
+        exists, entries = await asyncio.to_thread(self._scan)
+        changed = entries.keys() != self._entries.keys() or any(
+            entry is not self._entries.get(name) for name, entry in entries.items()
+        )
+        self.exists = exists
+        if changed:
+            self._entries = entries
+            self._names = sorted(entries)
+        self.refreshed_at = time.time()
+        self._ready.set()
+
+    async def enrich(self) -> None:
+        """Compute page count and hash for new or changed entries."""
+        pending = [e for e in self._entries.values() if e.sha256 is None]
+        for i in range(0, len(pending), _PUBLISH_EVERY):
+            batch = pending[i:i + _PUBLISH_EVERY]
+            await asyncio.to_thread(lambda: [self._enrich(e) for e in batch])
+
+    async def wait_ready(self) -> None:
+        if not self._ready.is_set():
+            await self.refresh()
+
+    async def run_monitor(self) -> None:
+        """Poll the directory for changes (runs for the lifetime of the app)."""
+        interval = get_settings().document_index_poll_seconds
+        while True:
+            try:
+                await self.refresh()
+                await self.enrich()
+            except Exception as e:
+                logger.warning(f"Document index refresh failed: {e}")
+            await asyncio.sleep(interval)
+
+    def get(self, name: str) -> DocumentEntry | None:
+        return self._entries.get(name)
+
+    def random(self) -> DocumentEntry | None:
+        names = self._names
+        return self._entries.get(random.choice(names)) if names else None
+
+    def search(
+        self, query: str = "", extension: str = "", offset: int = 0, limit: int | None = None,
+    ) -> tuple[int, list[DocumentEntry]]:
+        """Filter by name substring and extension; returns (total matches, page)."""
+        names = self._names
+        if query:
+            q = query.lower()
+            names = [n for n in names if q in n.lower()]
+        if extension:
+            ext = extension.lower() if extension.startswith(".") else f".{extension.lower()}"
+            names = [n for n in names if self._entries[n].extension == ext]
+        page = names[offset:offset + limit] if limit else names[offset:]
+        return len(names), [self._entries[n] for n in page]
+
+
+_index: DocumentIndex | None = None
+
+
+def get_document_index() -> DocumentIndex:
+    global _index
+    if _index is None:
+        _index = DocumentIndex(get_settings().sample_docs_dir)
+    return _index
@@ -0,0 +1,85 @@
+"""Content-addressed document store.
+
+Documents are keyed by their sha256. The same upload (or sample document)
+used in many battles is stored once and validated once. The hash is also
+the stable key for anything derived from a document's content.
+
+Entries live in the shared state backend with a TTL that is extended on
+reuse, so uploads are never written to the documents directory. An upload is
+released once no unfinished battle uses it: kept for
+``upload_retention_seconds`` (30 minutes by default), or deleted right away
+when that is 0. Sample documents are
+read asynchronously; their hashes come from the document index, so an
+unchanged sample already in the store is not read at all.
+"""
+import asyncio
+import hashlib
+import os
+
+import aiofiles
+
+from app.config import get_settings
+from app.services.document_index import get_document_index
+from app.services.shared_state import get_shared_state
+from app.utils.file_validation import validate_file_content
+from app.utils.spool import Buffer
+
+DOCUMENT_TTL = 1800  # 30 minutes since last use
+_DOC_NS = "document"
+_VALID_NS = "document_valid"
+
+
+async def is_valid_document(data: Buffer, sha256: str, ext: str) -> bool:
+    """Magic-byte check of content against its extension, cached per (hash, extension)."""
+    state = get_shared_state()
+    key = f"{sha256}{ext}"
+    if await state.touch(_VALID_NS, key, DOCUMENT_TTL):
+        return True
+    if not validate_file_content(data, ext):
+        return False
+    await state.put(_VALID_NS, key, b"1", ttl=DOCUMENT_TTL)
+    return True
+
+
+async def store_document(data: Buffer, sha256: str) -> bool:
+    """Store a document under its hash. Returns False when it was already stored."""
+    state = get_shared_state()
+    if await state.touch(_DOC_NS, sha256, DOCUMENT_TTL):
+        return False
+    await state.put(_DOC_NS, sha256, data, ttl=DOCUMENT_TTL)
+    return True
+
+
+async def get_document(sha256: str) -> Buffer | None:
+    return await get_shared_state().get(_DOC_NS, sha256)
+
+
+async def release_upload(sha256: str) -> None:
+    """Called when no unfinished battle needs an upload any more."""
+    retention = get_settings().upload_retention_seconds
+    state = get_shared_state()
+    if retention > 0:
+        await state.touch(_DOC_NS, sha256, retention)
+    else:
+        await state.delete(_DOC_NS, sha256)
+
+
+async def _read_file(path: str) -> bytes:
+    async with aiofiles.open(path, "rb") as f:
+        return await f.read()
+
+
+async def load_sample(path: str) -> tuple[Buffer, str]:
+    """Return (data, sha256) of a sample document, served from the store when unchanged."""
+    st = await asyncio.to_thread(os.stat, path)
+    index = get_document_index()
+    entry = index.get(os.path.relpath(path, index.docs_dir))
+    if entry and entry.sha256 and (entry.mtime_ns, entry.size) == (st.st_mtime_ns, st.st_size):
+        data = await get_document(entry.sha256)
+        if data is not None:
+            return data, entry.sha256
+
+    data = await _read_file(path)
+    sha256 = await asyncio.to_thread(lambda: hashlib.sha256(data).hexdigest())
+    await store_document(data, sha256)
+    return data, sha256
@@ -0,0 +1,177 @@
+"""How each provider sizes images, and what they cost in tokens.
+
+Every vendor downsamples or tiles images by its own rules. Pixels beyond
+its internal maximum are thrown away after being uploaded (and, for
+tiled models, some are billed). An ``ImageProfile`` knows the largest
+size that still helps (``fit``) and the input tokens an image costs
+(``tokens``). It is used to:
+
+- auto-resize images to that size before they reach ``process_image``
+  (PreprocessingOcrProvider, ``image_auto_resize``),
+- estimate tokens for rate limiting (RateLimitedOcrProvider),
+- estimate tokens and cost per model (GET /api/admin/models/{id}/image-estimate).
+
+Built-in rules for the hosted APIs follow their published docs as of
+writing and are estimates. Self-hosted models (``custom``, ``ollama``)
+take their profile from the model config's ``image_profile`` or their
+VLM registry entry:
+
+    {"max_edge": 1540, "max_pixels": 0, "patch": 28, "base_tokens": 0}
+
+``patch`` is the side in pixels covered by one vision token (e.g. 28 for
+Qwen2-VL style 14 px patches merged 2x2).
+"""
+import math
+from abc import ABC, abstractmethod
+
+from app.vlm_registry import match_registry
+
+_PROFILE_KEYS = {"max_edge", "max_pixels", "patch", "base_tokens"}
+
+
+class ImageProfile(ABC):
+    name = "generic"
+
+    def __init__(self, max_edge: int = 0, max_pixels: int = 0):
+        self.max_edge = max_edge
+        self.max_pixels = max_pixels
+
+    def fit(self, width: int, height: int) -> tuple[int, int]:
+        """Largest size (never upscaled) that the provider makes full use of."""
+        scale = 1.0
+        if self.max_edge:
+            scale = min(scale, self.max_edge / max(width, height))
+        if self.max_pixels:
+            scale = min(scale, math.sqrt(self.max_pixels / (width * height)))
+        if scale >= 1.0:
+            return width, height
+        return max(1, int(width * scale)), max(1, int(height * scale))
+
+    @abstractmethod
+    def tokens(self, width: int, height: int) -> int:
+        """Input tokens for an image of this size (after the provider's own resize)."""
+        pass
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "max_edge": self.max_edge, "max_pixels": self.max_pixels}
+
+
+class PixelProfile(ImageProfile):
+    """Tokens proportional to area (Claude: ~750 px per token, 1568 px / 1.15 MP max)."""
+
+    def __init__(self, name: str, max_edge: int, max_pixels: int, pixels_per_token: int):
+        super().__init__(max_edge, max_pixels)
+        self.name = name
+        self.pixels_per_token = pixels_per_token
+
+    def tokens(self, width: int, height: int) -> int:
+        width, height = self.fit(width, height)
+        return math.ceil(width * height / self.pixels_per_token)
+
+
+class PatchProfile(ImageProfile):
+    """One token per ``patch`` x ``patch`` square, plus a fixed overhead."""
+
+    def __init__(self, name: str, max_edge: int = 0, max_pixels: int = 0, patch: int = 28, base_tokens: int = 0):
+        super().__init__(max_edge, max_pixels)
+        self.name = name
+        self.patch = patch
+        self.base_tokens = base_tokens
+
+    def tokens(self, width: int, height: int) -> int:
+        width, height = self.fit(width, height)
+        return math.ceil(width / self.patch) * math.ceil(height / self.patch) + self.base_tokens
+
+    def to_dict(self) -> dict:
+        return {**super().to_dict(), "patch": self.patch, "base_tokens": self.base_tokens}
+
+
+class OpenAIProfile(ImageProfile):
+    """High detail: fit in 2048x2048, then the short side to 768; 170 tokens per 512 px tile + 85."""
+
+    name = "openai"
+
+    def __init__(self):
+        super().__init__(max_edge=2048)
+
+    def fit(self, width: int, height: int) -> tuple[int, int]:
+        width, height = super().fit(width, height)
+        short = min(width, height)
+        if short > 768:
+            width, height = int(width * 768 / short), int(height * 768 / short)
+        return width, height
+
+    def tokens(self, width: int, height: int) -> int:
+        width, height = self.fit(width, height)
+        return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+
+class GeminiProfile(ImageProfile):
+    """258 tokens up to 384x384; larger images in 768 px tiles of 258 tokens each."""
+
+    name = "gemini"
+
+    def __init__(self):
+        super().__init__(max_edge=3072)
+
+    def tokens(self, width: int, height: int) -> int:
+        width, height = self.fit(width, height)
+        if width <= 384 and height <= 384:
+            return 258
+        return 258 * math.ceil(width / 768) * math.ceil(height / 768)
+
+
+PROVIDER_PROFILES: dict[str, ImageProfile] = {
+    "claude": PixelProfile("claude", max_edge=1568, max_pixels=1_150_000, pixels_per_token=750),
+    "openai": OpenAIProfile(),
+    "gemini": GeminiProfile(),
+    # Pixtral-style encoder: 14 px patches merged 2x2, 1540 px longest edge
+    "mistral": PatchProfile("mistral", max_edge=1540, patch=28),
+}
+
+
+def parse_image_profile(raw: object, name: str = "custom") -> PatchProfile | None:
+    """Build a profile from a config/registry dict. Raises ValueError when malformed."""
+    if not raw:
+        return None
+    if not isinstance(raw, dict):
+        raise ValueError("image_profile must be an object")
+    unknown = set(raw) - _PROFILE_KEYS
+    if unknown:
+        raise ValueError(f"Unknown image_profile option(s): {', '.join(sorted(unknown))}")
+    if any(isinstance(v, bool) for v in raw.values()):
+        raise ValueError("image_profile values must be non-negative integers")
+    values = {key: raw.get(key) or 0 for key in _PROFILE_KEYS}
+    values["patch"] = values["patch"] or 28
+    if any(not isinstance(v, int) or v < 0 for v in values.values()):
+        raise ValueError("image_profile values must be non-negative integers")
+    return PatchProfile(name, **values)
+
+
+def profile_for(provider_type: str, model_id: str, config: dict | None = None) -> ImageProfile | None:
+    """Profile for a model: its config override, then the built-in rules, then the VLM registry."""
+    override = parse_image_profile((config or {}).get("image_profile"))
+    if override:
+        return override
+    if provider_type in PROVIDER_PROFILES:
+        return PROVIDER_PROFILES[provider_type]
+    entry = match_registry(model_id)
+    if entry and entry.get("image_profile"):
+        return parse_image_profile(entry["image_profile"], name=entry["key"])
+    return None
+
+
+def estimate_image(profile: ImageProfile, width: int, height: int, usd_per_mtok: float | None = None) -> dict:
+    """Tokens (and cost, given an input price) of an image as uploaded and auto-resized."""
+    fitted = profile.fit(width, height)
+    tokens = profile.tokens(width, height)
+    estimate = {
+        "profile": profile.to_dict(),
+        "original": {"width": width, "height": height},
+        "resized": {"width": fitted[0], "height": fitted[1]},
+        "tokens": tokens,
+        "pixels_saved": width * height - fitted[0] * fitted[1],
+    }
+    if usd_per_mtok is not None:
+        estimate["cost_usd"] = round(tokens * usd_per_mtok / 1_000_000, 6)
+    return estimate
@@ -0,0 +1,182 @@
+"""Cached upstream model catalogs (the model lists shown in the settings UI).
+
+Catalogs are cached per provider for ``model_catalog_ttl_seconds``. A stale
+catalog is served immediately while a background task refreshes it, and
+refreshes use conditional requests (ETag / Last-Modified) so an unchanged
+list costs a 304 instead of the full JSON document. Entries are dropped
+when the provider's credentials change.
+"""
+import asyncio
+import hashlib
+import time
+
+from loguru import logger
+
+from app.config import get_settings
+from app.models.database import ProviderSetting
+from app.services.provider_health import get_http_client
+from app.utils.error_sanitizer import sanitize_error
+from app.utils.url_guard import is_private_url
+
+_FETCH_TIMEOUT = 10.0
+# Local provider types with a fixed model list and no upstream to ask
+_STATIC_CATALOGS = {"pdf_text": ["pdf-text"]}
+
+
+class CatalogEntry:
+    def __init__(self, fingerprint: str, models: list[str], etag: str = "", last_modified: str = ""):
+        self.fingerprint = fingerprint
+        self.models = models
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = time.time()
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+
+_entries: dict[str, CatalogEntry] = {}
+_refreshing: dict[str, asyncio.Task] = {}
+
+
+def _source(provider: ProviderSetting) -> tuple[str, str, str, str]:
+    """Plain (provider_id, type, api_key, base_url) so background refreshes don't touch ORM state."""
+    return (
+        provider.id,
+        provider.provider_type or provider.id,
+        (provider.api_key or "").strip(),
+        (provider.base_url or "").strip(),
+    )
+
+
+def _fingerprint(source: tuple[str, str, str, str]) -> str:
+    return hashlib.sha256("\0".join(source).encode()).hexdigest()
+
+
+def _catalog_request(ptype: str, api_key: str, base_url: str) -> tuple[str, dict] | None:
+    """Return (url, headers) for the provider's model list endpoint."""
+    if ptype == "openai":
+        return "https://api.openai.com/v1/models", {"Authorization": f"Bearer {api_key}"}
+    if ptype == "gemini":
+        return f"https://generativelanguage.googleapis.com/v1beta/models?key={api_key}", {}
+    if ptype == "mistral":
+        return "https://api.mistral.ai/v1/models", {"Authorization": f"Bearer {api_key}"}
+    if ptype == "claude":
+        return "https://api.anthropic.com/v1/models", {"x-api-key": api_key, "anthropic-version": "2023-06-01"}
+    if ptype == "ollama":
+        return f"{(base_url or 'http://localhost:11434').rstrip('/')}/api/tags", {}
+    if ptype == "custom" and base_url:
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+        return f"{base_url.rstrip('/')}/models", headers
+    return None
+
+
+def _parse_models(ptype: str, data: dict) -> list[str]:
+    if ptype == "openai":
+        return sorted(m["id"] for m in data.get("data", []) if "gpt" in m["id"].lower())
+    if ptype == "gemini":
+        return sorted(
+            m["name"].replace("models/", "") for m in data.get("models", [])
+            if "gemini" in m.get("name", "").lower()
+        )
+    if ptype == "ollama":
+        return sorted(m["name"] for m in data.get("models", []))
+    return sorted(m["id"] for m in data.get("data", []))
+
+
+async def _fetch(
+    source: tuple[str, str, str, str], entry: CatalogEntry | None,
+) -> tuple[CatalogEntry | None, str | None]:
+    """Fetch (or revalidate) a catalog. Returns (entry, error); entry is None when nothing is cacheable."""
+    _, ptype, api_key, base_url = source
+    request = _catalog_request(ptype, api_key, base_url)
+    if request is None:
+        return None, None
+    url, headers = request
+    if ptype == "custom" and await is_private_url(url):
+        return None, "Private/internal URLs are not allowed for non-Ollama providers"
+
+    fingerprint = _fingerprint(source)
+    if entry and entry.fingerprint == fingerprint:
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+    else:
+        entry = None
+
+    try:
+        resp = await get_http_client().get(url, headers=headers, timeout=_FETCH_TIMEOUT)
+        if resp.status_code == 304 and entry:
+            entry.fetched_at = time.time()
+            return entry, None
+        if resp.status_code != 200:
+            return None, None
+        models = _parse_models(ptype, resp.json())
+    except Exception as e:
+        return None, sanitize_error(e)
+    return CatalogEntry(
+        fingerprint,
+        models,
+        etag=resp.headers.get("etag", ""),
+        last_modified=resp.headers.get("last-modified", ""),
+    ), None
+
+
+async def _refresh(source: tuple[str, str, str, str]) -> tuple[CatalogEntry | None, str | None]:
+    provider_id = source[0]
+    entry, error = await _fetch(source, _entries.get(provider_id))
+    if entry is not None:
+        _entries[provider_id] = entry
+    return entry, error
+
+
+def _refresh_in_background(source: tuple[str, str, str, str]) -> None:
+    provider_id = source[0]
+    if provider_id in _refreshing:
+        return
+
+    async def run():
+        try:
+            _, error = await _refresh(source)
+            if error:
+                logger.warning(f"Model catalog refresh for '{provider_id}' failed: {error}")
+        finally:
+            _refreshing.pop(provider_id, None)
+
+    _refreshing[provider_id] = asyncio.create_task(run())
+
+
+async def get_model_catalog(provider: ProviderSetting, refresh: bool = False) -> dict:
+    """Model ids available from a provider, served from cache when possible.
+
+    Returns ``{"models": [...], "cached": bool, "fetched_at": float | None}``
+    plus ``"error"`` when the upstream call failed.
+    """
+    source = _source(provider)
+    if source[1] in _STATIC_CATALOGS:
+        return {"models": _STATIC_CATALOGS[source[1]], "cached": True, "fetched_at": None}
+    entry = _entries.get(provider.id)
+    if entry and entry.fingerprint != _fingerprint(source):
+        entry = None
+        _entries.pop(provider.id, None)
+
+    if entry and not refresh:
+        if entry.age() > get_settings().model_catalog_ttl_seconds:
+            _refresh_in_background(source)  # stale-while-revalidate
+        return {"models": entry.models, "cached": True, "fetched_at": entry.fetched_at}
+
+    entry, error = await _refresh(source)
+    entry = entry or _entries.get(provider.id)  # keep serving the last good list on failure
+    result = {
+        "models": entry.models if entry else [],
+        "cached": False,
+        "fetched_at": entry.fetched_at if entry else None,
+    }
+    if error:
+        result["error"] = error
+    return result
+
+
+def invalidate_model_catalog(provider_id: str) -> None:
+    _entries.pop(provider_id, None)
@@ -1,4 +1,5 @@
 import asyncio
+import importlib
 import random
 import re
 import time
@@ -8,36 +9,93 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.database import OcrModel, ProviderSetting, PromptSetting
 from app.models.schemas import OcrResult
-from app.ocr_providers.base import OcrProvider
-from app.ocr_providers.claude import ClaudeOcrProvider
-from app.ocr_providers.openai_gpt import OpenAIOcrProvider
-from app.ocr_providers.gemini import GeminiOcrProvider
-from app.ocr_providers.mistral import MistralOcrProvider
-from app.ocr_providers.ollama import OllamaOcrProvider
-from app.ocr_providers.custom import CustomOcrProvider
-from app.services.pdf_service import pdf_to_images_async
+from app.ocr_providers.base import DEFAULT_OCR_PROMPT, OcrProvider
+from app.ocr_providers.replay import RecordingOcrProvider
+from app.services.image_profiles import ImageProfile, profile_for
+from app.services.pdf_service import document_to_images_async, is_paged, iter_document_pages, pdf_page_count
+from app.services.preprocessing import PreprocessingOcrProvider, parse_preprocess_options
+from app.services.provider_health import HealthTrackingOcrProvider, get_health
+from app.services.rate_limiter import RateLimitedOcrProvider, get_rate_limiter
+from app.services.retry_policy import RetryingOcrProvider
+from app.services.tiling import TilingOcrProvider, parse_tiling_options
 from app.config import get_settings
 from app.services.postprocessors import apply_postprocessor, strip_code_fences
+from app.utils.spool import Buffer
 
+# "module:Class" per provider type. Classes (and their SDKs) are imported on
+# first use, so a worker only pays for the providers it actually calls.
 PROVIDER_MAP = {
-    "claude": ClaudeOcrProvider,
-    "openai": OpenAIOcrProvider,
-    "gemini": GeminiOcrProvider,
-    "mistral": MistralOcrProvider,
-    "ollama": OllamaOcrProvider,
-    "custom": CustomOcrProvider,
+    "claude": "app.ocr_providers.claude:ClaudeOcrProvider",
+    "openai": "app.ocr_providers.openai_gpt:OpenAIOcrProvider",
+    "gemini": "app.ocr_providers.gemini:GeminiOcrProvider",
+    "mistral": "app.ocr_providers.mistral:MistralOcrProvider",
+    "ollama": "app.ocr_providers.ollama:OllamaOcrProvider",
+    "custom": "app.ocr_providers.custom:CustomOcrProvider",
+    "replay": "app.ocr_providers.replay:ReplayOcrProvider",
+    "pdf_text": "app.ocr_providers.pdf_text:PdfTextOcrProvider",
 }
 
+# Synthetic providers for benchmarks; only resolvable when enabled in settings
+_MOCK_PROVIDER_PATH = "app.ocr_providers.mock:MockOcrProvider"
 
-async def _resolve_credentials(db: AsyncSession, model: OcrModel) -> tuple[str, str, str]:
+# Whole-PDF requests: ceiling for a page-scaled default output cap (the Anthropic
+# SDK refuses much larger non-streaming requests), and the page separator rule
+_NATIVE_PDF_MAX_OUTPUT_TOKENS = 16384
+_NATIVE_PDF_PAGE_RULE = (
+    "\n\nThe document has {pages} pages. Start the content of every page after the first "
+    "with a line containing only ---, a blank line, then <!-- Page N --> where N is the page number."
+)
+
+_provider_classes: dict[str, type[OcrProvider]] = {}
+
+
+def _provider_path(provider_name: str) -> str | None:
+    if provider_name == "mock" and get_settings().enable_mock_provider:
+        return _MOCK_PROVIDER_PATH
+    return PROVIDER_MAP.get(provider_name)
+
+
+def get_provider_class(provider_name: str) -> type[OcrProvider]:
+    """Import and return the provider class registered for a provider type."""
+    cls = _provider_classes.get(provider_name)
+    if cls is None:
+        path = _provider_path(provider_name)
+        if not path:
+            raise ValueError(f"Unknown provider: {provider_name}")
+        module_name, class_name = path.split(":")
+        cls = _provider_classes[provider_name] = getattr(importlib.import_module(module_name), class_name)
+    return cls
+
+
+async def preload_provider_classes(db: AsyncSession) -> list[str]:
+    """Import the providers used by active models, so the first battle doesn't pay for it."""
+    result = await db.execute(
+        select(OcrModel.provider, ProviderSetting.provider_type)
+        .outerjoin(ProviderSetting, ProviderSetting.id == OcrModel.provider)
+        .where(OcrModel.is_active.is_(True))
+        .distinct()
+    )
+    loaded = []
+    for provider_id, provider_type in result.all():
+        name = provider_type or provider_id
+        if _provider_path(name) and name not in loaded:
+            get_provider_class(name)
+            loaded.append(name)
+    return loaded
+
+
+async def _load_provider_setting(db: AsyncSession, model: OcrModel) -> ProviderSetting | None:
+    result = await db.execute(
+        select(ProviderSetting).where(ProviderSetting.id == model.provider)
+    )
+    return result.scalar_one_or_none()
+
+
+def _resolve_credentials(model: OcrModel, ps: ProviderSetting | None) -> tuple[str, str, str]:
     """Returns (api_key, base_url, provider_type)."""
     api_key = model.api_key or ""
     base_url = model.base_url or ""
     provider_type = model.provider  # fallback: use model.provider as type
-    result = await db.execute(
-        select(ProviderSetting).where(ProviderSetting.id == model.provider)
-    )
-    ps = result.scalar_one_or_none()
     if ps:
         provider_type = ps.provider_type or model.provider
         if not api_key:
@@ -69,7 +127,7 @@ async def _resolve_prompt(db: AsyncSession, model: OcrModel) -> str:
 
 
 # Config keys used internally, must NOT be passed to provider APIs
-_INTERNAL_CONFIG_KEYS = {"postprocessor"}
+_INTERNAL_CONFIG_KEYS = {"postprocessor", "preprocess", "image_profile", "native_pdf", "tiling"}
 
 # Allowed config keys that can be passed to provider APIs
 _ALLOWED_CONFIG_KEYS = {"temperature", "max_tokens", "max_completion_tokens", "top_p", "top_k", "seed"}
@@ -81,21 +139,115 @@ async def resolve_prompt(db: AsyncSession, model: OcrModel) -> str:
 
 
 def get_provider(provider_name: str, model_id: str, api_key: str = "", base_url: str = "", extra_config: dict | None = None) -> OcrProvider:
-    provider_cls = PROVIDER_MAP.get(provider_name)
-    if not provider_cls:
-        raise ValueError(f"Unknown provider: {provider_name}")
+    provider_cls = get_provider_class(provider_name)
     # Strip internal keys and only allow whitelisted keys
     if extra_config:
         extra_config = {k: v for k, v in extra_config.items()
                         if k not in _INTERNAL_CONFIG_KEYS and k in _ALLOWED_CONFIG_KEYS}
-    return provider_cls(model_id=model_id, api_key=api_key, base_url=base_url, extra_config=extra_config)
+    provider = provider_cls(model_id=model_id, api_key=api_key, base_url=base_url, extra_config=extra_config)
+    settings = get_settings()
+    if settings.record_ocr_streams and provider_name != "replay":
+        provider = RecordingOcrProvider(provider, model_id, settings.ocr_recordings_dir)
+    return provider
+
+
+async def resolve_image_profile(db: AsyncSession, model: OcrModel) -> ImageProfile | None:
+    """Image profile a model's calls are resized and estimated with."""
+    ps = await _load_provider_setting(db, model)
+    _, _, provider_type = _resolve_credentials(model, ps)
+    return profile_for(provider_type, model.model_id, model.config if isinstance(model.config, dict) else None)
 
 
-async def select_random_models(db: AsyncSession, count: int = 2) -> list[OcrModel]:
-    result = await db.execute(select(OcrModel).where(OcrModel.is_active == True))
-    models = list(result.scalars().all())
+async def _build_provider(
+    model: OcrModel,
+    db: AsyncSession | None,
+    prompt_override: str | None,
+    temperature_override: float | None,
+) -> tuple[OcrProvider, str, dict]:
+    """Resolve credentials, prompt and config for a model. Returns (provider, prompt, extra_config)."""
+    ps = None
+    prompt = ""
+    if db:
+        ps = await _load_provider_setting(db, model)
+        prompt = await _resolve_prompt(db, model)
+    api_key, base_url, provider_type = _resolve_credentials(model, ps)
+
+    if prompt_override is not None:
+        prompt = prompt_override
+
+    extra_config = dict(model.config) if isinstance(model.config, dict) else {}
+    if temperature_override is not None:
+        extra_config["temperature"] = temperature_override
+
+    provider = get_provider(provider_type, model.model_id, api_key, base_url, extra_config)
+
+    # Whole-PDF requests are opt-in per model ("native_pdf": true) except for local providers
+    if extra_config.get("native_pdf") is None:
+        extra_config["native_pdf"] = provider.native_pdf_default
+    extra_config["native_pdf_max_bytes"] = provider.native_pdf_max_bytes
+
+    # Shrink/re-encode images right before upload. The rate limiter below still sees the
+    # original image, but ImageProfile.tokens applies the same fit as the auto-resize
+    # (a smaller "preprocess" max_edge is not reflected, so those estimates err high).
+    image_profile = profile_for(provider_type, model.model_id, extra_config)
+    preprocess = parse_preprocess_options(extra_config.get("preprocess"))
+    resize_profile = image_profile if get_settings().image_auto_resize else None
+    if preprocess or resize_profile:
+        provider = PreprocessingOcrProvider(provider, model.id, preprocess, resize_profile)
+
+    # Shared per-provider RPM/TPM budget (0 = unlimited, usage is still metered)
+    if ps:
+        limiter = get_rate_limiter(ps.id, ps.rpm_limit or 0, ps.tpm_limit or 0)
+        provider = RateLimitedOcrProvider(provider, limiter, image_profile)
+        # Outermost, so every retry and hedge also waits for rate-limit capacity
+        if ps.max_retries or ps.hedge_requests:
+            provider = RetryingOcrProvider(
+                provider, model.id, ps.max_retries or 0, ps.retry_backoff_ms or 0, bool(ps.hedge_requests),
+            )
+
+    # Over-long images are split here, so every tile is resized, rate limited and retried on its own
+    tiling = parse_tiling_options(extra_config.get("tiling"))
+    if tiling:
+        provider = TilingOcrProvider(provider, model.id, tiling)
+
+    # Final outcome of each call (after retries) feeds the provider's circuit breaker
+    provider = HealthTrackingOcrProvider(provider, model.provider)
+    return provider, prompt, extra_config
+
+
+class NoHealthyModelsError(ValueError):
+    """Enough models are active, but too many are excluded by open provider circuits."""
+
+
+def _reads_mime(provider_type: str, mime_type: str) -> bool:
+    """Whether a provider type can read documents of this type (PDF-only providers can't read images)."""
+    if mime_type == "application/pdf" or not _provider_path(provider_type):
+        return True
+    return not get_provider_class(provider_type).pdf_only
+
+
+async def select_random_models(db: AsyncSession, count: int = 2, mime_type: str | None = None) -> list[OcrModel]:
+    result = await db.execute(
+        select(OcrModel, ProviderSetting.provider_type)
+        .outerjoin(ProviderSetting, ProviderSetting.id == OcrModel.provider)
+        .where(OcrModel.is_active.is_(True))
+    )
+    rows = result.all()
+    if len(rows) < count:
+        raise ValueError(f"Not enough active models. Need {count}, have {len(rows)}")
+
+    # Skip models whose provider can't read the document (e.g. the PDF text layer for images)
+    if mime_type:
+        rows = [(m, provider_type) for m, provider_type in rows if _reads_mime(provider_type or m.provider, mime_type)]
+        if len(rows) < count:
+            raise ValueError(f"Not enough active models for {mime_type}. Need {count}, have {len(rows)}")
+    models = [m for m, _ in rows]
+
+    # Skip models whose provider circuit is open (failing until a probe succeeds)
+    health = get_health()
+    models = [m for m in models if health.is_available(m.provider)]
     if len(models) < count:
-        raise ValueError(f"Not enough active models. Need {count}, have {len(models)}")
+        raise NoHealthyModelsError(f"Not enough healthy models. Need {count}, have {len(models)}")
 
     # Weighted selection: models with fewer battles get higher weight
     max_battles = max((m.total_battles for m in models), default=0)
@@ -114,37 +266,27 @@ async def select_random_models(db: AsyncSession, count: int = 2) -> list[OcrMode
 
 async def run_ocr(
     model: OcrModel,
-    image_data: bytes,
+    image_data: Buffer,
     mime_type: str,
     db: AsyncSession | None = None,
     prompt_override: str | None = None,
     temperature_override: float | None = None,
 ) -> OcrResult:
-    api_key = model.api_key or ""
-    base_url = model.base_url or ""
-    provider_type = model.provider
-    prompt = ""
-
-    if db:
-        api_key, base_url, provider_type = await _resolve_credentials(db, model)
-        prompt = await _resolve_prompt(db, model)
-
-    if prompt_override is not None:
-        prompt = prompt_override
-
-    extra_config = dict(model.config) if isinstance(model.config, dict) else {}
-    if temperature_override is not None:
-        extra_config["temperature"] = temperature_override
-
-    provider = get_provider(provider_type, model.model_id, api_key, base_url, extra_config)
+    provider, prompt, extra_config = await _build_provider(model, db, prompt_override, temperature_override)
 
     # Resolve postprocessor from model config
     postprocessor_name = extra_config.get("postprocessor", "")
 
-    # Handle PDF: split into pages, OCR each, merge
-    if mime_type == "application/pdf":
+    # Handle PDF/TIFF: sent whole when the model takes PDFs, else split into pages, OCR each, merge
+    native_pages = await _native_pdf_pages(image_data, mime_type, extra_config)
+    if native_pages:
+        prompt = _prepare_native_pdf(provider, prompt, extra_config, native_pages)
+        result = await provider.process_image(image_data, mime_type, prompt)
+    elif is_paged(mime_type):
         settings = get_settings()
-        result = await _run_ocr_pdf(provider, image_data, prompt, settings.pdf_dpi, settings.max_pdf_pages)
+        result = await _run_ocr_pages(
+            provider, image_data, mime_type, prompt, settings.pdf_dpi, settings.max_pdf_pages,
+        )
     else:
         result = await provider.process_image(image_data, mime_type, prompt)
 
@@ -163,19 +305,50 @@ async def run_ocr(
     return result
 
 
-async def _run_ocr_pdf(
-    provider: OcrProvider, pdf_data: bytes, prompt: str,
+async def _native_pdf_pages(data: Buffer, mime_type: str, extra_config: dict) -> int:
+    """Page count of a PDF that goes to the provider as-is (one request), else 0 (page by page)."""
+    if mime_type != "application/pdf" or not extra_config.get("native_pdf"):
+        return 0
+    max_bytes = extra_config.get("native_pdf_max_bytes") or 0
+    if max_bytes and len(data) > max_bytes:
+        return 0
+    # Over-long PDFs take the page path, which reports the page limit
+    try:
+        pages = await asyncio.to_thread(pdf_page_count, data)
+    except Exception:
+        return 0
+    return pages if 0 < pages <= get_settings().max_pdf_pages else 0
+
+
+def _prepare_native_pdf(provider: OcrProvider, prompt: str, extra_config: dict, pages: int) -> str:
+    """Fit a whole-PDF request to its page count; returns the prompt to send.
+
+    A provider-default output cap (``max_tokens`` the model config did not
+    set) is sized for one page, so it is scaled by the page count. The prompt
+    asks for the same page separators the page-by-page path inserts.
+    """
+    if pages < 2:
+        return prompt
+    provider_config = provider.extra_config
+    default_cap = provider_config.get("max_tokens")
+    if isinstance(default_cap, int) and not extra_config.get("max_tokens"):
+        provider_config["max_tokens"] = min(default_cap * pages, _NATIVE_PDF_MAX_OUTPUT_TOKENS)
+    return (prompt or DEFAULT_OCR_PROMPT) + _NATIVE_PDF_PAGE_RULE.format(pages=pages)
+
+
+async def _run_ocr_pages(
+    provider: OcrProvider, data: Buffer, mime_type: str, prompt: str,
     dpi: float = 216.0, max_pages: int = 50,
 ) -> OcrResult:
-    """Split PDF into page images, OCR each page in parallel, merge results."""
+    """Split a PDF/TIFF into page images, OCR each page in parallel, merge results."""
     start = time.time()
     try:
-        pages = await pdf_to_images_async(pdf_data, dpi=dpi, max_pages=max_pages)
+        pages = await document_to_images_async(data, mime_type, dpi=dpi, max_pages=max_pages)
     except Exception as e:
-        return OcrResult(text="", latency_ms=0, error=f"PDF conversion failed: {e}")
+        return OcrResult(text="", latency_ms=0, error=f"Page conversion failed: {e}")
 
     if not pages:
-        return OcrResult(text="", latency_ms=0, error="PDF has no pages")
+        return OcrResult(text="", latency_ms=0, error="Document has no pages")
 
     # Process first page alone to fail fast on auth/config errors
     first_result = await provider.process_image(pages[0][0], pages[0][1], prompt)
@@ -183,9 +356,15 @@ async def _run_ocr_pdf(
         latency = int((time.time() - start) * 1000)
         return OcrResult(text="", latency_ms=latency, error=first_result.error)
 
-    # First page succeeded — process remaining pages in parallel
+    # First page succeeded — process remaining pages in parallel (bounded fan-out)
     if len(pages) > 1:
-        remaining_tasks = [provider.process_image(img_bytes, img_mime, prompt) for img_bytes, img_mime in pages[1:]]
+        page_sem = asyncio.Semaphore(get_settings().pdf_page_concurrency)
+
+        async def _process_page(img_bytes: bytes, img_mime: str) -> OcrResult:
+            async with page_sem:
+                return await provider.process_image(img_bytes, img_mime, prompt)
+
+        remaining_tasks = [_process_page(img_bytes, img_mime) for img_bytes, img_mime in pages[1:]]
         remaining_results = await asyncio.gather(*remaining_tasks, return_exceptions=True)
         results = [first_result, *remaining_results]
     else:
@@ -267,7 +446,7 @@ async def _strip_stream_fences(
 
 async def run_ocr_stream(
     model: OcrModel,
-    image_data: bytes,
+    image_data: Buffer,
     mime_type: str,
     db: AsyncSession | None = None,
     prompt_override: str | None = None,
@@ -275,42 +454,39 @@ async def run_ocr_stream(
 ) -> AsyncGenerator[str, None]:
     """Yield text chunks as the provider streams tokens.
 
-    Streams for all inputs including PDFs (page-by-page sequential).
+    Streams for all inputs including PDFs and TIFFs (page-by-page sequential,
+    or the whole PDF in one request when the provider accepts PDFs).
     Code fences are stripped in real-time per page/image.
     Model-specific postprocessors are NOT applied here — callers handle that
     separately via replace events after full collection.
     """
-    api_key = model.api_key or ""
-    base_url = model.base_url or ""
-    provider_type = model.provider
-    prompt = ""
-
-    if db:
-        api_key, base_url, provider_type = await _resolve_credentials(db, model)
-        prompt = await _resolve_prompt(db, model)
-
-    if prompt_override is not None:
-        prompt = prompt_override
-
-    extra_config = dict(model.config) if isinstance(model.config, dict) else {}
-    if temperature_override is not None:
-        extra_config["temperature"] = temperature_override
+    provider, prompt, extra_config = await _build_provider(model, db, prompt_override, temperature_override)
 
-    provider = get_provider(provider_type, model.model_id, api_key, base_url, extra_config)
-
-    if mime_type == "application/pdf":
+    native_pages = await _native_pdf_pages(image_data, mime_type, extra_config)
+    if native_pages:
+        prompt = _prepare_native_pdf(provider, prompt, extra_config, native_pages)
+        raw = provider.process_image_stream(image_data, mime_type, prompt)
+        async for chunk in _strip_stream_fences(raw):
+            yield chunk
+    elif is_paged(mime_type):
         _settings = get_settings()
-        pages = await pdf_to_images_async(
-            pdf_data=image_data, dpi=_settings.pdf_dpi, max_pages=_settings.max_pdf_pages
+        # Pages are rendered lazily while the previous one streams
+        pages = iter_document_pages(
+            image_data, mime_type, dpi=_settings.pdf_dpi, max_pages=_settings.max_pdf_pages,
         )
-        if not pages:
-            raise RuntimeError("PDF has no pages")
-        for page_idx, (page_bytes, page_mime) in enumerate(pages):
-            if page_idx > 0:
-                yield f"\n\n---\n\n<!-- Page {page_idx + 1} -->\n\n"
-            raw = provider.process_image_stream(page_bytes, page_mime, prompt)
-            async for chunk in _strip_stream_fences(raw):
-                yield chunk
+        page_idx = -1
+        try:
+            async for page_bytes, page_mime in pages:
+                page_idx += 1
+                if page_idx > 0:
+                    yield f"\n\n---\n\n<!-- Page {page_idx + 1} -->\n\n"
+                raw = provider.process_image_stream(page_bytes, page_mime, prompt)
+                async for chunk in _strip_stream_fences(raw):
+                    yield chunk
+        finally:
+            await pages.aclose()
+        if page_idx < 0:
+            raise RuntimeError("Document has no pages")
     else:
         raw = provider.process_image_stream(image_data, mime_type, prompt)
         async for chunk in _strip_stream_fences(raw):
@@ -1,32 +1,176 @@
-"""Convert PDF files to a list of page images using pypdfium2."""
+"""Split paged documents into page images: PDFs via pypdfium2, TIFFs via Pillow.
+
+PDF pages are rendered at ``dpi``. Frames of multi-page images (TIFF
+scans) and formats most vendors reject (TIFF, BMP) are transcoded to PNG
+at their native resolution. Either way each page reaches providers as a
+separate, widely supported image.
+"""
 import io
 import asyncio
+from collections.abc import AsyncGenerator
+
 import pypdfium2 as pdfium
 
+from app.utils.spool import Buffer, BufferReader
 
-def pdf_to_images(pdf_data: bytes, dpi: float = 216.0, max_pages: int = 50) -> list[tuple[bytes, str]]:
-    """Convert PDF bytes to a list of (png_bytes, mime_type) per page."""
-    pdf = pdfium.PdfDocument(pdf_data)
-    n_pages = len(pdf)
+# Documents split into pages (and transcoded) before OCR; other images go to providers as-is
+PAGED_MIME_TYPES = {"application/pdf", "image/tiff", "image/bmp"}
+
+
+def is_paged(mime_type: str) -> bool:
+    return mime_type in PAGED_MIME_TYPES
+
+
+def _check_page_count(n_pages: int, max_pages: int, kind: str) -> None:
     if n_pages > max_pages:
-        pdf.close()
         raise ValueError(
-            f"PDF has {n_pages} pages, exceeding the maximum of {max_pages}. "
+            f"{kind} has {n_pages} pages, exceeding the maximum of {max_pages}. "
             "Please reduce the number of pages."
         )
-    scale = dpi / 72.0
-    pages = []
-    for i in range(n_pages):
-        page = pdf[i]
-        bitmap = page.render(scale=scale)
-        pil_image = bitmap.to_pil()
+
+
+class _PdfPages:
+    def __init__(self, data: Buffer, max_pages: int):
+        # pdfium takes bytes as-is; memory-mapped uploads are read through a file object
+        source = data if isinstance(data, bytes) else BufferReader(data)
+        self._pdf = pdfium.PdfDocument(source)
+        try:
+            _check_page_count(len(self._pdf), max_pages, "PDF")
+        except ValueError:
+            self._pdf.close()
+            raise
+
+    def __len__(self) -> int:
+        return len(self._pdf)
+
+    def render(self, index: int, dpi: float) -> tuple[bytes, str]:
+        pil_image = self._pdf[index].render(scale=dpi / 72.0).to_pil()
         buf = io.BytesIO()
         pil_image.save(buf, format="PNG")
-        pages.append((buf.getvalue(), "image/png"))
-    pdf.close()
-    return pages
+        return buf.getvalue(), "image/png"
+
+    def close(self) -> None:
+        self._pdf.close()
+
+
+def normalize_frame(frame):
+    """A PIL frame in a mode PNG (and every provider) takes: 16-bit scans scaled to 8-bit grayscale."""
+    if frame.mode in ("I;16", "I;16B", "I;16L", "I"):
+        return frame.convert("I").point(lambda v: v * (1 / 256)).convert("L")  # 16-bit scans
+    if frame.mode not in ("1", "L", "LA", "RGB", "RGBA", "P"):
+        return frame.convert("RGB")  # CMYK, YCbCr, ...
+    return frame
+
+
+class _ImageFrames:
+    def __init__(self, data: Buffer, max_pages: int):
+        from PIL import Image
+
+        self._image = Image.open(BufferReader(data))
+        self._count = getattr(self._image, "n_frames", 1)
+        try:
+            _check_page_count(self._count, max_pages, "Image")
+        except ValueError:
+            self._image.close()
+            raise
+
+    def __len__(self) -> int:
+        return self._count
+
+    def render(self, index: int, dpi: float) -> tuple[bytes, str]:
+        # Frames are already raster; dpi does not apply
+        self._image.seek(index)
+        frame = normalize_frame(self._image)
+        buf = io.BytesIO()
+        frame.save(buf, format="PNG")
+        return buf.getvalue(), "image/png"
+
+    def close(self) -> None:
+        self._image.close()
+
+
+def pdf_page_count(data: Buffer) -> int:
+    pdf = pdfium.PdfDocument(data if isinstance(data, bytes) else BufferReader(data))
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def pdf_page_sizes(data: Buffer, dpi: float = 216.0) -> list[tuple[int, int]]:
+    """Pixel size of every page as if rendered at ``dpi`` (nothing is rendered)."""
+    pdf = pdfium.PdfDocument(data if isinstance(data, bytes) else BufferReader(data))
+    try:
+        sizes = []
+        for i in range(len(pdf)):
+            width, height = pdf.get_page_size(i)
+            sizes.append((round(width * dpi / 72.0), round(height * dpi / 72.0)))
+        return sizes
+    finally:
+        pdf.close()
+
+
+def _open_pages(data: Buffer, mime_type: str, max_pages: int) -> _PdfPages | _ImageFrames:
+    if mime_type == "application/pdf":
+        return _PdfPages(data, max_pages)
+    return _ImageFrames(data, max_pages)
+
+
+def document_to_images(
+    data: Buffer, mime_type: str, dpi: float = 216.0, max_pages: int = 50,
+) -> list[tuple[bytes, str]]:
+    """Convert a paged document to a list of (png_bytes, mime_type) per page."""
+    pages = _open_pages(data, mime_type, max_pages)
+    try:
+        return [pages.render(i, dpi) for i in range(len(pages))]
+    finally:
+        pages.close()
+
+
+async def document_to_images_async(
+    data: Buffer, mime_type: str, dpi: float = 216.0, max_pages: int = 50,
+) -> list[tuple[bytes, str]]:
+    """Async wrapper — offloads CPU-heavy rendering to a thread."""
+    return await asyncio.to_thread(document_to_images, data, mime_type, dpi, max_pages)
+
+
+async def iter_document_pages(
+    data: Buffer, mime_type: str, dpi: float = 216.0, max_pages: int = 50,
+) -> AsyncGenerator[tuple[bytes, str], None]:
+    """Render pages lazily, one ahead of the consumer.
+
+    Only the page being consumed and the next one are held in memory, so a
+    long document streams with flat RSS instead of rendering every page up front.
+    """
+    pages = await asyncio.to_thread(_open_pages, data, mime_type, max_pages)
+    pending: asyncio.Task | None = None
+    try:
+        n_pages = len(pages)
+        if n_pages:
+            pending = asyncio.create_task(asyncio.to_thread(pages.render, 0, dpi))
+        for i in range(n_pages):
+            page = await pending
+            pending = None
+            if i + 1 < n_pages:
+                pending = asyncio.create_task(asyncio.to_thread(pages.render, i + 1, dpi))
+            yield page
+    finally:
+        if pending is not None:
+            # Let an in-progress render finish before the document is closed
+            await asyncio.gather(pending, return_exceptions=True)
+        pages.close()
+
+
+def pdf_to_images(pdf_data: Buffer, dpi: float = 216.0, max_pages: int = 50) -> list[tuple[bytes, str]]:
+    """Convert PDF bytes to a list of (png_bytes, mime_type) per page."""
+    return document_to_images(pdf_data, "application/pdf", dpi, max_pages)
+
+
+async def pdf_to_images_async(pdf_data: Buffer, dpi: float = 216.0, max_pages: int = 50) -> list[tuple[bytes, str]]:
+    return await document_to_images_async(pdf_data, "application/pdf", dpi, max_pages)
 
 
-async def pdf_to_images_async(pdf_data: bytes, dpi: float = 216.0, max_pages: int = 50) -> list[tuple[bytes, str]]:
-    """Async wrapper — offloads CPU-heavy PDF rendering to a thread."""
-    return await asyncio.to_thread(pdf_to_images, pdf_data, dpi, max_pages)
+def iter_pdf_pages(
+    pdf_data: Buffer, dpi: float = 216.0, max_pages: int = 50,
+) -> AsyncGenerator[tuple[bytes, str], None]:
+    return iter_document_pages(pdf_data, "application/pdf", dpi, max_pages)
@@ -0,0 +1,213 @@
+"""Per-model image preprocessing before upload to providers.
+
+By default every page is sent exactly as rendered (a PNG at ``pdf_dpi``) or
+uploaded (raw phone photos included). A model opts in with a ``preprocess``
+object in its config:
+
+    {"preprocess": {"max_edge": 2048, "grayscale": true, "trim": true,
+                    "format": "jpeg", "quality": 85}}
+
+- ``max_edge``: downscale so the long edge is at most this many pixels.
+- ``grayscale``: drop colour.
+- ``trim``: crop uniform margins (the colour of the top-left pixel).
+- ``format``: re-encode as "jpeg", "webp" or "png".
+- ``quality``: 1-100, for jpeg/webp.
+
+Images are EXIF-rotated first. A pure re-encode that comes out larger
+than the input keeps the original. Bytes in/out are counted per model for
+GET /api/admin/preprocessing, so payload size can be weighed against each
+model's OCR accuracy.
+
+Independently of ``preprocess``, images larger than the provider makes
+use of (its ``ImageProfile``) are downscaled to that size when
+``image_auto_resize`` is on (off by default). Images that already fit pass through
+without being decoded.
+"""
+import asyncio
+import io
+from collections.abc import AsyncGenerator
+
+from loguru import logger
+
+from app.models.schemas import OcrResult
+from app.ocr_providers.base import OcrProvider
+from app.services.image_profiles import ImageProfile
+from app.utils.spool import Buffer, BufferReader
+
+# format -> (PIL format, mime type)
+_FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+    "png": ("PNG", "image/png"),
+}
+_OPTION_KEYS = {"max_edge", "grayscale", "trim", "format", "quality"}
+_TRIM_THRESHOLD = 16  # per-channel difference from the margin colour still counted as margin
+_TRIM_PADDING = 8  # px kept around the trimmed content
+
+# Resize-only defaults, used when a model has an image profile but no preprocess config
+_DEFAULT_OPTIONS = {"max_edge": 0, "grayscale": False, "trim": False, "format": "", "quality": 90}
+
+_stats: dict[str, dict[str, int]] = {}
+
+
+def parse_preprocess_options(raw: object) -> dict | None:
+    """Validate a model's ``preprocess`` config. Returns None when preprocessing is off."""
+    if not raw:
+        return None
+    if not isinstance(raw, dict):
+        raise ValueError("preprocess must be an object")
+    unknown = set(raw) - _OPTION_KEYS
+    if unknown:
+        raise ValueError(f"Unknown preprocess option(s): {', '.join(sorted(unknown))}")
+
+    if isinstance(raw.get("max_edge"), bool):
+        raise ValueError("preprocess.max_edge must be a positive integer")
+    if isinstance(raw.get("quality"), bool):
+        raise ValueError("preprocess.quality must be between 1 and 100")
+
+    options: dict = {
+        "max_edge": raw.get("max_edge") or 0,
+        "grayscale": bool(raw.get("grayscale")),
+        "trim": bool(raw.get("trim")),
+        "format": raw.get("format") or "",
+        "quality": raw.get("quality", 85),
+    }
+    if not isinstance(options["max_edge"], int) or options["max_edge"] < 0:
+        raise ValueError("preprocess.max_edge must be a positive integer")
+    if options["format"] and options["format"] not in _FORMATS:
+        raise ValueError(f"preprocess.format must be one of: {', '.join(_FORMATS)}")
+    if not isinstance(options["quality"], int) or not 1 <= options["quality"] <= 100:
+        raise ValueError("preprocess.quality must be between 1 and 100")
+    if not (options["max_edge"] or options["grayscale"] or options["trim"] or options["format"]):
+        return None
+    return options
+
+
+def _trim_margins(image):
+    from PIL import Image, ImageChops
+
+    rgb = image.convert("RGB")
+    background = Image.new("RGB", rgb.size, rgb.getpixel((0, 0)))
+    diff = ImageChops.difference(rgb, background).convert("L")
+    bbox = diff.point(lambda v: 255 if v > _TRIM_THRESHOLD else 0).getbbox()
+    if not bbox:
+        return image  # blank page
+    left, top, right, bottom = bbox
+    return image.crop((
+        max(0, left - _TRIM_PADDING),
+        max(0, top - _TRIM_PADDING),
+        min(image.width, right + _TRIM_PADDING),
+        min(image.height, bottom + _TRIM_PADDING),
+    ))
+
+
+def _target_size(size: tuple[int, int], options: dict, profile: ImageProfile | None) -> tuple[int, int]:
+    width, height = size
+    if options["max_edge"] and max(width, height) > options["max_edge"]:
+        scale = options["max_edge"] / max(width, height)
+        width, height = max(1, int(width * scale)), max(1, int(height * scale))
+    if profile:
+        width, height = profile.fit(width, height)
+    return width, height
+
+
+def preprocess_image(
+    image_data: Buffer, mime_type: str, options: dict | None, profile: ImageProfile | None = None,
+) -> tuple[Buffer, str]:
+    """Apply ``options`` and fit to ``profile``. Returns (data, mime_type); the input on failure."""
+    from PIL import Image, ImageOps
+
+    options = options or _DEFAULT_OPTIONS
+    try:
+        image = Image.open(BufferReader(image_data))  # reads the header only
+        # EXIF Orientation (camera photos); PNG can keep EXIF after the pixel data, so skip it there
+        rotated = image.format != "PNG" and image.getexif().get(0x0112, 1) != 1
+        resize_only = not (options["trim"] or options["grayscale"] or options["format"] or rotated)
+        if resize_only and _target_size(image.size, options, profile) == image.size:
+            return image_data, mime_type
+        image.load()
+    except Exception:
+        return image_data, mime_type  # not an image PIL can decode; send as-is
+
+    original_size, original_mode = image.size, image.mode
+    if rotated:
+        image = ImageOps.exif_transpose(image)
+    if options["trim"]:
+        image = _trim_margins(image)
+    target = _target_size(image.size, options, profile)
+    if target != image.size:
+        image = image.resize(target, Image.Resampling.LANCZOS, reducing_gap=3.0)
+    if options["grayscale"]:
+        image = image.convert("LA" if "A" in image.getbands() else "L")
+
+    fmt = options["format"] or ("png" if mime_type == "image/png" else "jpeg")
+    pil_format, out_mime = _FORMATS[fmt]
+    if fmt == "jpeg" and image.mode not in ("RGB", "L"):
+        # JPEG has no alpha: flatten onto white
+        flat = Image.new("RGB", image.size, "white")
+        rgba = image.convert("RGBA")
+        flat.paste(rgba, mask=rgba.getchannel("A"))
+        image = flat.convert("L") if options["grayscale"] else flat
+    elif image.mode not in ("RGB", "RGBA", "L", "LA"):
+        image = image.convert("RGB")
+
+    buf = io.BytesIO()
+    if fmt == "png":
+        # optimize is several times slower; only worth it when PNG was asked for explicitly
+        save_kwargs = {"optimize": bool(options["format"])}
+    else:
+        save_kwargs = {"quality": options["quality"]}
+    image.save(buf, format=pil_format, **save_kwargs)
+    encoded = buf.getvalue()
+
+    unchanged = not rotated and image.size == original_size and image.mode == original_mode
+    if unchanged and len(encoded) >= len(image_data):
+        return image_data, mime_type
+    return encoded, out_mime
+
+
+def _record(model_id: str, bytes_in: int, bytes_out: int) -> None:
+    stats = _stats.setdefault(model_id, {"images": 0, "bytes_in": 0, "bytes_out": 0})
+    stats["images"] += 1
+    stats["bytes_in"] += bytes_in
+    stats["bytes_out"] += bytes_out
+
+
+def preprocessing_stats() -> dict[str, dict]:
+    """Bytes in/out of preprocessing per model id, since startup."""
+    return {
+        model_id: {
+            **stats,
+            "bytes_saved": stats["bytes_in"] - stats["bytes_out"],
+            "ratio": round(stats["bytes_out"] / stats["bytes_in"], 3) if stats["bytes_in"] else None,
+        }
+        for model_id, stats in _stats.items()
+    }
+
+
+class PreprocessingOcrProvider(OcrProvider):
+    """Wraps a provider so every image is preprocessed (in a worker thread) before upload."""
+
+    def __init__(self, inner: OcrProvider, model_id: str, options: dict | None, profile: ImageProfile | None = None):
+        self.inner = inner
+        self.model_id = model_id
+        self.options = options
+        self.profile = profile
+        self.extra_config = inner.extra_config
+
+    async def _prepare(self, image_data: Buffer, mime_type: str) -> tuple[Buffer, str]:
+        data, mime = await asyncio.to_thread(preprocess_image, image_data, mime_type, self.options, self.profile)
+        _record(self.model_id, len(image_data), len(data))
+        logger.debug(f"Preprocessed image for {self.model_id}: {len(image_data)} -> {len(data)} bytes ({mime})")
+        return data, mime
+
+    async def process_image(self, image_data: bytes, mime_type: str, prompt: str = "") -> OcrResult:
+        data, mime = await self._prepare(image_data, mime_type)
+        return await self.inner.process_image(data, mime, prompt)
+
+    async def process_image_stream(
+        self, image_data: bytes, mime_type: str, prompt: str = ""
+    ) -> AsyncGenerator[str, None]:
+        data, mime = await self._prepare(image_data, mime_type)
+        async for chunk in self.inner.process_image_stream(data, mime, prompt):
+            yield chunk
@@ -0,0 +1,183 @@
+"""WebP thumbnails and page previews, cached by document hash.
+
+Browsing sample documents and showing a battle's document only needs a
+small image, not the full file. A "thumb" is 256 px on its long edge and a
+"preview" is 1280 px. Both are rendered once per (sha256, page, size),
+kept in the shared state backend and served with a strong ETag derived
+from the hash, so browsers revalidate with a 304. The bytes are checked
+against that hash before rendering, so a file replaced after it was indexed
+never gets cached under its old hash.
+
+First-page thumbnails of sample documents are generated in the background
+as the document index picks them up. Battle uploads get theirs scheduled
+at /start. Upload previews expire with the document.
+"""
+import asyncio
+import hashlib
+import io
+import os
+import time
+from collections.abc import Awaitable, Callable
+
+import aiofiles
+from loguru import logger
+
+from app.config import get_settings
+from app.services.document_index import get_document_index
+from app.services.document_store import DOCUMENT_TTL
+from app.services.shared_state import get_shared_state
+from app.utils.spool import Buffer, BufferReader
+
+PREVIEW_SIZES = {"thumb": 256, "preview": 1280}
+SAMPLE_PREVIEW_TTL = 7 * 24 * 3600
+_NS = "preview"
+_WEBP_QUALITY = 80
+_RENDER_CONCURRENCY = 2
+
+_render_slots = asyncio.Semaphore(_RENDER_CONCURRENCY)
+_inflight: dict[str, asyncio.Future] = {}
+_background: set[asyncio.Task] = set()
+
+
+class PageNotFound(ValueError):
+    pass
+
+
+class DocumentChanged(ValueError):
+    """The loaded document no longer matches the hash its preview is keyed by."""
+
+
+def preview_etag(sha256: str, page: int, size: str) -> str:
+    return f'"{sha256[:32]}-{page}-{size}"'
+
+
+def _render_checked(data: Buffer, sha256: str, mime_type: str, page: int, max_edge: int) -> bytes:
+    if hashlib.sha256(data).hexdigest() != sha256:
+        raise DocumentChanged("Document content changed")
+    return _render(data, mime_type, page, max_edge)
+
+
+def _render(data: Buffer, mime_type: str, page: int, max_edge: int) -> bytes:
+    """Render one page (1-based) to WebP with its long edge at most ``max_edge`` px."""
+    if mime_type == "application/pdf":
+        import pypdfium2 as pdfium
+
+        pdf = pdfium.PdfDocument(data if isinstance(data, bytes) else BufferReader(data))
+        try:
+            if page > len(pdf):
+                raise PageNotFound(f"Document has {len(pdf)} pages")
+            pdf_page = pdf[page - 1]
+            width, height = pdf_page.get_size()
+            image = pdf_page.render(scale=min(4.0, max_edge / max(width, height, 1))).to_pil()
+        finally:
+            pdf.close()
+    else:
+        from PIL import Image
+
+        image = Image.open(BufferReader(data))
+        try:
+            image.seek(page - 1)
+        except EOFError:
+            raise PageNotFound(f"Document has {getattr(image, 'n_frames', 1)} pages")
+        image.draft("RGB", (max_edge, max_edge))  # JPEG: decode at a reduced scale
+        image.load()
+
+    if image.mode not in ("RGB", "RGBA", "L"):
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    image.thumbnail((max_edge, max_edge))
+    buf = io.BytesIO()
+    image.save(buf, format="WEBP", quality=_WEBP_QUALITY, method=4)
+    return buf.getvalue()
+
+
+async def get_preview(
+    sha256: str, page: int, size: str, mime_type: str,
+    load: Callable[[], Awaitable[Buffer | None]], ttl: float,
+) -> bytes | None:
+    """Cached WebP of a document page; ``load`` is only called on a cache miss.
+
+    Returns None when the document can't be loaded; raises PageNotFound for
+    pages past the end and DocumentChanged when the loaded bytes don't hash
+    to ``sha256``.
+    """
+    state = get_shared_state()
+    key = f"{sha256}:{page}:{size}"
+    cached = await state.get(_NS, key)
+    if cached is not None:
+        return cached
+
+    # Concurrent requests for the same preview share one render
+    pending = _inflight.get(key)
+    if pending is not None:
+        return await asyncio.shield(pending)
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        data = await load()
+        rendered = None
+        if data is not None:
+            async with _render_slots:
+                rendered = await asyncio.to_thread(
+                    _render_checked, data, sha256, mime_type, page, PREVIEW_SIZES[size],
+                )
+            await state.put(_NS, key, rendered, ttl=ttl)
+        future.set_result(rendered)
+        return rendered
+    except BaseException as e:
+        future.set_exception(e)
+        future.exception()  # mark retrieved when nobody else is waiting
+        raise
+    finally:
+        del _inflight[key]
+
+
+def schedule_previews(sha256: str, mime_type: str, load: Callable[[], Awaitable[Buffer | None]]) -> None:
+    """Render an upload's first-page thumbnail and preview in the background."""
+
+    async def run():
+        for size in PREVIEW_SIZES:
+            try:
+                await get_preview(sha256, 1, size, mime_type, load, ttl=DOCUMENT_TTL)
+            except Exception as e:
+                logger.debug(f"Preview of {sha256[:12]} failed: {e}")
+                return
+
+    task = asyncio.create_task(run())
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+async def read_sample(path: str) -> bytes | None:
+    """Read a sample document directly (previews must not churn the document store)."""
+    try:
+        async with aiofiles.open(path, "rb") as f:
+            return await f.read()
+    except OSError:
+        return None
+
+
+async def run_sample_thumbnails() -> None:
+    """Keep first-page thumbnails of all indexed sample documents warm."""
+    index = get_document_index()
+    interval = get_settings().document_index_poll_seconds
+    state = get_shared_state()
+    warm_until: dict[str, float] = {}  # sha256 -> time to re-check the cache
+    while True:
+        try:
+            for entry in list(index.search()[1]):
+                if not entry.sha256 or warm_until.get(entry.sha256, 0) > time.time():
+                    continue
+                if not await state.touch(_NS, f"{entry.sha256}:1:thumb", SAMPLE_PREVIEW_TTL):
+                    path = os.path.join(index.docs_dir, entry.name)
+                    try:
+                        await get_preview(
+                            entry.sha256, 1, "thumb", entry.mime,
+                            lambda path=path: read_sample(path), ttl=SAMPLE_PREVIEW_TTL,
+                        )
+                    except Exception as e:
+                        logger.debug(f"Thumbnail of {entry.name} failed: {e}")
+                warm_until[entry.sha256] = time.time() + SAMPLE_PREVIEW_TTL / 2
+        except Exception as e:
+            logger.warning(f"Sample thumbnail pass failed: {e}")
+        await asyncio.sleep(interval)
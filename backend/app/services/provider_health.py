@@ -0,0 +1,348 @@
+"""Provider health: connectivity checks and a circuit breaker per provider.
+
+Every OCR call reports its outcome here. Error rate and time-to-first-token
+are tracked as EWMAs per provider. When the error rate crosses the threshold
+the circuit opens and matchmaking stops picking that provider's models.
+After a cool-down a background monitor probes the provider (half-open) and
+closes the circuit again once the probe succeeds. Providers with nothing to
+probe stay half-open and the next real call closes or re-opens the circuit.
+"""
+import asyncio
+import time
+from collections.abc import AsyncGenerator
+
+import httpx
+from loguru import logger
+from sqlalchemy import select
+
+from app.config import get_settings
+from app.models.database import ProviderSetting, async_session
+from app.models.schemas import OcrResult
+from app.ocr_providers.base import OcrProvider
+from app.utils.error_sanitizer import sanitize_error
+from app.utils.url_guard import is_private_url
+
+# Provider types that require base_url connectivity
+URL_BASED_TYPES = {"ollama", "custom"}
+# Provider types that require api_key
+KEY_BASED_TYPES = {"claude", "openai", "gemini", "mistral"}
+
+_API_KEY_TIMEOUT = 10.0
+_URL_TIMEOUT = 5.0
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+_http_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Pooled client shared by all connectivity checks (closed on shutdown)."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=_API_KEY_TIMEOUT,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+async def check_providers(
+    providers: list[ProviderSetting], deadline: float,
+) -> AsyncGenerator[tuple[ProviderSetting, bool, str], None]:
+    """Check providers concurrently, yielding (provider, ok, message) as each finishes.
+
+    Providers still pending when ``deadline`` seconds have passed are reported
+    as timed out.
+    """
+    async def run(provider: ProviderSetting) -> tuple[ProviderSetting, bool, str]:
+        try:
+            ok, message = await check_provider(provider)
+        except Exception as e:
+            ok, message = False, f"Check failed: {sanitize_error(e)}"
+        return provider, ok, message
+
+    tasks = [asyncio.create_task(run(p)) for p in providers]
+    finished: set[str] = set()
+    try:
+        for next_done in asyncio.as_completed(tasks, timeout=deadline):
+            provider, ok, message = await next_done
+            finished.add(provider.id)
+            yield provider, ok, message
+    except TimeoutError:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+    for provider in providers:
+        if provider.id not in finished:
+            yield provider, False, f"Timed out (no answer within {deadline:g}s)"
+
+
+async def check_provider(provider: ProviderSetting) -> tuple[bool, str]:
+    """Run the connectivity check for a provider setting. Returns (ok, message)."""
+    ptype = provider.provider_type or provider.id
+    if ptype in URL_BASED_TYPES:
+        base_url = (provider.base_url or "").strip()
+        if not base_url:
+            return False, "Base URL is not configured"
+        return await check_url(base_url, ptype, (provider.api_key or "").strip())
+    if ptype in KEY_BASED_TYPES:
+        api_key = (provider.api_key or "").strip()
+        if not api_key:
+            return False, "API key is not configured"
+        return await check_api_key(ptype, api_key)
+    return True, "No connectivity check required"
+
+
+async def check_api_key(ptype: str, api_key: str) -> tuple[bool, str]:
+    """Test API key by making a real API call (list models)."""
+    try:
+        client = get_http_client()
+        if ptype == "openai":
+            resp = await client.get(
+                "https://api.openai.com/v1/models",
+                timeout=_API_KEY_TIMEOUT,
+                headers={"Authorization": f"Bearer {api_key}"},
+            )
+        elif ptype == "claude":
+            resp = await client.get(
+                "https://api.anthropic.com/v1/models",
+                timeout=_API_KEY_TIMEOUT,
+                headers={
+                    "x-api-key": api_key,
+                    "anthropic-version": "2023-06-01",
+                },
+            )
+        elif ptype == "gemini":
+            resp = await client.get(
+                f"https://generativelanguage.googleapis.com/v1beta/models?key={api_key}&pageSize=1",
+                timeout=_API_KEY_TIMEOUT,
+            )
+        elif ptype == "mistral":
+            resp = await client.get(
+                "https://api.mistral.ai/v1/models",
+                timeout=_API_KEY_TIMEOUT,
+                headers={"Authorization": f"Bearer {api_key}"},
+            )
+        else:
+            return True, "API key is set (no test available)"
+
+        if resp.status_code == 200:
+            return True, f"Connected (HTTP {resp.status_code})"
+        elif resp.status_code == 401:
+            return False, "Invalid API key (HTTP 401)"
+        elif resp.status_code == 403:
+            return False, "Access denied (HTTP 403)"
+        else:
+            return False, f"API error (HTTP {resp.status_code})"
+    except httpx.TimeoutException:
+        return False, "Connection timed out"
+    except Exception as e:
+        return False, f"Connection failed: {sanitize_error(e)}"
+
+
+async def check_url(base_url: str, ptype: str, api_key: str = "") -> tuple[bool, str]:
+    """Test connectivity to a base URL."""
+    if ptype != "ollama" and await is_private_url(base_url):
+        return False, "Private/internal URLs are not allowed for non-Ollama providers"
+    try:
+        client = get_http_client()
+        if ptype == "ollama":
+            resp = await client.get(base_url, timeout=_URL_TIMEOUT)
+        else:
+            # Custom OpenAI-compatible: try /models with auth
+            url = base_url.rstrip("/")
+            headers = {}
+            if api_key:
+                headers["Authorization"] = f"Bearer {api_key}"
+            resp = await client.get(f"{url}/models", headers=headers, timeout=_URL_TIMEOUT)
+        if resp.status_code < 500:
+            return True, f"Connected (HTTP {resp.status_code})"
+        return False, f"Server error (HTTP {resp.status_code})"
+    except httpx.ConnectError:
+        return False, "Connection refused - server not reachable"
+    except httpx.TimeoutException:
+        return False, "Connection timed out"
+    except Exception as e:
+        return False, f"Connection failed: {sanitize_error(e)}"
+
+
+class CircuitBreaker:
+    """EWMA error rate / latency and open-closed state for one provider."""
+
+    def __init__(self, provider_id: str):
+        self.provider_id = provider_id
+        self.state = CLOSED
+        self.error_rate = 0.0
+        self.latency_ms: float | None = None
+        self.samples = 0
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.last_error = ""
+        self.last_probe = ""
+
+    def record(self, ok: bool, latency_ms: float | None = None, error: str = "") -> None:
+        settings = get_settings()
+        alpha = settings.circuit_ewma_alpha
+        self.samples += 1
+        self.error_rate = (1 - alpha) * self.error_rate + alpha * (0.0 if ok else 1.0)
+        if latency_ms is not None and ok:
+            previous = latency_ms if self.latency_ms is None else self.latency_ms
+            self.latency_ms = (1 - alpha) * previous + alpha * latency_ms
+        if ok:
+            self.consecutive_failures = 0
+            if self.state == HALF_OPEN:
+                self.close()  # trial call went through
+            return
+        self.consecutive_failures += 1
+        self.last_error = error[:200]
+        if self.state == HALF_OPEN:
+            self._open()
+            return
+        if self.state == CLOSED and self.samples >= settings.circuit_min_samples and (
+            self.error_rate >= settings.circuit_error_threshold
+            or self.consecutive_failures >= settings.circuit_min_samples
+        ):
+            self._open()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        logger.warning(
+            f"Circuit opened for provider '{self.provider_id}' "
+            f"(error rate {self.error_rate:.0%}): {self.last_error}"
+        )
+
+    def close(self) -> None:
+        if self.state != CLOSED:
+            logger.info(f"Circuit closed for provider '{self.provider_id}'")
+        self.state = CLOSED
+        self.error_rate = 0.0
+        self.samples = 0
+        self.consecutive_failures = 0
+
+    def due_for_probe(self) -> bool:
+        return self.state == OPEN and time.monotonic() - self.opened_at >= get_settings().circuit_open_seconds
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "error_rate": round(self.error_rate, 3),
+            "latency_ms": round(self.latency_ms) if self.latency_ms is not None else None,
+            "samples": self.samples,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error,
+            "last_probe": self.last_probe,
+        }
+
+
+class ProviderHealth:
+    """Circuit breakers for all providers, keyed by provider id."""
+
+    def __init__(self):
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def breaker(self, provider_id: str) -> CircuitBreaker:
+        breaker = self._breakers.get(provider_id)
+        if breaker is None:
+            breaker = self._breakers[provider_id] = CircuitBreaker(provider_id)
+        return breaker
+
+    def record(self, provider_id: str, ok: bool, latency_ms: float | None = None, error: str = "") -> None:
+        self.breaker(provider_id).record(ok, latency_ms, error)
+
+    def is_available(self, provider_id: str) -> bool:
+        """Closed circuits take traffic; half-open ones take trial calls that decide their state."""
+        breaker = self._breakers.get(provider_id)
+        return breaker is None or breaker.state != OPEN
+
+    def record_check(self, provider_id: str, ok: bool, message: str) -> None:
+        """Apply the result of a connectivity check (monitor probe or admin test)."""
+        breaker = self.breaker(provider_id)
+        breaker.last_probe = message
+        if ok:
+            breaker.close()
+        elif breaker.state != CLOSED:
+            breaker.last_error = message
+            breaker._open()
+
+    def stats(self) -> dict[str, dict]:
+        return {pid: b.snapshot() for pid, b in self._breakers.items()}
+
+    async def probe_open_circuits(self) -> None:
+        """Probe providers whose cool-down has elapsed (half-open)."""
+        due = [b for b in self._breakers.values() if b.due_for_probe()]
+        if not due:
+            return
+        async with async_session() as db:
+            result = await db.execute(
+                select(ProviderSetting).where(ProviderSetting.id.in_([b.provider_id for b in due]))
+            )
+            settings_by_id = {ps.id: ps for ps in result.scalars().all()}
+        for breaker in due:
+            breaker.state = HALF_OPEN
+            ps = settings_by_id.get(breaker.provider_id)
+            if ps is None:
+                # Nothing to probe (e.g. mock/replay): stay half-open and let the next real call decide
+                breaker.last_probe = "No connectivity check available; waiting for a trial call"
+                continue
+            ok, message = await check_provider(ps)
+            self.record_check(breaker.provider_id, ok, message)
+
+    async def run_monitor(self) -> None:
+        interval = get_settings().health_check_interval_seconds
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.probe_open_circuits()
+            except Exception as e:
+                logger.error(f"Provider health probe failed: {sanitize_error(e)}")
+
+
+_health: ProviderHealth | None = None
+
+
+def get_health() -> ProviderHealth:
+    global _health
+    if _health is None:
+        _health = ProviderHealth()
+    return _health
+
+
+class HealthTrackingOcrProvider(OcrProvider):
+    """Reports the outcome and first-token latency of every call to the provider's breaker."""
+
+    def __init__(self, inner: OcrProvider, provider_id: str):
+        self.inner = inner
+        self.provider_id = provider_id
+        self.extra_config = inner.extra_config
+
+    async def process_image(self, image_data: bytes, mime_type: str, prompt: str = "") -> OcrResult:
+        result = await self.inner.process_image(image_data, mime_type, prompt)
+        get_health().record(self.provider_id, not result.error, result.latency_ms, result.error or "")
+        return result
+
+    async def process_image_stream(
+        self, image_data: bytes, mime_type: str, prompt: str = ""
+    ) -> AsyncGenerator[str, None]:
+        start = time.monotonic()
+        ttft_ms = None
+        try:
+            async for chunk in self.inner.process_image_stream(image_data, mime_type, prompt):
+                if ttft_ms is None:
+                    ttft_ms = (time.monotonic() - start) * 1000
+                yield chunk
+        except Exception as e:
+            get_health().record(self.provider_id, False, error=sanitize_error(e))
+            raise
+        get_health().record(self.provider_id, True, ttft_ms)
@@ -0,0 +1,265 @@
+"""Per-provider request and token rate limiting.
+
+Each ProviderSetting can set a requests-per-minute and an estimated
+tokens-per-minute budget. Calls reserve capacity up front and wait until the
+budget allows them through, instead of going out and coming back as 429s.
+Token use is estimated before the call (image size + expected output) and
+corrected with the real output length afterwards. Image tokens follow the
+provider's ImageProfile when it has one; a whole PDF is estimated page by
+page, as if each page were rendered at ``PDF_DPI``.
+"""
+import asyncio
+import time
+from collections import deque
+from collections.abc import AsyncGenerator
+
+from app.config import get_settings
+from app.models.schemas import OcrResult
+from app.ocr_providers.base import OcrProvider
+from app.services.image_profiles import ImageProfile
+from app.services.pdf_service import pdf_page_sizes
+from app.utils.spool import BufferReader
+
+# Rough provider-agnostic estimates (for providers without an image profile):
+# vision APIs bill ~1 token per 750 px, text is ~4 characters per token.
+_PIXELS_PER_TOKEN = 750
+_CHARS_PER_TOKEN = 4
+_DEFAULT_OUTPUT_TOKENS = 1024
+_WINDOW_SECONDS = 60.0
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``per_minute / 60`` per second.
+
+    Reservations may drive the balance negative; the returned delay is how long
+    the caller must wait before its reservation is covered. Because each
+    reservation deepens the debt, waiters are served in arrival order.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def resize(self, per_minute: int) -> None:
+        """Apply a new limit, keeping the current fill (clamped to the new capacity)."""
+        self._refill()
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = min(self.capacity, self.tokens)
+
+    def reserve(self, amount: float) -> float:
+        """Take ``amount`` and return seconds to wait."""
+        self._refill()
+        self.tokens -= amount
+        return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def refund(self, amount: float) -> None:
+        """Give back (or, when negative, additionally charge) ``amount``."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+
+
+class ProviderRateLimiter:
+    """RPM/TPM budget shared by every model of one provider. 0 means unlimited."""
+
+    def __init__(self, rpm: int = 0, tpm: int = 0):
+        self.rpm = 0
+        self.tpm = 0
+        self._requests: TokenBucket | None = None
+        self._tokens: TokenBucket | None = None
+        self.configure(rpm, tpm)
+        self.waiting = 0
+        self.throttled = 0
+        self.total_wait_s = 0.0
+        self._request_log: deque[float] = deque()
+        self._token_log: deque[tuple[float, int]] = deque()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._requests or self._tokens)
+
+    def configure(self, rpm: int, tpm: int) -> None:
+        rpm, tpm = max(0, rpm or 0), max(0, tpm or 0)
+        self._requests = self._resized(self._requests, rpm)
+        self._tokens = self._resized(self._tokens, tpm)
+        self.rpm, self.tpm = rpm, tpm
+
+    @staticmethod
+    def _resized(bucket: TokenBucket | None, per_minute: int) -> TokenBucket | None:
+        if not per_minute:
+            return None
+        if bucket is None:
+            return TokenBucket(per_minute)
+        if bucket.capacity != per_minute:
+            bucket.resize(per_minute)
+        return bucket
+
+    async def acquire(self, tokens: int) -> int:
+        """Wait until one request and ``tokens`` estimated tokens fit the budget.
+
+        A single call may need more than a full minute of budget; it reserves at
+        most the bucket capacity so it can ever go through. Returns the amount
+        actually reserved, which is what settle() must be given.
+        """
+        if self._tokens:
+            tokens = min(tokens, int(self._tokens.capacity))
+        delay = 0.0
+        if self._requests:
+            delay = max(delay, self._requests.reserve(1))
+        if self._tokens:
+            delay = max(delay, self._tokens.reserve(tokens))
+        if delay > 0:
+            self.waiting += 1
+            self.throttled += 1
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                # Never sent: hand the reservation back to the next caller
+                if self._requests:
+                    self._requests.refund(1)
+                if self._tokens:
+                    self._tokens.refund(tokens)
+                raise
+            finally:
+                self.waiting -= 1
+                self.total_wait_s += delay
+        self._record(tokens)
+        return tokens
+
+    def settle(self, reserved: int, actual: int) -> None:
+        """Correct a reservation (as returned by acquire()) once the real token use is known."""
+        if actual == reserved:
+            return
+        if self._tokens:
+            self._tokens.refund(reserved - actual)
+        self._token_log.append((time.monotonic(), actual - reserved))
+
+    def _record(self, tokens: int) -> None:
+        now = time.monotonic()
+        self._request_log.append(now)
+        self._token_log.append((now, tokens))
+        self._trim(now)
+
+    def _trim(self, now: float) -> None:
+        while self._request_log and now - self._request_log[0] > _WINDOW_SECONDS:
+            self._request_log.popleft()
+        while self._token_log and now - self._token_log[0][0] > _WINDOW_SECONDS:
+            self._token_log.popleft()
+
+    def usage(self) -> dict:
+        self._trim(time.monotonic())
+        return {
+            "rpm_limit": self.rpm,
+            "tpm_limit": self.tpm,
+            "requests_last_minute": len(self._request_log),
+            "tokens_last_minute": max(0, sum(n for _, n in self._token_log)),
+            "requests_available": int(self._requests.available()) if self._requests else None,
+            "tokens_available": int(self._tokens.available()) if self._tokens else None,
+            "waiting": self.waiting,
+            "throttled": self.throttled,
+            "total_wait_s": round(self.total_wait_s, 2),
+        }
+
+
+_limiters: dict[str, ProviderRateLimiter] = {}
+
+
+def get_rate_limiter(provider_id: str, rpm: int = 0, tpm: int = 0) -> ProviderRateLimiter:
+    """Return the shared limiter for a provider, applying the current limits."""
+    limiter = _limiters.get(provider_id)
+    if limiter is None:
+        limiter = _limiters[provider_id] = ProviderRateLimiter(rpm, tpm)
+    else:
+        limiter.configure(rpm, tpm)
+    return limiter
+
+
+def rate_limit_usage() -> dict[str, dict]:
+    """Budget use of every provider that has handled traffic, keyed by provider id."""
+    return {pid: limiter.usage() for pid, limiter in _limiters.items()}
+
+
+def _page_sizes(image_data: bytes, mime_type: str) -> list[tuple[int, int]]:
+    """Pixel size of each page the provider will see (one entry for a plain image)."""
+    if mime_type == "application/pdf":
+        return pdf_page_sizes(image_data, get_settings().pdf_dpi)
+    from PIL import Image
+
+    with Image.open(BufferReader(image_data)) as img:  # reads the header only
+        return [img.size]
+
+
+def estimate_input_tokens(
+    image_data: bytes, mime_type: str, prompt: str, profile: ImageProfile | None = None,
+) -> tuple[int, int]:
+    """Estimate prompt + image tokens from the page dimensions.
+
+    Returns ``(tokens, pages)``; pages is 1 for a plain image.
+    """
+    tokens = len(prompt) // _CHARS_PER_TOKEN
+    try:
+        sizes = _page_sizes(image_data, mime_type)
+    except Exception:
+        return tokens + len(image_data) // 1024, 1
+    for width, height in sizes:
+        tokens += profile.tokens(width, height) if profile else width * height // _PIXELS_PER_TOKEN
+    return tokens, max(len(sizes), 1)
+
+
+def expected_output_tokens(extra_config: dict | None, pages: int = 1) -> int:
+    """The configured output cap, else a per-page default."""
+    config = extra_config or {}
+    try:
+        configured = int(config.get("max_tokens") or config.get("max_completion_tokens") or 0)
+    except (TypeError, ValueError):
+        configured = 0
+    return configured or _DEFAULT_OUTPUT_TOKENS * pages
+
+
+class RateLimitedOcrProvider(OcrProvider):
+    """Wraps a provider so every call first waits for RPM/TPM capacity."""
+
+    def __init__(self, inner: OcrProvider, limiter: ProviderRateLimiter, profile: ImageProfile | None = None):
+        self.inner = inner
+        self.limiter = limiter
+        self.profile = profile
+        self.extra_config = inner.extra_config
+
+    async def process_image(self, image_data: bytes, mime_type: str, prompt: str = "") -> OcrResult:
+        # Reads image headers or walks a PDF's pages, so it stays off the event loop
+        input_tokens, pages = await asyncio.to_thread(
+            estimate_input_tokens, image_data, mime_type, prompt, self.profile,
+        )
+        estimated = input_tokens + expected_output_tokens(self.extra_config, pages)
+        reserved = await self.limiter.acquire(estimated)
+        result = await self.inner.process_image(image_data, mime_type, prompt)
+        self.limiter.settle(reserved, input_tokens + len(result.text) // _CHARS_PER_TOKEN)
+        return result
+
+    async def process_image_stream(
+        self, image_data: bytes, mime_type: str, prompt: str = ""
+    ) -> AsyncGenerator[str, None]:
+        # Reads image headers or walks a PDF's pages, so it stays off the event loop
+        input_tokens, pages = await asyncio.to_thread(
+            estimate_input_tokens, image_data, mime_type, prompt, self.profile,
+        )
+        estimated = input_tokens + expected_output_tokens(self.extra_config, pages)
+        reserved = await self.limiter.acquire(estimated)
+        output_chars = 0
+        try:
+            async for chunk in self.inner.process_image_stream(image_data, mime_type, prompt):
+                output_chars += len(chunk)
+                yield chunk
+        finally:
+            self.limiter.settle(reserved, input_tokens + output_chars // _CHARS_PER_TOKEN)
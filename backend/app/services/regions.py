@@ -0,0 +1,202 @@
+"""Region-of-interest OCR: a page selection and a crop box applied before any model sees the document.
+
+When only one table or section matters, OCR-ing every full page wastes
+time and tokens. A region is given as:
+
+- ``pages``: 1-based pages or frames, e.g. "3", "1-4,7", "10-" (to the end).
+- ``crop``: "x0,y0,x1,y1", fractions (0-1) of each selected page from its
+  top-left corner as displayed, e.g. "0,0.5,1,1" for the bottom half.
+
+``extract_region`` cuts the document down once, before the provider
+chain. A PDF becomes a new PDF of just the selected pages, with the crop
+set as each page's CropBox, so rasterized pages only render the region and
+native-PDF providers receive only those pages. Images and TIFF frames are
+cropped with Pillow. Pages of the output are numbered within the selection.
+"""
+import asyncio
+import io
+import re
+
+import pypdfium2 as pdfium
+
+from app.services.pdf_service import is_paged, normalize_frame, pdf_page_count
+from app.utils.spool import Buffer, BufferReader
+
+_RANGE = re.compile(r"^(\d+)(?:\s*-\s*(\d*))?$")
+_MIN_CROP = 0.01  # crop boxes thinner than this are a typo, not a region
+
+
+class Region:
+    """Selected pages (1-based ``(first, last)`` spans, ``last`` None = to the end) and a crop box."""
+
+    def __init__(self, pages: list[tuple[int, int | None]] | None = None, crop: tuple[float, ...] | None = None):
+        self.pages = pages
+        self.crop = crop
+
+    @property
+    def first_page(self) -> int:
+        return min(first for first, _ in self.pages) if self.pages else 1
+
+    def page_indices(self, n_pages: int) -> list[int]:
+        """0-based indices of the selected pages, in document order."""
+        if not self.pages:
+            return list(range(n_pages))
+        selected: set[int] = set()
+        for first, last in self.pages:
+            if first > n_pages:
+                raise ValueError(f"Page {first} is out of range (document has {n_pages} pages)")
+            selected.update(range(first - 1, min(last or n_pages, n_pages)))
+        return sorted(selected)
+
+    def to_dict(self) -> dict:
+        return {
+            "pages": ",".join(f"{a}" if a == b else f"{a}-{b or ''}" for a, b in self.pages or []),
+            "crop": list(self.crop) if self.crop else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict | None) -> "Region | None":
+        if not data:
+            return None
+        crop = data.get("crop")
+        return parse_region(data.get("pages"), ",".join(map(str, crop)) if crop else None)
+
+
+def _parse_pages(spec: str) -> list[tuple[int, int | None]]:
+    pages = []
+    for part in spec.split(","):
+        match = _RANGE.match(part.strip())
+        if not match:
+            raise ValueError(f"Invalid page range: '{part.strip()}' (use e.g. 1-3,5 or 10-)")
+        first = int(match.group(1))
+        last = first if match.group(2) is None else int(match.group(2)) if match.group(2) else None
+        if first < 1 or (last is not None and last < first):
+            raise ValueError(f"Invalid page range: '{part.strip()}'")
+        pages.append((first, last))
+    return pages
+
+
+def _parse_crop(spec: str) -> tuple[float, float, float, float] | None:
+    try:
+        x0, y0, x1, y1 = (float(v) for v in spec.split(","))
+    except ValueError:
+        raise ValueError("crop must be four comma-separated fractions: x0,y0,x1,y1")
+    if not (0 <= x0 < x1 <= 1 and 0 <= y0 < y1 <= 1):
+        raise ValueError("crop must satisfy 0 <= x0 < x1 <= 1 and 0 <= y0 < y1 <= 1")
+    if x1 - x0 < _MIN_CROP or y1 - y0 < _MIN_CROP:
+        raise ValueError("crop box is too small")
+    if (x0, y0, x1, y1) == (0, 0, 1, 1):
+        return None
+    return x0, y0, x1, y1
+
+
+def parse_region(pages: str | None, crop: str | None) -> Region | None:
+    """Validate request parameters. Returns None when the whole document is selected."""
+    page_spans = _parse_pages(pages) if pages and pages.strip() else None
+    crop_box = _parse_crop(crop) if crop and crop.strip() else None
+    if not page_spans and not crop_box:
+        return None
+    return Region(page_spans, crop_box)
+
+
+def _unrotate(crop: tuple[float, ...], rotation: int) -> tuple[float, float, float, float]:
+    """Map a crop box on the page as displayed to the page's unrotated coordinates."""
+    x0, y0, x1, y1 = crop
+    if rotation == 90:
+        return y0, 1 - x1, y1, 1 - x0
+    if rotation == 180:
+        return 1 - x1, 1 - y1, 1 - x0, 1 - y0
+    if rotation == 270:
+        return 1 - y1, x0, 1 - y0, x1
+    return x0, y0, x1, y1
+
+
+def _extract_pdf(data: Buffer, region: Region, max_pages: int) -> bytes:
+    source = pdfium.PdfDocument(data if isinstance(data, bytes) else BufferReader(data))
+    target = pdfium.PdfDocument.new()
+    try:
+        indices = region.page_indices(len(source))
+        _check_selection(len(indices), max_pages)
+        target.import_pages(source, indices)
+        if region.crop:
+            for i in range(len(target)):
+                page = target[i]
+                u0, v0, u1, v1 = _unrotate(region.crop, page.get_rotation())
+                left, bottom, right, top = page.get_cropbox()
+                width, height = right - left, top - bottom
+                page.set_cropbox(left + u0 * width, top - v1 * height, left + u1 * width, top - v0 * height)
+        buf = io.BytesIO()
+        target.save(buf)
+        return buf.getvalue()
+    finally:
+        target.close()
+        source.close()
+
+
+def _extract_image(data: Buffer, mime_type: str, region: Region, max_pages: int) -> tuple[bytes, str]:
+    from PIL import Image, ImageOps
+
+    image = Image.open(BufferReader(data))
+    source_format = image.format
+    # Frames of other formats (animated GIF/WebP) are not pages
+    indices = region.page_indices(getattr(image, "n_frames", 1) if is_paged(mime_type) else 1)
+    _check_selection(len(indices), max_pages)
+    frames = []
+    for index in indices:
+        image.seek(index)
+        frame = ImageOps.exif_transpose(image)  # a copy, upright as displayed
+        if region.crop:
+            x0, y0, x1, y1 = region.crop
+            frame = frame.crop((
+                round(x0 * frame.width), round(y0 * frame.height),
+                round(x1 * frame.width), round(y1 * frame.height),
+            ))
+        frames.append(normalize_frame(frame))
+
+    buf = io.BytesIO()
+    if len(frames) > 1:
+        frames[0].save(buf, format="TIFF", save_all=True, append_images=frames[1:], compression="tiff_deflate")
+        return buf.getvalue(), "image/tiff"
+    frame = frames[0]
+    if source_format == "JPEG":
+        frame.save(buf, format="JPEG", quality=95)
+        return buf.getvalue(), "image/jpeg"
+    frame.save(buf, format="PNG")
+    return buf.getvalue(), "image/png"
+
+
+def _check_selection(n_selected: int, max_pages: int) -> None:
+    if n_selected > max_pages:
+        raise ValueError(
+            f"Selection has {n_selected} pages, exceeding the maximum of {max_pages}. "
+            "Please select fewer pages."
+        )
+
+
+def check_region(data: Buffer, mime_type: str, region: Region, max_pages: int = 50) -> None:
+    """Raise ValueError if the selection doesn't fit the document, without cutting it."""
+    if mime_type == "application/pdf":
+        n_pages = pdf_page_count(data)
+    elif is_paged(mime_type):
+        from PIL import Image
+
+        n_pages = getattr(Image.open(BufferReader(data)), "n_frames", 1)
+    else:
+        n_pages = 1
+    _check_selection(len(region.page_indices(n_pages)), max_pages)
+
+
+def extract_region_sync(data: Buffer, mime_type: str, region: Region, max_pages: int = 50) -> tuple[Buffer, str]:
+    """The selected region as a document of its own. Raises ValueError for pages out of range."""
+    if mime_type == "application/pdf":
+        return _extract_pdf(data, region, max_pages), mime_type
+    return _extract_image(data, mime_type, region, max_pages)
+
+
+async def extract_region(
+    data: Buffer, mime_type: str, region: Region | None, max_pages: int = 50,
+) -> tuple[Buffer, str]:
+    """Async wrapper — offloads the cut to a thread. Without a region the document is returned as-is."""
+    if region is None:
+        return data, mime_type
+    return await asyncio.to_thread(extract_region_sync, data, mime_type, region, max_pages)
@@ -0,0 +1,218 @@
+"""Retries with jittered backoff and hedged requests for OCR providers.
+
+Only the part of a call *before the first token* is retried: once a stream
+has produced output the caller has already forwarded it, so later failures
+are final. Hedging sends a duplicate request when the first one is slower
+than the model's historical p95 time-to-first-token and keeps whichever
+answers first. Non-streaming calls with hedging on read a stream to the end,
+so both paths hedge on (and record) the same first-chunk latency.
+"""
+import asyncio
+import random
+import re
+import time
+from collections import deque
+from collections.abc import AsyncGenerator, AsyncIterator
+
+from loguru import logger
+
+from app.config import get_settings
+from app.models.schemas import OcrResult
+from app.ocr_providers.base import OcrProvider
+from app.utils.error_sanitizer import sanitize_error
+
+_MAX_BACKOFF_S = 10.0
+_TRANSIENT_STATUS = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+_TRANSIENT_TYPES = (
+    "Timeout", "ConnectError", "ConnectionError", "APIConnectionError", "RemoteProtocolError", "ReadError",
+)
+# Messages that lead with a status ("Error code: 503 - ...", "503 UNAVAILABLE") or say "HTTP 503"
+_STATUS_CODES = "|".join(str(code) for code in sorted(_TRANSIENT_STATUS))
+_TRANSIENT_TEXT = re.compile(rf"^(?:Error code:\s*)?(?:{_STATUS_CODES})\b|\bHTTP\s*(?:{_STATUS_CODES})\b")
+
+
+def is_transient_error(error: BaseException | str | None) -> bool:
+    """Check whether a provider failure is worth retrying.
+
+    Exceptions are classified by their HTTP status code (SDK errors) or their
+    type (timeouts, connection errors). process_image() failures arrive as
+    sanitized strings; only messages that clearly carry a transient status
+    code are retried.
+    """
+    if not error:
+        return False
+    if isinstance(error, BaseException):
+        status = getattr(error, "status_code", None)
+        if status is None and getattr(error, "response", None) is not None:
+            status = getattr(error.response, "status_code", None)
+        if isinstance(status, int):
+            return status in _TRANSIENT_STATUS
+        if isinstance(error, (TimeoutError, ConnectionError)):
+            return True
+        if any(name in type(error).__name__ for name in _TRANSIENT_TYPES):
+            return True
+        error = str(error)
+    return bool(_TRANSIENT_TEXT.search(error.strip()))
+
+
+def backoff_delay(attempt: int, base_ms: int) -> float:
+    """Full-jitter exponential backoff in seconds for the given retry attempt (0-based)."""
+    cap = min(_MAX_BACKOFF_S, base_ms / 1000 * (2 ** attempt))
+    return random.uniform(0, cap)
+
+
+class LatencyTracker:
+    """Rolling time-to-first-token samples per model."""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: dict[str, deque[float]] = {}
+
+    def record(self, key: str, seconds: float) -> None:
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = self._samples[key] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def p95(self, key: str, min_samples: int) -> float | None:
+        samples = self._samples.get(key)
+        if not samples or len(samples) < min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+_ttft = LatencyTracker()
+
+
+class RetryingOcrProvider(OcrProvider):
+    """Wraps a provider with pre-first-token retries and optional hedging."""
+
+    def __init__(self, inner: OcrProvider, model_key: str, max_retries: int = 0,
+                 backoff_ms: int = 500, hedge: bool = False):
+        self.inner = inner
+        self.model_key = model_key
+        self.max_retries = max(0, max_retries)
+        self.backoff_ms = max(0, backoff_ms)
+        self.hedge = hedge
+        self.extra_config = inner.extra_config
+
+    def _hedge_after(self) -> float | None:
+        if not self.hedge:
+            return None
+        return _ttft.p95(self.model_key, get_settings().hedge_min_samples)
+
+    async def _retry_wait(self, attempt: int, error) -> None:
+        delay = backoff_delay(attempt, self.backoff_ms)
+        logger.info(
+            f"Retrying {self.model_key} in {delay:.2f}s (attempt {attempt + 1}/{self.max_retries}): {error}"
+        )
+        await asyncio.sleep(delay)
+
+    # ── Non-streaming ──────────────────────────────────────────
+
+    async def _hedged_call(self, image_data: bytes, mime_type: str, prompt: str) -> OcrResult:
+        """Read a (possibly hedged) stream to the end; raises like the stream does."""
+        start = time.time()
+        first, stream = await self._first_chunk(image_data, mime_type, prompt)
+        parts = [] if first is None else [first]
+        try:
+            async for chunk in stream:
+                parts.append(chunk)
+        finally:
+            aclose = getattr(stream, "aclose", None)
+            if aclose:
+                await aclose()
+        return OcrResult(text="".join(parts), latency_ms=int((time.time() - start) * 1000))
+
+    async def process_image(self, image_data: bytes, mime_type: str, prompt: str = "") -> OcrResult:
+        start = time.time()
+        attempt = 0
+        while True:
+            if self.hedge:
+                try:
+                    result = await self._hedged_call(image_data, mime_type, prompt)
+                    error = None
+                except Exception as e:
+                    result, error = None, e
+            else:
+                result = await self.inner.process_image(image_data, mime_type, prompt)
+                error = result.error
+            if not error or attempt >= self.max_retries or not is_transient_error(error):
+                break
+            await self._retry_wait(attempt, error)
+            attempt += 1
+        if result is None:
+            return OcrResult(text="", latency_ms=int((time.time() - start) * 1000), error=sanitize_error(error))
+        if attempt:
+            result = OcrResult(text=result.text, latency_ms=int((time.time() - start) * 1000), error=result.error)
+        return result
+
+    # ── Streaming ──────────────────────────────────────────────
+
+    async def _first_chunk(
+        self, image_data: bytes, mime_type: str, prompt: str
+    ) -> tuple[str | None, AsyncIterator[str]]:
+        """Open a stream (hedged if slow) and return its first chunk and the live stream."""
+        start = time.monotonic()
+        streams: dict[asyncio.Task, AsyncIterator[str]] = {}
+
+        def launch() -> None:
+            stream = self.inner.process_image_stream(image_data, mime_type, prompt).__aiter__()
+            streams[asyncio.create_task(stream.__anext__())] = stream
+
+        launch()
+        hedge_after = self._hedge_after()
+        winner = None
+        error: BaseException | None = None
+        try:
+            if hedge_after is not None:
+                done, _ = await asyncio.wait(streams, timeout=hedge_after)
+                if not done:
+                    logger.debug(f"Hedging {self.model_key} stream after {hedge_after:.2f}s")
+                    launch()
+            pending = set(streams)
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    exc = task.exception()
+                    if exc is None or isinstance(exc, StopAsyncIteration):
+                        winner = task
+                        break
+                    error = exc
+            if winner is None:
+                raise error
+            _ttft.record(self.model_key, time.monotonic() - start)
+            first = None if winner.exception() else winner.result()
+            return first, streams.pop(winner)
+        finally:
+            for task, stream in streams.items():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                aclose = getattr(stream, "aclose", None)
+                if aclose:
+                    await aclose()
+
+    async def process_image_stream(
+        self, image_data: bytes, mime_type: str, prompt: str = ""
+    ) -> AsyncGenerator[str, None]:
+        attempt = 0
+        while True:
+            try:
+                first, stream = await self._first_chunk(image_data, mime_type, prompt)
+                break
+            except Exception as e:
+                if attempt >= self.max_retries or not is_transient_error(e):
+                    raise
+                await self._retry_wait(attempt, e)
+                attempt += 1
+        try:
+            if first is None:
+                return
+            yield first
+            async for chunk in stream:
+                yield chunk
+        finally:
+            aclose = getattr(stream, "aclose", None)
+            if aclose:
+                await aclose()
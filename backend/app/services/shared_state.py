@@ -0,0 +1,297 @@
+"""Shared state for running several workers or nodes behind one arena.
+
+Battle documents, in-flight battle markers and generated secrets must be
+visible to every worker: ``/start`` and ``/stream`` of one battle can land
+on different uvicorn workers or machines. Two backends are provided:
+
+- ``memory``: process-local (the default; correct for a single worker).
+- ``sqlite``: a WAL-mode SQLite file shared by all workers on a host, or by
+  several hosts when ``state_sqlite_path`` is on a shared volume.
+
+Values are opaque bytes grouped by namespace, with an optional TTL.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from loguru import logger
+
+from app.config import get_settings
+from app.utils.byte_lru import ByteLRUCache
+
+_PURGE_INTERVAL = 60.0
+
+
+class StateBackend(ABC):
+    """Interface of a shared key/value store. Keys are (namespace, key) pairs."""
+
+    name = ""
+
+    @abstractmethod
+    async def get(self, namespace: str, key: str) -> bytes | None:
+        pass
+
+    @abstractmethod
+    async def put(self, namespace: str, key: str, value: bytes, ttl: float | None = None) -> None:
+        pass
+
+    @abstractmethod
+    async def add(self, namespace: str, key: str, value: bytes, ttl: float | None = None) -> bool:
+        """Store only if the key is absent (or expired). Returns False if it already exists."""
+        pass
+
+    @abstractmethod
+    async def touch(self, namespace: str, key: str, ttl: float) -> bool:
+        """Extend the TTL of an existing entry. Returns False if it is absent."""
+        pass
+
+    @abstractmethod
+    async def delete(self, namespace: str, key: str) -> None:
+        pass
+
+    @abstractmethod
+    async def purge_expired(self) -> int:
+        pass
+
+    @abstractmethod
+    def setdefault(self, namespace: str, key: str, value: bytes) -> bytes:
+        """Synchronously store ``value`` unless a value exists; return the stored one.
+
+        Used for small, permanent values (secrets) so that every worker agrees on the
+        first value written.
+        """
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": self.name}
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryStateBackend(StateBackend):
+    """Process-local backend.
+
+    Entries with a TTL live in one byte-budgeted LRU per namespace (so battle
+    documents can't crowd out small markers); permanent values are never evicted.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_entries: int, max_bytes: int, limits: dict[str, tuple[int, int]] | None = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.limits = limits or {}  # namespace -> (max_entries, max_bytes) overrides
+        self._caches: dict[str, ByteLRUCache] = {}
+        self._permanent: dict[tuple[str, str], bytes] = {}
+
+    def _cache(self, namespace: str) -> ByteLRUCache:
+        cache = self._caches.get(namespace)
+        if cache is None:
+            max_entries, max_bytes = self.limits.get(namespace, (self.max_entries, self.max_bytes))
+            cache = self._caches[namespace] = ByteLRUCache(max_entries, max_bytes)
+        return cache
+
+    async def get(self, namespace: str, key: str) -> bytes | None:
+        value = self._permanent.get((namespace, key))
+        if value is not None:
+            return value
+        return self._cache(namespace).get(key)
+
+    async def put(self, namespace: str, key: str, value: bytes, ttl: float | None = None) -> None:
+        if ttl:
+            self._permanent.pop((namespace, key), None)
+            self._cache(namespace).put(key, value, ttl)
+        else:
+            self._cache(namespace).pop(key)
+            self._permanent[(namespace, key)] = value
+
+    async def add(self, namespace: str, key: str, value: bytes, ttl: float | None = None) -> bool:
+        if (namespace, key) in self._permanent or key in self._cache(namespace):
+            return False
+        await self.put(namespace, key, value, ttl)
+        return True
+
+    async def touch(self, namespace: str, key: str, ttl: float) -> bool:
+        if (namespace, key) in self._permanent:
+            return True
+        return self._cache(namespace).touch(key, ttl)
+
+    async def delete(self, namespace: str, key: str) -> None:
+        self._permanent.pop((namespace, key), None)
+        self._cache(namespace).pop(key)
+
+    async def purge_expired(self) -> int:
+        return sum(cache.purge_expired() for cache in self._caches.values())
+
+    def setdefault(self, namespace: str, key: str, value: bytes) -> bytes:
+        return self._permanent.setdefault((namespace, key), value)
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "namespaces": {ns: cache.stats() for ns, cache in self._caches.items()},
+        }
+
+
+class SqliteStateBackend(StateBackend):
+    """Backend on a SQLite file in WAL mode, safe for concurrent processes.
+
+    Blocking SQLite calls run in a worker thread so large documents don't stall
+    the event loop.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS shared_state ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value BLOB NOT NULL,"
+            " expires_at REAL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def _get(self, namespace: str, key: str) -> bytes | None:
+        row = self._execute(
+            "SELECT value FROM shared_state WHERE namespace = ? AND key = ?"
+            " AND (expires_at IS NULL OR expires_at > ?)",
+            (namespace, key, time.time()),
+        ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def _put(self, namespace: str, key: str, value: bytes, ttl: float | None) -> None:
+        self._execute(
+            "INSERT OR REPLACE INTO shared_state (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, value, time.time() + ttl if ttl else None),
+        )
+
+    def _add(self, namespace: str, key: str, value: bytes, ttl: float | None) -> bool:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "DELETE FROM shared_state WHERE namespace = ? AND key = ? AND expires_at <= ?",
+                    (namespace, key, now),
+                )
+                cur = self._conn.execute(
+                    "INSERT OR IGNORE INTO shared_state (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (namespace, key, value, now + ttl if ttl else None),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return cur.rowcount == 1
+
+    def _touch(self, namespace: str, key: str, ttl: float) -> bool:
+        now = time.time()
+        return self._execute(
+            "UPDATE shared_state SET expires_at = ? WHERE namespace = ? AND key = ?"
+            " AND expires_at IS NOT NULL AND expires_at > ?",
+            (now + ttl, namespace, key, now),
+        ).rowcount == 1
+
+    def _delete(self, namespace: str, key: str) -> None:
+        self._execute("DELETE FROM shared_state WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def _purge(self) -> int:
+        return self._execute(
+            "DELETE FROM shared_state WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        ).rowcount
+
+    async def get(self, namespace: str, key: str) -> bytes | None:
+        return await asyncio.to_thread(self._get, namespace, key)
+
+    async def put(self, namespace: str, key: str, value: bytes, ttl: float | None = None) -> None:
+        await asyncio.to_thread(self._put, namespace, key, value, ttl)
+
+    async def add(self, namespace: str, key: str, value: bytes, ttl: float | None = None) -> bool:
+        return await asyncio.to_thread(self._add, namespace, key, value, ttl)
+
+    async def touch(self, namespace: str, key: str, ttl: float) -> bool:
+        return await asyncio.to_thread(self._touch, namespace, key, ttl)
+
+    async def delete(self, namespace: str, key: str) -> None:
+        await asyncio.to_thread(self._delete, namespace, key)
+
+    async def purge_expired(self) -> int:
+        return await asyncio.to_thread(self._purge)
+
+    def setdefault(self, namespace: str, key: str, value: bytes) -> bytes:
+        self._execute(
+            "INSERT OR IGNORE INTO shared_state (namespace, key, value, expires_at) VALUES (?, ?, ?, NULL)",
+            (namespace, key, value),
+        )
+        return self._get(namespace, key) or value
+
+    def stats(self) -> dict:
+        rows = self._execute(
+            "SELECT namespace, COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM shared_state"
+            " WHERE expires_at IS NULL OR expires_at > ? GROUP BY namespace",
+            (time.time(),),
+        ).fetchall()
+        return {
+            "backend": self.name,
+            "path": self.path,
+            "namespaces": {ns: {"entries": count, "bytes": size} for ns, count, size in rows},
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_backend: StateBackend | None = None
+
+
+def get_shared_state() -> StateBackend:
+    global _backend
+    if _backend is None:
+        settings = get_settings()
+        if settings.state_backend == "sqlite":
+            _backend = SqliteStateBackend(settings.state_sqlite_path)
+        elif settings.state_backend == "memory":
+            _backend = MemoryStateBackend(
+                settings.state_memory_max_entries,
+                settings.state_memory_max_bytes,
+                limits={"preview": (settings.preview_cache_max_entries, settings.preview_cache_max_bytes)},
+            )
+        else:
+            raise ValueError(f"Unknown state backend: {settings.state_backend}")
+    return _backend
+
+
+def close_shared_state() -> None:
+    global _backend
+    if _backend is not None:
+        _backend.close()
+        _backend = None
+
+
+async def run_janitor() -> None:
+    """Drop expired entries periodically (runs for the lifetime of the app)."""
+    while True:
+        await asyncio.sleep(_PURGE_INTERVAL)
+        try:
+            purged = await get_shared_state().purge_expired()
+            if purged:
+                logger.debug(f"Purged {purged} expired shared state entries")
+        except Exception as e:
+            logger.warning(f"Shared state purge failed: {e}")
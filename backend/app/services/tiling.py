@@ -0,0 +1,255 @@
+"""Tall-page tiling: OCR very long images in overlapping pieces and stitch the markdown.
+
+Providers shrink a long receipt, a scrolling screenshot or a poster-size
+page until it fits their maximum image size, and by then the text is too
+small to read. A model opts in with a ``tiling`` object in its config
+(``true`` for the defaults):
+
+    {"tiling": {"max_aspect": 2.5, "tile_aspect": 1.5, "overlap": 0.1, "max_tiles": 12}}
+
+- ``max_aspect``: tile images whose long edge exceeds this many short edges.
+- ``tile_aspect``: length of each tile, in short edges.
+- ``overlap``: fraction of a tile shared with the next one, so no line is lost at a cut.
+- ``max_tiles``: at most this many tiles; they get longer instead.
+
+Cuts move to the emptiest row (or column) inside the overlap, so they
+rarely slice through a line of text. Each tile goes through the rest of
+the provider chain on its own (auto-resize, rate limits, retries), at
+most ``tile_concurrency`` at a time. Text both neighbouring tiles read in
+their overlap is kept once.
+"""
+import asyncio
+import difflib
+import io
+import math
+import time
+from collections.abc import AsyncGenerator
+
+from loguru import logger
+
+from app.config import get_settings
+from app.models.schemas import OcrResult
+from app.ocr_providers.base import OcrProvider
+from app.services.postprocessors import strip_code_fences
+from app.utils.spool import Buffer, BufferReader
+
+_OPTION_KEYS = {"max_aspect", "tile_aspect", "overlap", "max_tiles"}
+_DEFAULT_OPTIONS = {"max_aspect": 2.5, "tile_aspect": 1.5, "overlap": 0.1, "max_tiles": 12}
+_SEAM_LINES = 24  # lines at the end of one tile's text searched for the start of the next
+_MIN_SEAM_CHARS = 12  # shorter matches (blank lines, "---") are coincidence, not overlap
+
+
+def parse_tiling_options(raw: object) -> dict | None:
+    """Validate a model's ``tiling`` config. Returns None when tiling is off."""
+    if not raw:
+        return None
+    if raw is True:
+        return dict(_DEFAULT_OPTIONS)
+    if not isinstance(raw, dict):
+        raise ValueError("tiling must be true or an object")
+    unknown = set(raw) - _OPTION_KEYS
+    if unknown:
+        raise ValueError(f"Unknown tiling option(s): {', '.join(sorted(unknown))}")
+
+    options = {**_DEFAULT_OPTIONS, **raw}
+    if any(isinstance(v, bool) or not isinstance(v, (int, float)) for v in options.values()):
+        raise ValueError("tiling options must be numbers")
+    if not 1 <= options["tile_aspect"] <= options["max_aspect"]:
+        raise ValueError("tiling.tile_aspect must be between 1 and max_aspect")
+    if not 0 <= options["overlap"] < 0.5:
+        raise ValueError("tiling.overlap must be at least 0 and below 0.5")
+    if not isinstance(options["max_tiles"], int) or not 2 <= options["max_tiles"] <= 64:
+        raise ValueError("tiling.max_tiles must be an integer between 2 and 64")
+    return options
+
+
+def _plan(length: int, breadth: int, options: dict) -> list[list[int]]:
+    """Evenly spaced, overlapping [start, end) spans along the long edge."""
+    tile = breadth * options["tile_aspect"]
+    overlap = tile * options["overlap"]
+    count = min(options["max_tiles"], math.ceil((length - overlap) / (tile - overlap)))
+    size = (length + (count - 1) * overlap) / count
+    step = size - overlap
+    return [[round(i * step), min(length, round(i * step + size))] for i in range(count)]
+
+
+def _ink(image, tall: bool) -> list[float]:
+    """Mean difference from the background colour per row (tall) or column (wide)."""
+    from PIL import Image, ImageChops
+
+    gray = image.convert("L")
+    diff = ImageChops.difference(gray, Image.new("L", gray.size, gray.getpixel((0, 0))))
+    line = diff.resize((1, gray.height) if tall else (gray.width, 1), Image.Resampling.BOX)
+    return list(line.getdata())
+
+
+def _snap(spans: list[list[int]], ink: list[float]) -> list[list[int]]:
+    """Move each cut to the emptiest line of its half of the overlap, keeping as much overlap as possible."""
+    for current, following in zip(spans, spans[1:]):
+        start, end = following[0], current[1]
+        middle = (start + end) // 2
+        following[0] = min(range(start, max(start + 1, middle)), key=lambda r: (ink[r], r))
+        current[1] = min(range(middle, max(middle + 1, end)), key=lambda r: (ink[r], -r)) + 1
+    return spans
+
+
+def split_image(data: Buffer, mime_type: str, options: dict) -> list[tuple[bytes, str]] | None:
+    """Overlapping tiles of an image too long for one request, or None to send it whole."""
+    from PIL import Image, ImageOps
+
+    try:
+        image = Image.open(BufferReader(data))  # reads the header only
+        width, height = image.size
+        if max(width, height) <= options["max_aspect"] * min(width, height):
+            return None
+        source_format = image.format
+        if source_format != "PNG" and image.getexif().get(0x0112, 1) != 1:
+            image = ImageOps.exif_transpose(image)
+        image.load()
+    except Exception:
+        return None  # not an image PIL can decode; send as-is
+
+    width, height = image.size
+    tall = height >= width
+    spans = _plan(height if tall else width, width if tall else height, options)
+    spans = _snap(spans, _ink(image, tall))
+
+    pil_format, out_mime = ("JPEG", "image/jpeg") if source_format == "JPEG" else ("PNG", "image/png")
+    tiles = []
+    for start, end in spans:
+        tile = image.crop((0, start, width, end) if tall else (start, 0, end, height))
+        if pil_format == "JPEG" and tile.mode not in ("RGB", "L"):
+            tile = tile.convert("RGB")
+        elif tile.mode not in ("1", "L", "LA", "P", "RGB", "RGBA"):
+            tile = tile.convert("RGB")
+        buf = io.BytesIO()
+        tile.save(buf, format=pil_format, **({"quality": 90} if pil_format == "JPEG" else {}))
+        tiles.append((buf.getvalue(), out_mime))
+    return tiles
+
+
+def _normalize(line: str) -> str:
+    return " ".join(line.split()).lower()
+
+
+def merge_overlap(text: str, following: str) -> str:
+    """Append ``following`` to ``text``, keeping what both read in their overlap once.
+
+    The longest run of identical lines between the end of ``text`` and the
+    start of ``following`` is the overlap. Lines of ``text`` after it and of
+    ``following`` before it are the partial lines at the cut and are dropped.
+    Only the last ``_SEAM_LINES`` lines of ``text`` can change.
+    """
+    lines = text.splitlines(keepends=True)
+    head = following.splitlines(keepends=True)
+    tail_start = max(0, len(lines) - _SEAM_LINES)
+    a = [_normalize(line) for line in lines[tail_start:]]
+    b = [_normalize(line) for line in head[:_SEAM_LINES]]
+    i, j, size = difflib.SequenceMatcher(None, a, b, autojunk=False).find_longest_match(0, len(a), 0, len(b))
+    if sum(len(line) for line in a[i:i + size]) < _MIN_SEAM_CHARS:
+        return f"{text}\n\n{following}" if text and following else text or following
+
+    kept = "".join(lines[:tail_start + i + size])
+    rest = "".join(head[j + size:])
+    if rest and not kept.endswith("\n"):
+        kept += "\n"
+    return kept + rest
+
+
+def stitch(texts: list[str]) -> str:
+    """Markdown of consecutive tiles, joined at their overlaps."""
+    merged = ""
+    for text in texts:
+        merged = merge_overlap(merged, text.strip())
+    return merged
+
+
+def _settled_length(text: str) -> int:
+    """Characters of ``text`` that merging more tiles can no longer change."""
+    lines = text.splitlines(keepends=True)
+    return sum(len(line) for line in lines[:max(0, len(lines) - _SEAM_LINES)])
+
+
+class TilingOcrProvider(OcrProvider):
+    """Wraps a provider so over-long images are OCR'd as concurrent, overlapping tiles."""
+
+    def __init__(self, inner: OcrProvider, model_id: str, options: dict):
+        self.inner = inner
+        self.model_id = model_id
+        self.options = options
+        self.extra_config = inner.extra_config
+
+    async def _split(self, image_data: Buffer, mime_type: str) -> list[tuple[bytes, str]] | None:
+        tiles = await asyncio.to_thread(split_image, image_data, mime_type, self.options)
+        if tiles:
+            logger.debug(f"Tiled image for {self.model_id} into {len(tiles)} tiles")
+        return tiles
+
+    def _start_tiles(self, tiles: list[tuple[bytes, str]], prompt: str) -> list[asyncio.Task]:
+        slots = asyncio.Semaphore(get_settings().tile_concurrency)
+
+        async def run(data: bytes, mime: str) -> OcrResult:
+            async with slots:
+                return await self.inner.process_image(data, mime, prompt)
+
+        return [asyncio.create_task(run(data, mime)) for data, mime in tiles]
+
+    async def process_image(self, image_data: bytes, mime_type: str, prompt: str = "") -> OcrResult:
+        start = time.time()
+        tiles = await self._split(image_data, mime_type)
+        if tiles is None:
+            return await self.inner.process_image(image_data, mime_type, prompt)
+
+        tasks = self._start_tiles(tiles, prompt)
+        try:
+            # The first failed tile fails the image, so the rest stop spending budget
+            for finished in asyncio.as_completed(tasks):
+                try:
+                    result = await finished
+                except Exception:
+                    break
+                if result.error:
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        latency = int((time.time() - start) * 1000)
+        errors = []
+        for idx, task in enumerate(tasks):
+            if task.cancelled():
+                continue
+            error = task.exception() or task.result().error
+            if error:
+                errors.append(f"Tile {idx + 1}: {error}")
+        if errors:
+            return OcrResult(text="", latency_ms=latency, error="; ".join(errors))
+        return OcrResult(text=stitch([strip_code_fences(t.result().text) for t in tasks]), latency_ms=latency)
+
+    async def process_image_stream(
+        self, image_data: bytes, mime_type: str, prompt: str = ""
+    ) -> AsyncGenerator[str, None]:
+        """Tiles run concurrently; text is streamed tile by tile, in order, once it is settled."""
+        tiles = await self._split(image_data, mime_type)
+        if tiles is None:
+            async for chunk in self.inner.process_image_stream(image_data, mime_type, prompt):
+                yield chunk
+            return
+
+        tasks = self._start_tiles(tiles, prompt)
+        try:
+            merged = ""
+            emitted = 0
+            for idx, task in enumerate(tasks):
+                result = await task
+                if result.error:
+                    raise RuntimeError(f"Tile {idx + 1}: {result.error}")
+                merged = merge_overlap(merged, strip_code_fences(result.text).strip())
+                settled = len(merged) if idx == len(tasks) - 1 else _settled_length(merged)
+                if settled > emitted:
+                    yield merged[emitted:settled]
+                    emitted = settled
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
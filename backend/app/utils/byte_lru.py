@@ -0,0 +1,114 @@
+"""LRU cache of byte strings bounded by entry count and total size.
+
+All operations are O(1) (expiry is O(log n) per expired entry): recency is an
+OrderedDict, the byte total is kept as a running sum, and expiry times sit in
+a min-heap that ``purge_expired`` pops from on a timer instead of scanning.
+"""
+import heapq
+import time
+from collections import OrderedDict
+
+
+class ByteLRUCache:
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[bytes, float | None]] = OrderedDict()
+        self._expiry: list[tuple[float, str]] = []  # may hold stale (expires_at, key) pairs
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return self._live(key) is not None
+
+    def _live(self, key: str) -> tuple[bytes, float | None] | None:
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.time():
+            self._remove(key)
+            self.expirations += 1
+            return None
+        return entry
+
+    def _remove(self, key: str) -> bytes:
+        value, _ = self._entries.pop(key)
+        self.bytes -= len(value)
+        return value
+
+    def get(self, key: str) -> bytes | None:
+        entry = self._live(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        if key in self._entries:
+            self._remove(key)
+        expires_at = time.time() + ttl if ttl else None
+        self._entries[key] = (value, expires_at)
+        self.bytes += len(value)
+        if expires_at is not None:
+            heapq.heappush(self._expiry, (expires_at, key))
+            self._compact_expiry()
+        while self._entries and (len(self._entries) > self.max_entries or self.bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def touch(self, key: str, ttl: float | None) -> bool:
+        """Reset the TTL of a live entry without counting a lookup. Returns False if absent."""
+        entry = self._live(key)
+        if entry is None:
+            return False
+        expires_at = time.time() + ttl if ttl else None
+        self._entries[key] = (entry[0], expires_at)
+        self._entries.move_to_end(key)
+        if expires_at is not None:
+            heapq.heappush(self._expiry, (expires_at, key))
+            self._compact_expiry()
+        return True
+
+    def pop(self, key: str) -> bytes | None:
+        if key not in self._entries:
+            return None
+        return self._remove(key)
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        purged = 0
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiry)
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == expires_at:
+                self._remove(key)
+                purged += 1
+        self.expirations += purged
+        return purged
+
+    def _compact_expiry(self) -> None:
+        # Drop heap items left behind by overwritten/evicted keys (amortized O(1))
+        if len(self._expiry) > 2 * len(self._entries) + 64:
+            self._expiry = [(exp, key) for key, (_, exp) in self._entries.items() if exp is not None]
+            heapq.heapify(self._expiry)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -16,7 +16,7 @@ def validate_file_content(data: bytes, claimed_extension: str) -> bool:
     if not data:
         return False
 
-    detected_mime = magic.from_buffer(data[:2048], mime=True)
+    detected_mime = magic.from_buffer(bytes(data[:2048]), mime=True)
     expected_mime = MIME_MAP.get(claimed_extension.lower())
 
     if not expected_mime:
@@ -4,6 +4,7 @@ MIME_MAP: dict[str, str] = {
     ".jpeg": "image/jpeg",
     ".webp": "image/webp",
     ".pdf": "application/pdf",
+    ".tif": "image/tiff",
     ".tiff": "image/tiff",
     ".bmp": "image/bmp",
 }
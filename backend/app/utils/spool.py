@@ -0,0 +1,93 @@
+"""Reading uploads without holding large files in RAM.
+
+Uploads are read in chunks while the size limit is enforced and the
+sha256 computed. Small files stay in memory as ``bytes``. Larger ones are
+spilled to an anonymous temp file (unlinked on creation, so it never
+has a name on disk and disappears with the last reference). They are
+returned as a read-only ``memoryview`` over an mmap of that file.
+
+Both are bytes-like. Providers base64-encode and hash them directly, and
+PDF rendering reads them through ``BufferReader``. Neither makes a copy.
+"""
+import asyncio
+import hashlib
+import io
+import mmap
+import tempfile
+
+from fastapi import UploadFile
+
+from app.config import get_settings
+
+Buffer = bytes | memoryview
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+async def spool_upload(file: UploadFile, max_size: int) -> tuple[Buffer, str]:
+    """Read an upload into memory or a memory-mapped temp file. Returns (data, sha256 hex)."""
+    settings = get_settings()
+    threshold = settings.upload_spool_threshold
+    digest = hashlib.sha256()
+    chunks: list[bytes] = []
+    size = 0
+    spill = None
+    try:
+        while chunk := await file.read(_CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_size:
+                raise UploadTooLarge(f"File exceeds {max_size} bytes")
+            digest.update(chunk)
+            if spill is None and size > threshold:
+                spill = tempfile.TemporaryFile(dir=settings.upload_spool_dir or None)
+                for buffered in chunks:
+                    await asyncio.to_thread(spill.write, buffered)
+                chunks.clear()
+            if spill is not None:
+                await asyncio.to_thread(spill.write, chunk)
+            else:
+                chunks.append(chunk)
+
+        if spill is None:
+            return b"".join(chunks), digest.hexdigest()
+        spill.flush()
+        # The mapping keeps its own handle on the (unlinked) file
+        return memoryview(mmap.mmap(spill.fileno(), 0, access=mmap.ACCESS_READ)), digest.hexdigest()
+    finally:
+        if spill is not None:
+            spill.close()
+
+
+class BufferReader(io.RawIOBase):
+    """Seekable read-only file object over a bytes-like buffer, without copying it."""
+
+    def __init__(self, data: Buffer):
+        self._view = memoryview(data)
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def readinto(self, buffer) -> int:
+        n = max(0, min(len(buffer), len(self._view) - self._pos))
+        buffer[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
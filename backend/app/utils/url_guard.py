@@ -0,0 +1,84 @@
+"""Private-address guard for user-supplied base URLs.
+
+Hostnames are resolved with the event loop's non-blocking getaddrinfo and
+the answers are cached for a short TTL, so validating a URL never stalls
+other requests (e.g. running battle streams) while DNS resolves.
+"""
+import asyncio
+import ipaddress
+import socket
+import time
+from urllib.parse import urlparse
+
+_POSITIVE_TTL = 300.0
+_NEGATIVE_TTL = 30.0
+_RESOLVE_TIMEOUT = 5.0
+_MAX_ENTRIES = 1024
+
+# hostname -> (expires_at, addresses); an empty tuple caches a failed lookup
+_cache: dict[str, tuple[float, tuple[str, ...]]] = {}
+_inflight: dict[str, asyncio.Future] = {}
+
+
+def _is_private_ip(ip: ipaddress.IPv4Address | ipaddress.IPv6Address) -> bool:
+    return ip.is_private or ip.is_loopback or ip.is_link_local
+
+
+async def _lookup(hostname: str) -> tuple[str, ...]:
+    loop = asyncio.get_running_loop()
+    try:
+        infos = await asyncio.wait_for(loop.getaddrinfo(hostname, None), _RESOLVE_TIMEOUT)
+    except (socket.gaierror, TimeoutError, UnicodeError):
+        return ()
+    return tuple(sorted({sockaddr[0] for _, _, _, _, sockaddr in infos}))
+
+
+async def resolve_host(hostname: str) -> tuple[str, ...]:
+    """Resolve a hostname to its IP addresses (cached; empty tuple if unresolvable)."""
+    now = time.monotonic()
+    cached = _cache.get(hostname)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    # Concurrent callers share one lookup
+    pending = _inflight.get(hostname)
+    if pending is not None:
+        return await asyncio.shield(pending)
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[hostname] = future
+    try:
+        addresses = await _lookup(hostname)
+        if len(_cache) >= _MAX_ENTRIES:
+            _cache.clear()
+        ttl = _POSITIVE_TTL if addresses else _NEGATIVE_TTL
+        _cache[hostname] = (time.monotonic() + ttl, addresses)
+        future.set_result(addresses)
+        return addresses
+    except BaseException as e:
+        future.set_exception(e)
+        future.exception()  # mark retrieved when nobody else is waiting
+        raise
+    finally:
+        del _inflight[hostname]
+
+
+async def is_private_url(url: str) -> bool:
+    """Check if a URL points at a private/loopback/link-local address.
+
+    Unparseable URLs and hostnames that fail to resolve count as private.
+    """
+    try:
+        hostname = urlparse(url).hostname
+    except ValueError:
+        return True
+    if not hostname:
+        return True
+    try:
+        return _is_private_ip(ipaddress.ip_address(hostname))
+    except ValueError:
+        pass
+    addresses = await resolve_host(hostname)
+    if not addresses:
+        return True  # DNS resolution failed — block
+    return any(_is_private_ip(ipaddress.ip_address(addr.split("%")[0])) for addr in addresses)
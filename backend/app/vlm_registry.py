@@ -5,7 +5,11 @@ When a user adds a model whose model_id matches a registry entry, the system
 suggests the recommended prompt and optional post-processing.
 
 All recommendations are opt-in: the user is asked whether to apply them,
-and can toggle them on/off later via model config.
+and can toggle them on/off later via model config. The exception is
+``image_profile``, which describes how the model's own image processor
+sizes its input. Images are downscaled to it automatically (see
+app/services/image_profiles.py) because the model would discard the
+extra pixels anyway.
 """
 
 from __future__ import annotations
@@ -21,6 +25,8 @@ VLM_REGISTRY: dict[str, dict] = {
             "Post-processing removes <｜end▁of▁sentence｜> tokens and normalizes newlines."
         ),
         "recommended_config": {"temperature": 0.0},
+        # Gundam mode: 1024 px global view + 640 px crops (~100 tokens each)
+        "image_profile": {"max_edge": 1920, "patch": 64, "base_tokens": 256},
         "match_patterns": [
             "deepseek-ocr",
             "deepseek-ai/deepseek-ocr",
@@ -39,6 +45,7 @@ VLM_REGISTRY: dict[str, dict] = {
             "Visual Causal Flow architecture."
         ),
         "recommended_config": {"temperature": 0.0},
+        "image_profile": {"max_edge": 1920, "patch": 64, "base_tokens": 256},
         "match_patterns": [
             "deepseek-ocr-2",
             "deepseek-ai/deepseek-ocr-2",
@@ -75,6 +82,8 @@ VLM_REGISTRY: dict[str, dict] = {
             "Alternative simple prompt: 'Extract the text content from this image.' (no post-processing needed)."
         ),
         "recommended_config": {"temperature": 0.0, "max_tokens": 24000},
+        # Qwen2-VL style: 14 px patches merged 2x2, capped by max_pixels
+        "image_profile": {"max_pixels": 11289600, "patch": 28},
         "match_patterns": [
             "dots.ocr",
             "dots-ocr",
@@ -93,6 +102,7 @@ VLM_REGISTRY: dict[str, dict] = {
             "'Spotting:'. Default task is OCR."
         ),
         "recommended_config": {"temperature": 0.0, "max_tokens": 512},
+        "image_profile": {"max_pixels": 2822400, "patch": 28},
         "match_patterns": [
             "paddleocr-vl",
             "paddlepaddle/paddleocr-vl",
@@ -110,6 +120,8 @@ VLM_REGISTRY: dict[str, dict] = {
             "Post-processing removes residual special tokens."
         ),
         "recommended_config": {"temperature": 0.0, "max_tokens": 2048},
+        # Trained on pages rendered with a 1540 px longest edge
+        "image_profile": {"max_edge": 1540, "patch": 28},
         "match_patterns": [
             "lightonocr",
             "lightonai/lightonocr",
@@ -134,6 +146,7 @@ VLM_REGISTRY: dict[str, dict] = {
         "postprocessor": None,
         "notes": "Nanonets OCR model. Rich structured output with HTML tables, LaTeX equations, and semantic tags.",
         "recommended_config": {"temperature": 0.0},
+        "image_profile": {"max_pixels": 12845056, "patch": 28},
         "match_patterns": [
             "nanonets",
             "nanonets-ocr",
@@ -188,4 +201,5 @@ def _clean_entry(key: str, entry: dict) -> dict:
         "postprocessor": entry.get("postprocessor"),
         "notes": entry["notes"],
         "recommended_config": entry.get("recommended_config", {}),
+        "image_profile": entry.get("image_profile"),
     }
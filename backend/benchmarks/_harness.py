@@ -0,0 +1,189 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks configure the app through environment variables, so call
+``configure_env()`` before anything under ``app`` is imported.
+"""
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import os
+import platform
+import socket
+import sys
+import tempfile
+import time
+import tomllib
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def configure_env(**overrides: str) -> str:
+    """Point the app at a throwaway SQLite database. Returns the temp dir."""
+    tmp_dir = tempfile.mkdtemp(prefix="docparse-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tmp_dir}/bench.db"
+    os.environ.setdefault("ADMIN_PASSWORD", "")
+    os.environ.setdefault("STORE_OCR_RESULTS", "true")
+    os.environ.setdefault("ENABLE_MOCK_PROVIDER", "true")
+    for key, value in overrides.items():
+        os.environ[key.upper()] = str(value)
+    return tmp_dir
+
+
+def percentile(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[idx], 2)
+
+
+def summarize(values: list[float]) -> dict:
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p99": percentile(values, 99),
+        "max": round(max(values), 2) if values else None,
+    }
+
+
+def rss_bytes() -> int:
+    """Current resident set size of this process."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+
+        # ru_maxrss is the peak, in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class LoopMonitor:
+    """Samples event-loop lag (scheduling delay of a periodic sleep) and RSS."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lag_ms: list[float] = []
+        self.rss_peak = 0
+        self._task: asyncio.Task | None = None
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lag_ms.append(max(0.0, (time.perf_counter() - expected) * 1000))
+            self.rss_peak = max(self.rss_peak, rss_bytes())
+
+    def start(self) -> None:
+        self.lag_ms.clear()
+        self.rss_peak = rss_bytes()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@asynccontextmanager
+async def serve_app():
+    """Run the FastAPI app with uvicorn on this event loop. Yields the base URL."""
+    import uvicorn
+
+    from app.main import app
+
+    port = _free_port()
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on")
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        await task
+
+
+async def seed_mock_models(count: int = 4, provider: str = "mock") -> None:
+    """Insert active models backed by the local mock provider."""
+    from app.models.database import OcrModel, async_session, init_db
+
+    await init_db()
+    async with async_session() as db:
+        for i in range(count):
+            db.add(OcrModel(
+                id=f"bench-{provider}-{i}",
+                name=f"bench-{provider}-{i}",
+                display_name=f"Bench {provider} {i}",
+                provider=provider,
+                model_id=f"{provider}-{i}",
+                is_active=True,
+            ))
+        await db.commit()
+
+
+def make_png(width: int = 1240, height: int = 1754) -> bytes:
+    """A synthetic page image with some text-like structure."""
+    from PIL import Image, ImageDraw
+
+    img = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(img)
+    for y in range(80, height - 80, 28):
+        draw.text((80, y), "Lorem ipsum dolor sit amet 0123456789 " * 3, fill=0)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def make_pdf(pages: int, width: int = 1240, height: int = 1754, scanned: bool = False) -> bytes:
+    """A synthetic multi-page PDF built from rasterized text pages.
+
+    ``scanned`` adds sensor-like noise so pages compress like real scans
+    (roughly 0.9 MB per page instead of a few KB).
+    """
+    from PIL import Image
+
+    page = Image.open(io.BytesIO(make_png(width, height))).convert("RGB")
+    if scanned:
+        noise = Image.effect_noise((width, height), 48).convert("RGB")
+        page = Image.blend(page, noise, 0.35)
+    buf = io.BytesIO()
+    page.save(buf, format="PDF", save_all=True, append_images=[page] * (pages - 1), resolution=150, quality=85)
+    return buf.getvalue()
+
+
+def metadata(**config) -> dict:
+    with open(os.path.join(BACKEND_DIR, "pyproject.toml"), "rb") as f:
+        version = tomllib.load(f)["project"]["version"]
+    return {
+        "version": version,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": config,
+    }
+
+
+def write_report(report: dict, output: str | None) -> None:
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    print(text)
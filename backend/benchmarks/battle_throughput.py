@@ -0,0 +1,186 @@
+"""End-to-end battle throughput benchmark.
+
+Drives /api/battle/start -> /stream -> /vote against the local mock provider
+at increasing concurrency, with uvicorn running in-process on a throwaway
+SQLite database. Prints (and optionally writes) a JSON report.
+
+    uv run python -m benchmarks.battle_throughput --concurrency 1,4,16 --battles 32
+    uv run python -m benchmarks.battle_throughput --pages 5 --output bench.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from benchmarks._harness import (
+    LoopMonitor,
+    configure_env,
+    make_pdf,
+    make_png,
+    metadata,
+    percentile,
+    seed_mock_models,
+    serve_app,
+    summarize,
+    write_report,
+)
+
+
+class SqliteWriteMonitor:
+    """Times write statements and counts lock errors via SQLAlchemy engine events."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.write_ms: list[float] = []
+        self.lock_errors = 0
+        sync_engine = engine.sync_engine
+        event.listen(sync_engine, "before_cursor_execute", self._before)
+        event.listen(sync_engine, "after_cursor_execute", self._after)
+        event.listen(sync_engine, "handle_error", self._error)
+
+    def reset(self) -> None:
+        self.write_ms.clear()
+        self.lock_errors = 0
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info["bench_start"] = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        start = conn.info.pop("bench_start", None)
+        if start is not None and statement.lstrip().upper().startswith(("INSERT", "UPDATE", "DELETE")):
+            self.write_ms.append((time.perf_counter() - start) * 1000)
+
+    def _error(self, context):
+        if "database is locked" in str(context.original_exception):
+            self.lock_errors += 1
+
+
+async def _run_battle(client, document: tuple[str, bytes, str]) -> dict:
+    filename, content, mime = document
+    t0 = time.perf_counter()
+    resp = await client.post("/api/battle/start", files={"file": (filename, content, mime)})
+    if resp.status_code != 200:
+        return {"error": f"start HTTP {resp.status_code}"}
+    battle_id = resp.json()["battle_id"]
+
+    ttft = None
+    stream_error = None
+    async with client.stream("GET", f"/api/battle/{battle_id}/stream") as stream:
+        if stream.status_code != 200:
+            return {"error": f"stream HTTP {stream.status_code}"}
+        event = ""
+        async for line in stream.aiter_lines():
+            if line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                if ttft is None and event.endswith("_token"):
+                    ttft = (time.perf_counter() - t0) * 1000
+                if event.endswith("_done") and "error" in json.loads(line[5:]):
+                    stream_error = "provider error"
+                elif event == "error":
+                    stream_error = "stream error"
+                elif event == "done":
+                    break
+
+    resp = await client.post(f"/api/battle/{battle_id}/vote", json={"winner": random.choice(["a", "b", "tie"])})
+    if resp.status_code != 200:
+        return {"error": f"vote HTTP {resp.status_code}"}
+    return {
+        "ttft_ms": ttft,
+        "latency_ms": (time.perf_counter() - t0) * 1000,
+        "error": stream_error,
+    }
+
+
+async def run_level(base_url: str, concurrency: int, battles: int, document, sqlite: SqliteWriteMonitor) -> dict:
+    import httpx
+
+    monitor = LoopMonitor()
+    sqlite.reset()
+    sem = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency * 2, max_keepalive_connections=concurrency * 2)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=None, limits=limits) as client:
+        async def one():
+            async with sem:
+                try:
+                    return await _run_battle(client, document)
+                except Exception as e:
+                    return {"error": type(e).__name__}
+
+        monitor.start()
+        t0 = time.perf_counter()
+        results = await asyncio.gather(*(one() for _ in range(battles)))
+        elapsed = time.perf_counter() - t0
+        await monitor.stop()
+
+    ok = [r for r in results if not r.get("error")]
+    return {
+        "concurrency": concurrency,
+        "battles": battles,
+        "errors": battles - len(ok),
+        "elapsed_s": round(elapsed, 3),
+        "battles_per_sec": round(len(ok) / elapsed, 3) if elapsed else None,
+        "ttft_ms": summarize([r["ttft_ms"] for r in ok if r.get("ttft_ms") is not None]),
+        "latency_ms": summarize([r["latency_ms"] for r in ok]),
+        "loop_lag_ms": summarize(monitor.lag_ms),
+        "rss_peak_mb": round(monitor.rss_peak / 1024 / 1024, 1),
+        "sqlite": {
+            "writes": len(sqlite.write_ms),
+            "write_ms_p50": percentile(sqlite.write_ms, 50),
+            "write_ms_p99": percentile(sqlite.write_ms, 99),
+            "lock_errors": sqlite.lock_errors,
+        },
+    }
+
+
+async def main(args: argparse.Namespace) -> dict:
+    from app.models.database import engine
+
+    await seed_mock_models(args.models)
+    sqlite = SqliteWriteMonitor(engine)
+    if args.pages > 1:
+        document = ("bench.pdf", make_pdf(args.pages), "application/pdf")
+    else:
+        document = ("bench.png", make_png(), "image/png")
+
+    levels = []
+    async with serve_app() as base_url:
+        for concurrency in args.concurrency:
+            level = await run_level(base_url, concurrency, max(args.battles, concurrency), document, sqlite)
+            levels.append(level)
+            print(
+                f"c={concurrency:<4} {level['battles_per_sec']} battles/s  "
+                f"ttft p50={level['ttft_ms']['p50']}ms  errors={level['errors']}",
+                flush=True,
+            )
+    await engine.dispose()
+    return {"benchmark": "battle_throughput", "meta": metadata(**vars(args)), "levels": levels}
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=lambda s: [int(x) for x in s.split(",")], default=[1, 4, 16, 32])
+    parser.add_argument("--battles", type=int, default=32, help="battles per concurrency level")
+    parser.add_argument("--models", type=int, default=4, help="number of mock models to seed")
+    parser.add_argument("--pages", type=int, default=1, help="upload a synthetic PDF with this many pages")
+    parser.add_argument("--ttft-ms", type=float, default=200.0)
+    parser.add_argument("--chunks", type=int, default=100)
+    parser.add_argument("--chunk-interval-ms", type=float, default=10.0)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    configure_env(
+        mock_ttft_ms=args.ttft_ms,
+        mock_chunk_count=args.chunks,
+        mock_chunk_interval_ms=args.chunk_interval_ms,
+    )
+    report = asyncio.run(main(args))
+    write_report(report, args.output)
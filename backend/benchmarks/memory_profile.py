@@ -0,0 +1,200 @@
+"""Memory profile of a single large-PDF battle.
+
+Runs one battle in-process (ASGI transport, local mock provider) under
+tracemalloc and reports, per pipeline stage, the peak and retained Python
+heap, both in MB and as "copies" of the uploaded document. The peak of each
+stage is broken down by pipeline component (upload/cache, render, provider
+encode, ...) so copy elimination can be measured.
+
+    uv run python -m benchmarks.memory_profile                       # 50-page scanned PDF
+    uv run python -m benchmarks.memory_profile --snapshot-dir snaps  # dump tracemalloc snapshots
+
+Snapshots can be compared with ``tracemalloc.Snapshot.load(path).compare_to(...)``.
+The run exits non-zero when a stage exceeds the copy budget in
+benchmarks/baselines/memory.json, so regressions in data copying fail fast;
+tests/test_memory_budget.py runs the same check under ``pytest -m slow``.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tracemalloc
+
+from benchmarks._harness import BACKEND_DIR, configure_env, make_pdf, metadata, seed_mock_models, write_report
+
+BUDGET_PATH = os.path.join(BACKEND_DIR, "benchmarks", "baselines", "memory.json")
+
+# Innermost app file in an allocation's traceback -> pipeline component
+_COMPONENTS = [
+    ("app/services/pdf_service.py", "render"),
+    ("app/ocr_providers/", "provider_encode"),
+    ("app/routers/battle.py", "upload_cache"),
+    ("app/routers/documents.py", "upload_cache"),
+    ("app/services/ocr_service.py", "ocr_pipeline"),
+    ("app/services/", "services"),
+    ("app/utils/", "utils"),
+]
+_MB = 1024 * 1024
+
+
+def _component(traceback: tracemalloc.Traceback) -> str:
+    for frame in reversed(traceback):
+        path = frame.filename.replace(os.sep, "/")
+        for marker, name in _COMPONENTS:
+            if marker in path:
+                return name
+    for frame in reversed(traceback):
+        # UploadFile.read() runs in a worker thread, so only the spool file shows up
+        if any(marker in frame.filename for marker in ("multipart", "starlette", "tempfile.py")):
+            return "upload_cache"
+    return "other"
+
+
+def breakdown(snapshot: tracemalloc.Snapshot, top: int = 5) -> dict:
+    """Group live allocations by pipeline component."""
+    components: dict[str, int] = {}
+    for stat in snapshot.statistics("traceback"):
+        name = _component(stat.traceback)
+        components[name] = components.get(name, 0) + stat.size
+    ordered = sorted(components.items(), key=lambda kv: kv[1], reverse=True)
+    return {name: round(size / _MB, 2) for name, size in ordered[:top]}
+
+
+class PeakSampler:
+    """Keeps the snapshot taken at the highest traced memory seen during a stage."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak_seen = 0
+        self.snapshot: tracemalloc.Snapshot | None = None
+        self._task: asyncio.Task | None = None
+
+    async def _run(self) -> None:
+        while True:
+            current, _ = tracemalloc.get_traced_memory()
+            if current > self.peak_seen * 1.02:
+                self.peak_seen = current
+                self.snapshot = tracemalloc.take_snapshot()
+            await asyncio.sleep(self.interval)
+
+    async def __aenter__(self):
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+
+async def profile_stage(name: str, coro_fn, doc_size: int, base: int, snapshot_dir: str | None) -> tuple[dict, object]:
+    tracemalloc.reset_peak()
+    async with PeakSampler() as sampler:
+        result = await coro_fn()
+    current, peak = tracemalloc.get_traced_memory()
+    if sampler.snapshot is None:
+        sampler.snapshot = tracemalloc.take_snapshot()
+    if snapshot_dir:
+        sampler.snapshot.dump(os.path.join(snapshot_dir, f"{name}.tracemalloc"))
+    stage = {
+        "peak_mb": round((peak - base) / _MB, 2),
+        "retained_mb": round((current - base) / _MB, 2),
+        "peak_copies": round((peak - base) / doc_size, 2),
+        "retained_copies": round((current - base) / doc_size, 2),
+        "peak_breakdown_mb": breakdown(sampler.snapshot),
+    }
+    return stage, result
+
+
+async def run(args: argparse.Namespace) -> dict:
+    import httpx
+
+    from app.main import app
+    from app.models.database import engine
+
+    await seed_mock_models(2)
+    pdf = make_pdf(args.pages, scanned=True)
+    doc_size = len(pdf)
+    if args.snapshot_dir:
+        os.makedirs(args.snapshot_dir, exist_ok=True)
+
+    transport = httpx.ASGITransport(app=app)
+    stages = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        tracemalloc.start(25)
+        base, _ = tracemalloc.get_traced_memory()
+
+        async def start():
+            resp = await client.post("/api/battle/start", files={"file": ("large.pdf", pdf, "application/pdf")})
+            resp.raise_for_status()
+            return resp.json()["battle_id"]
+
+        stages["start"], battle_id = await profile_stage("start", start, doc_size, base, args.snapshot_dir)
+
+        async def stream():
+            events = 0
+            async with client.stream("GET", f"/api/battle/{battle_id}/stream") as resp:
+                async for line in resp.aiter_lines():
+                    if line.startswith("event:"):
+                        events += 1
+                        if line.strip() == "event: done":
+                            break
+            return events
+
+        stages["stream"], _ = await profile_stage("stream", stream, doc_size, base, args.snapshot_dir)
+
+        async def vote():
+            resp = await client.post(f"/api/battle/{battle_id}/vote", json={"winner": "tie"})
+            resp.raise_for_status()
+
+        stages["vote"], _ = await profile_stage("vote", vote, doc_size, base, args.snapshot_dir)
+        tracemalloc.stop()
+
+    await engine.dispose()
+    return {"document_mb": round(doc_size / _MB, 2), "pages": args.pages, "stages": stages}
+
+
+def check_budget(report: dict, budget_path: str) -> list[str]:
+    if not os.path.exists(budget_path):
+        return []
+    with open(budget_path) as f:
+        budget = json.load(f)
+    if budget.get("pages") != report["pages"]:
+        print("Budget was calibrated for a different --pages; skipping check", file=sys.stderr)
+        return []
+    violations = []
+    for stage, limits in budget.get("stages", {}).items():
+        measured = report["stages"].get(stage)
+        if not measured:
+            continue
+        for key, limit in limits.items():
+            metric = key.removeprefix("max_")
+            if measured.get(metric, 0) > limit:
+                violations.append(f"{stage}.{metric}={measured[metric]} > {limit}")
+    return violations
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--snapshot-dir", help="dump the peak tracemalloc snapshot of each stage here")
+    parser.add_argument("--budget", default=BUDGET_PATH, help="JSON copy budget per stage")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    configure_env(mock_ttft_ms=5, mock_chunk_count=20, mock_chunk_interval_ms=1, max_pdf_pages=max(50, args.pages))
+    result = asyncio.run(run(args))
+    violations = check_budget(result, args.budget)
+    write_report(
+        {"benchmark": "memory_profile", "meta": metadata(**vars(args)), **result, "budget_violations": violations},
+        args.output,
+    )
+    for v in violations:
+        print(f"OVER BUDGET {v}", file=sys.stderr)
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
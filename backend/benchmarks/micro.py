@@ -0,0 +1,254 @@
+"""Microbenchmarks for CPU-bound helpers on synthetic large inputs.
+
+Covers every function in services/postprocessors.py, the stream fence
+stripper, sanitize_error and pdf_to_images. Results are compared against
+benchmarks/baselines/micro.json; the run exits non-zero when a case is slower
+than its baseline by more than --tolerance.
+
+    uv run python -m benchmarks.micro                      # compare to baseline
+    uv run python -m benchmarks.micro --only deepseek      # subset of cases
+    uv run python -m benchmarks.micro --update-baseline    # record new baseline
+
+Baselines store each case relative to a fixed pure-Python calibration loop
+timed in the same run, not absolute milliseconds, so a faster or slower
+machine shifts both sides of the comparison alike.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from collections.abc import Callable
+
+from benchmarks._harness import BACKEND_DIR, configure_env, make_pdf, metadata, write_report
+
+BASELINE_PATH = os.path.join(BACKEND_DIR, "benchmarks", "baselines", "micro.json")
+
+_LABELS = ["sub_title", "text", "table", "title", "header", "footer", "formula", "caption"]
+
+
+# ── Synthetic inputs ──────────────────────────────────────────
+
+def grounding_output(pages: int, seed: int = 0) -> str:
+    """DeepSeek-OCR style grounding output, ~40 labelled blocks per page."""
+    rng = random.Random(seed)
+    parts = []
+    for page in range(pages):
+        for block in range(40):
+            label = rng.choice(_LABELS)
+            x, y = rng.randint(0, 900), rng.randint(0, 1200)
+            parts.append(f"{label}[[{x}, {y}, {x + 80}, {y + 20}]]\n")
+            parts.append(f"Block {page}.{block} " + "lorem ipsum dolor sit amet " * rng.randint(1, 6))
+            parts.append("\n\n\n" if rng.random() < 0.3 else "\n\n")
+    return "".join(parts) + "<｜end▁of▁sentence｜>"
+
+
+def blank_line_text(pages: int) -> str:
+    """Plain text with long runs of blank lines (deepseek_clean's fallback path)."""
+    return ("Paragraph text here.\n" + "\n" * 12) * (pages * 40)
+
+
+def dots_layout_json(target_bytes: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    categories = ["Title", "Section-header", "Text", "List-item", "Formula",
+                  "Table", "Caption", "Footnote", "Page-header", "Picture"]
+    layout = []
+    size = 0
+    while size < target_bytes:
+        text = "word " * rng.randint(5, 60)
+        layout.append({"category": rng.choice(categories), "bbox": [1, 2, 300, 400], "text": text})
+        size += len(text) + 60
+    return json.dumps({"layout": layout})
+
+
+def fenced_markdown(n_bytes: int) -> str:
+    body = ("| a | b | c |\n|---|---|---|\n| 1 | 2 | 3 |\n\nSome **bold** text.\n") * (n_bytes // 60)
+    return f"```markdown\n{body}```"
+
+
+def token_chunks(n_bytes: int, chunk_size: int = 4) -> list[str]:
+    text = fenced_markdown(n_bytes)
+    return [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+
+
+def error_messages(count: int) -> list[Exception]:
+    msg = (
+        "Error code: 429 - Rate limit for sk-proj-abcdefghijklmnop1234567890 "
+        "Bearer eyJhbGciOiJIUzI1NiJ9.payload.sig at /app/backend/app/services/ocr_service.py "
+        "db /app/data/docparse_arena.db key-abcdef123456 AIzaSyA1234567890abcdefghij "
+    ) * 20
+    return [RuntimeError(f"{i} {msg}") for i in range(count)]
+
+
+# ── Cases ──────────────────────────────────────────
+
+Case = tuple[Callable[[], Callable[[], object]], int]
+
+
+def _bind(fn: Callable, *inputs: Callable[[], object]) -> Callable[[], Callable[[], object]]:
+    """Defer building a case's inputs until it is selected to run."""
+    return lambda: functools.partial(fn, *(build() for build in inputs))
+
+
+def build_cases(scale: float) -> dict[str, Case]:
+    """Return {name: (prepare, repeat)}.
+
+    ``prepare()`` builds the case's inputs (outside timing) and returns the
+    callable to time, so ``--only`` builds only the inputs it uses. Inputs
+    shared by several cases are built once.
+    """
+    from app.config import get_settings
+    from app.services import postprocessors as pp
+    from app.services.ocr_service import _strip_stream_fences
+    from app.services.pdf_service import pdf_to_images
+    from app.utils.error_sanitizer import sanitize_error
+
+    pages = max(1, int(200 * scale))
+    pdf_pages = max(1, int(50 * scale))
+    grounding = functools.cache(lambda: grounding_output(pages))
+    blanks = functools.cache(lambda: blank_line_text(pages))
+    layout = functools.cache(lambda: dots_layout_json(int(1024 * 1024 * scale)))
+    fenced = functools.cache(lambda: fenced_markdown(int(1024 * 1024 * scale)))
+    chunks = functools.cache(lambda: token_chunks(int(256 * 1024 * scale)))
+    errors = functools.cache(lambda: error_messages(max(1, int(2000 * scale))))
+    pdf = functools.cache(lambda: make_pdf(pdf_pages))
+    dpi = get_settings().pdf_dpi
+
+    def consume_stream(chunks: list[str]) -> list[str]:
+        async def gen():
+            for c in chunks:
+                yield c
+
+        async def consume():
+            return [c async for c in _strip_stream_fences(gen())]
+
+        return asyncio.run(consume())
+
+    return {
+        "strip_code_fences/1mb": (_bind(pp.strip_code_fences, fenced), 20),
+        "deepseek_clean/grounding": (_bind(pp.deepseek_clean, grounding), 5),
+        "deepseek_clean/blank_lines": (_bind(pp.deepseek_clean, blanks), 5),
+        "lighton_clean/grounding": (_bind(pp.lighton_clean, grounding), 20),
+        "dots_json_to_md/1mb": (_bind(pp.dots_json_to_md, layout), 10),
+        "apply_postprocessor/deepseek": (
+            _bind(functools.partial(pp.apply_postprocessor, "deepseek_clean"), grounding), 5,
+        ),
+        "list_postprocessors": (_bind(lambda: [pp.list_postprocessors() for _ in range(10000)]), 5),
+        "strip_stream_fences/256k_tokens": (_bind(consume_stream, chunks), 5),
+        "sanitize_error/2000": (_bind(lambda errs: [sanitize_error(e) for e in errs], errors), 5),
+        "pdf_to_images/50_pages": (
+            _bind(lambda data: pdf_to_images(data, dpi=dpi, max_pages=pdf_pages), pdf), 1,
+        ),
+    }
+
+
+def time_case(fn: Callable[[], object], repeat: int) -> dict:
+    if repeat > 1:
+        fn()  # warm-up (imports, caches)
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "min_ms": round(min(samples), 3),
+        "repeat": repeat,
+    }
+
+
+def _calibration_workload() -> None:
+    """Fixed mix of string, dict and sort work, the same on every version of the app."""
+    words = [f"w{i % 997}" for i in range(50_000)]
+    counts: dict[str, int] = {}
+    for w in words:
+        counts[w] = counts.get(w, 0) + 1
+    sorted(words)
+    " ".join(words).replace("w1", "x").split()
+
+
+def calibrate(repeat: int = 15) -> float:
+    """Fastest run of the calibration workload on this machine (least noisy)."""
+    return time_case(_calibration_workload, repeat)["min_ms"]
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, res in results.items():
+        base = baseline.get("cases", {}).get(name)
+        if not base or not base.get("relative"):
+            res["baseline_relative"] = None
+            continue
+        res["baseline_relative"] = base["relative"]
+        res["ratio"] = round(res["relative"] / base["relative"], 3)
+        if res["ratio"] > 1 + tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", help="run only cases whose name contains this substring")
+    parser.add_argument("--scale", type=float, default=1.0, help="input size multiplier (baseline uses 1.0)")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed slowdown vs baseline (0.3 = +30%%)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    configure_env()
+    cases = build_cases(args.scale)
+    calibration_ms = calibrate()
+    print(f"{'calibration':<36} {calibration_ms:>10.2f} ms", file=sys.stderr, flush=True)
+    results = {}
+    for name, (prepare, repeat) in cases.items():
+        if args.only and args.only not in name:
+            continue
+        results[name] = time_case(prepare(), repeat)
+        results[name]["relative"] = round(results[name]["median_ms"] / calibration_ms, 4)
+        print(f"{name:<36} {results[name]['median_ms']:>10.2f} ms", file=sys.stderr, flush=True)
+
+    if args.update_baseline:
+        baseline = {"scale": args.scale, "meta": metadata(scale=args.scale, calibration_ms=calibration_ms), "cases": {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline["cases"] = json.load(f).get("cases", {})
+        baseline["cases"].update({k: {"relative": v["relative"]} for k, v in results.items()})
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            f.write(json.dumps(baseline, indent=2) + "\n")
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+        regressions = []
+    else:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        if baseline and baseline.get("scale") != args.scale:
+            print("Baseline was recorded at a different --scale; skipping comparison", file=sys.stderr)
+            baseline = {}
+        regressions = compare(results, baseline, args.tolerance)
+
+    write_report(
+        {
+            "benchmark": "micro",
+            "meta": metadata(**vars(args)),
+            "calibration_ms": calibration_ms,
+            "cases": results,
+            "regressions": regressions,
+        },
+        args.output,
+    )
+    for name in regressions:
+        print(f"REGRESSION {name}: {results[name]['ratio']}x baseline", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Cold-start time and memory of a backend worker.
+
+Each sample is a fresh interpreter that imports ``app.main`` and runs the
+app lifespan (DB init, provider preload) the way a uvicorn worker would.
+It then reports wall time and RSS. The ``eager`` variant additionally
+imports every provider module. That is what startup cost before provider
+SDKs were loaded lazily, so the two rows show the gain.
+
+    uv run python -m benchmarks.startup                 # 5 runs per variant
+    uv run python -m benchmarks.startup --runs 10 --output startup.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks._harness import BACKEND_DIR, configure_env, metadata, write_report
+
+_CHILD = r"""
+import asyncio, json, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {backend_dir!r})
+from benchmarks._harness import rss_bytes
+import app.main
+if {eager!r}:
+    from app.services.ocr_service import PROVIDER_MAP, get_provider_class
+    for name in PROVIDER_MAP:
+        get_provider_class(name)
+t_import = time.perf_counter()
+
+async def boot():
+    async with app.main.lifespan(app.main.app):
+        pass
+
+asyncio.run(boot())
+t_ready = time.perf_counter()
+sdks = sorted({{m.split(".")[0] for m in sys.modules}} & {{"anthropic", "openai", "mistralai", "google"}})
+print(json.dumps({{
+    "import_ms": (t_import - t0) * 1000,
+    "ready_ms": (t_ready - t0) * 1000,
+    "rss_mb": rss_bytes() / 1024 / 1024,
+    "sdks": sdks,
+}}))
+"""
+
+
+def sample(eager: bool) -> dict:
+    code = _CHILD.format(backend_dir=BACKEND_DIR, eager=eager)
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=BACKEND_DIR, env=os.environ.copy(), capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run_variant(eager: bool, runs: int) -> dict:
+    samples = [sample(eager) for _ in range(runs)]
+    return {
+        "import_ms_median": round(statistics.median(s["import_ms"] for s in samples), 1),
+        "ready_ms_median": round(statistics.median(s["ready_ms"] for s in samples), 1),
+        "rss_mb_median": round(statistics.median(s["rss_mb"] for s in samples), 1),
+        "sdks_loaded": samples[0]["sdks"],
+    }
+
+
+def main(argv: list[str] | None = None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per variant")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    configure_env()
+    sample(eager=False)  # warm the OS file cache and create the database
+    variants = {"lazy": run_variant(False, args.runs), "eager": run_variant(True, args.runs)}
+    lazy, eager = variants["lazy"], variants["eager"]
+    report = {
+        "benchmark": "startup",
+        "meta": metadata(**vars(args)),
+        "variants": variants,
+        "saved": {
+            "ready_ms": round(eager["ready_ms_median"] - lazy["ready_ms_median"], 1),
+            "rss_mb": round(eager["rss_mb_median"] - lazy["rss_mb_median"], 1),
+        },
+    }
+    write_report(report, args.output)
+    return report
+
+
+if __name__ == "__main__":
+    main()
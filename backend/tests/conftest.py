@@ -0,0 +1,51 @@
+"""Shared test setup.
+
+The app reads its configuration from environment variables when settings are
+first loaded, so the throwaway environment is set before anything under
+``app`` is imported.
+"""
+import pytest
+
+from benchmarks._harness import configure_env
+
+configure_env()
+
+from app.config import get_settings  # noqa: E402
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    """Override settings for one test: ``settings(TILE_CONCURRENCY=2)``."""
+    def apply(**overrides):
+        for key, value in overrides.items():
+            monkeypatch.setenv(key.upper(), str(value))
+        get_settings.cache_clear()
+        return get_settings()
+
+    yield apply
+    monkeypatch.undo()
+    get_settings.cache_clear()
+
+
+class FakeClock:
+    """Stands in for the ``time`` module of code under test; advanced by hand."""
+
+    def __init__(self, start: float = 1000.0):
+        self.now = start
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    def perf_counter(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
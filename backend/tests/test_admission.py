@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.routers import battle
+from app.services import admission
+from app.services.admission import AdmissionController, AdmissionRejected
+
+
+def test_admits_then_queues_then_rejects():
+    controller = AdmissionController(max_inflight=1, max_queued=1, min_retry_after=3)
+    first = controller.enqueue("battle")
+    second = controller.enqueue("battle")
+    assert first.granted and first.position == 0
+    assert not second.granted and second.position == 1
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.enqueue("battle")
+    assert rejected.value.retry_after >= 3
+    assert controller.stats()["rejected"] == 1
+
+
+def test_release_grants_the_next_in_line():
+    controller = AdmissionController(max_inflight=1, max_queued=2)
+    first = controller.enqueue("battle")
+    second = controller.enqueue("upload", timed=False)
+    third = controller.enqueue("battle")
+    first.release()
+    assert second.granted and third.position == 1
+    assert controller.stats()["inflight_by_kind"] == {"battle": 0, "upload": 1}
+    # A released queued ticket leaves the queue without taking a slot
+    third.release()
+    assert controller.queued == 0
+    second.release()
+    second.release()  # idempotent
+    assert controller.inflight == 0
+
+
+def test_wait_turn_reports_positions_until_admitted():
+    async def run():
+        controller = AdmissionController(max_inflight=1, max_queued=2)
+        running = controller.enqueue("battle")
+        waiting = controller.enqueue("battle")
+        positions = []
+
+        async def wait():
+            async for position in waiting.wait_turn():
+                positions.append(position)
+
+        task = asyncio.create_task(wait())
+        await asyncio.sleep(0)
+        running.release()
+        await asyncio.wait_for(task, timeout=1)
+        return positions, waiting.granted
+
+    positions, granted = asyncio.run(run())
+    assert positions == [1]
+    assert granted
+
+
+def test_untimed_tickets_do_not_skew_retry_after():
+    controller = AdmissionController(max_inflight=1, max_queued=1)
+    before = controller.stats()["avg_job_seconds"]
+    controller.enqueue("upload", timed=False).release()
+    assert controller.stats()["avg_job_seconds"] == before
+
+
+def test_slot_releases_on_error():
+    async def run(controller):
+        with pytest.raises(RuntimeError):
+            async with controller.slot("playground"):
+                raise RuntimeError("boom")
+
+    controller = AdmissionController(max_inflight=1, max_queued=0)
+    asyncio.run(run(controller))
+    assert controller.inflight == 0
+
+
+def test_full_queue_is_a_429_with_retry_after(monkeypatch):
+    controller = AdmissionController(max_inflight=1, max_queued=0, min_retry_after=7)
+    monkeypatch.setattr(admission, "_controller", controller)
+    ticket = battle._reserve_slot("battle")
+    with pytest.raises(HTTPException) as rejected:
+        battle._reserve_slot("upload", timed=False)
+    assert rejected.value.status_code == 429
+    assert int(rejected.value.headers["Retry-After"]) >= 7
+    ticket.release()
+    battle._reserve_slot("upload", timed=False).release()
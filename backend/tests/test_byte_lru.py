@@ -0,0 +1,85 @@
+import pytest
+
+from app.utils import byte_lru
+from app.utils.byte_lru import ByteLRUCache
+
+
+@pytest.fixture(autouse=True)
+def fake_time(monkeypatch, clock):
+    monkeypatch.setattr(byte_lru, "time", clock)
+    return clock
+
+
+def test_evicts_least_recently_used_by_count():
+    cache = ByteLRUCache(max_entries=2, max_bytes=1000)
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    cache.get("a")
+    cache.put("c", b"3")
+    assert "b" not in cache
+    assert cache.get("a") == b"1" and cache.get("c") == b"3"
+    assert cache.evictions == 1
+
+
+def test_evicts_by_total_bytes():
+    cache = ByteLRUCache(max_entries=10, max_bytes=10)
+    cache.put("a", b"x" * 4)
+    cache.put("b", b"x" * 4)
+    cache.put("c", b"x" * 4)
+    assert "a" not in cache
+    assert cache.bytes == 8
+
+
+def test_oversized_value_is_not_kept():
+    cache = ByteLRUCache(max_entries=10, max_bytes=10)
+    cache.put("big", b"x" * 11)
+    assert len(cache) == 0 and cache.bytes == 0
+
+
+def test_overwrite_replaces_bytes():
+    cache = ByteLRUCache(max_entries=10, max_bytes=100)
+    cache.put("a", b"x" * 10)
+    cache.put("a", b"x" * 3)
+    assert cache.bytes == 3 and len(cache) == 1
+
+
+def test_entries_expire(clock):
+    cache = ByteLRUCache(max_entries=10, max_bytes=100)
+    cache.put("a", b"1", ttl=10)
+    cache.put("b", b"2")
+    clock.advance(10)
+    assert cache.get("a") is None
+    assert cache.get("b") == b"2"
+    assert cache.stats()["expirations"] == 1
+
+
+def test_purge_expired_skips_refreshed_entries(clock):
+    cache = ByteLRUCache(max_entries=10, max_bytes=100)
+    cache.put("a", b"1", ttl=10)
+    cache.put("b", b"2", ttl=10)
+    cache.put("b", b"2", ttl=60)  # leaves a stale heap item behind
+    clock.advance(11)
+    assert cache.purge_expired() == 1
+    assert "b" in cache and "a" not in cache
+
+
+def test_touch_extends_without_counting_a_lookup(clock):
+    cache = ByteLRUCache(max_entries=10, max_bytes=100)
+    cache.put("a", b"1", ttl=10)
+    clock.advance(8)
+    assert cache.touch("a", 10)
+    clock.advance(8)
+    assert cache.purge_expired() == 0
+    assert cache.get("a") == b"1"
+    assert (cache.hits, cache.misses) == (1, 0)
+    assert not cache.touch("missing", 10)
+
+
+def test_pop_and_stats():
+    cache = ByteLRUCache(max_entries=10, max_bytes=100)
+    cache.put("a", b"abc")
+    assert cache.pop("a") == b"abc"
+    assert cache.pop("a") is None
+    cache.get("a")
+    stats = cache.stats()
+    assert stats["bytes"] == 0 and stats["misses"] == 1 and stats["hit_rate"] == 0
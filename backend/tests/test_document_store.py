@@ -0,0 +1,81 @@
+import asyncio
+import hashlib
+
+import pytest
+
+from app.services import document_store, shared_state
+from app.services.document_store import get_document, is_valid_document, load_sample, release_upload, store_document
+from app.services.shared_state import MemoryStateBackend
+from app.utils import byte_lru
+from benchmarks._harness import make_png
+
+PNG = make_png(64, 64)
+SHA = hashlib.sha256(PNG).hexdigest()
+
+
+@pytest.fixture(autouse=True)
+def state(monkeypatch, clock):
+    backend = MemoryStateBackend(max_entries=100, max_bytes=10_000_000)
+    monkeypatch.setattr(shared_state, "_backend", backend)
+    monkeypatch.setattr(byte_lru, "time", clock)
+    return backend
+
+
+def test_same_content_is_stored_once():
+    async def run():
+        return await store_document(PNG, SHA), await store_document(PNG, SHA), await get_document(SHA)
+
+    assert asyncio.run(run()) == (True, False, PNG)
+
+
+def test_released_upload_is_kept_for_the_retention_period(settings, clock):
+    settings(UPLOAD_RETENTION_SECONDS=60)
+
+    async def run():
+        await store_document(PNG, SHA)
+        await release_upload(SHA)
+        clock.advance(59)
+        kept = await get_document(SHA)
+        clock.advance(2)
+        return kept, await get_document(SHA)
+
+    assert asyncio.run(run()) == (PNG, None)
+
+
+def test_zero_retention_deletes_on_release(settings):
+    settings(UPLOAD_RETENTION_SECONDS=0)
+
+    async def run():
+        await store_document(PNG, SHA)
+        await release_upload(SHA)
+        return await get_document(SHA)
+
+    assert asyncio.run(run()) is None
+
+
+def test_validation_is_cached_per_extension(monkeypatch):
+    checks = []
+    validate = document_store.validate_file_content
+
+    def counted(data, ext):
+        checks.append(ext)
+        return validate(data, ext)
+
+    monkeypatch.setattr(document_store, "validate_file_content", counted)
+
+    async def run():
+        return [await is_valid_document(PNG, SHA, ext) for ext in (".png", ".png", ".pdf")]
+
+    assert asyncio.run(run()) == [True, True, False]
+    assert checks == [".png", ".pdf"]
+
+
+def test_load_sample_reads_and_stores(tmp_path):
+    path = tmp_path / "sample.png"
+    path.write_bytes(PNG)
+
+    async def run():
+        return await load_sample(str(path)), await get_document(SHA)
+
+    (data, sha256), stored = asyncio.run(run())
+    assert (data, sha256, stored) == (PNG, SHA, PNG)
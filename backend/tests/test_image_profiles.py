@@ -0,0 +1,46 @@
+import pytest
+
+from app.services.image_profiles import PROVIDER_PROFILES, estimate_image, parse_image_profile, profile_for
+
+
+def test_fit_never_upscales():
+    claude = PROVIDER_PROFILES["claude"]
+    assert claude.fit(800, 600) == (800, 600)
+    width, height = claude.fit(4000, 3000)
+    assert max(width, height) <= 1568 and width * height <= 1_150_000
+
+
+@pytest.mark.parametrize("provider, size, tokens", [
+    ("claude", (1000, 750), 1000),
+    ("openai", (2048, 4096), 85 + 170 * 2 * 3),
+    ("gemini", (300, 300), 258),
+    ("gemini", (1600, 800), 258 * 3 * 2),
+    ("mistral", (1540, 28), 55),
+])
+def test_tokens(provider, size, tokens):
+    assert PROVIDER_PROFILES[provider].tokens(*size) == tokens
+
+
+def test_estimate_reports_resize_and_cost():
+    estimate = estimate_image(PROVIDER_PROFILES["openai"], 4096, 4096, usd_per_mtok=2.5)
+    assert estimate["resized"] == {"width": 768, "height": 768}
+    assert estimate["tokens"] == 85 + 170 * 4
+    assert estimate["cost_usd"] == pytest.approx(765 * 2.5 / 1_000_000, abs=1e-6)  # rounded to 6 places
+
+
+def test_config_override_beats_builtin_rules():
+    profile = profile_for("claude", "claude-sonnet", {"image_profile": {"max_edge": 1000, "patch": 14}})
+    assert profile.name == "custom" and profile.patch == 14
+    assert profile_for("custom", "unknown-model") is None
+
+
+@pytest.mark.parametrize("raw", ["big", {"max_edge": -1}, {"patch": True}, {"tile": 512}, {"max_edge": 1.5}])
+def test_parse_rejects_malformed_profiles(raw):
+    with pytest.raises(ValueError):
+        parse_image_profile(raw)
+
+
+def test_parse_defaults_patch():
+    assert parse_image_profile({"max_edge": 1024}).to_dict() == {
+        "name": "custom", "max_edge": 1024, "max_pixels": 0, "patch": 28, "base_tokens": 0,
+    }
@@ -0,0 +1,29 @@
+"""Copy budget of a large-PDF battle, enforced by benchmarks/memory_profile.py.
+
+The profile runs in its own interpreter: it configures the app through
+environment variables, which must happen before anything under ``app`` is
+imported. It takes a few minutes, so it is opt-in: ``pytest -m slow``.
+"""
+import json
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks._harness import BACKEND_DIR
+from benchmarks.memory_profile import BUDGET_PATH
+
+
+@pytest.mark.slow
+def test_battle_stays_within_copy_budget(tmp_path):
+    with open(BUDGET_PATH) as f:
+        pages = json.load(f)["pages"]
+    report_path = tmp_path / "memory.json"
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.memory_profile", "--pages", str(pages), "--output", str(report_path)],
+        cwd=BACKEND_DIR, capture_output=True, text=True, timeout=600,
+    )
+    assert report_path.exists(), proc.stderr[-2000:]
+    report = json.loads(report_path.read_text())
+    assert not report["budget_violations"], f"over copy budget: {report['stages']}"
+    assert proc.returncode == 0, proc.stderr[-2000:]
@@ -0,0 +1,80 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.models.database import ProviderSetting
+from app.services import model_catalog
+from app.services.model_catalog import get_model_catalog, invalidate_model_catalog
+
+
+class FakeUpstream:
+    """OpenAI-style /models endpoint that honours If-None-Match."""
+
+    def __init__(self):
+        self.models = ["gpt-4o", "gpt-4o-mini", "whisper-1"]
+        self.requests: list[httpx.Request] = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        etag = f'"{len(self.models)}"'
+        if request.headers.get("if-none-match") == etag:
+            return httpx.Response(304)
+        return httpx.Response(200, json={"data": [{"id": m} for m in self.models]}, headers={"etag": etag})
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    server = FakeUpstream()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(server.handle))
+    monkeypatch.setattr(model_catalog, "get_http_client", lambda: client)
+    monkeypatch.setattr(model_catalog, "_entries", {})
+    monkeypatch.setattr(model_catalog, "_refreshing", {})
+    return server
+
+
+def provider(api_key: str = "sk-test") -> ProviderSetting:
+    return ProviderSetting(id="openai", provider_type="openai", api_key=api_key, base_url="")
+
+
+def test_first_call_fetches_then_serves_from_cache(upstream):
+    async def run():
+        return await get_model_catalog(provider()), await get_model_catalog(provider())
+
+    first, second = asyncio.run(run())
+    assert first["models"] == ["gpt-4o", "gpt-4o-mini"]
+    assert not first["cached"] and second["cached"]
+    assert len(upstream.requests) == 1
+
+
+def test_refresh_revalidates_with_etag(upstream):
+    async def run():
+        await get_model_catalog(provider())
+        return await get_model_catalog(provider(), refresh=True)
+
+    result = asyncio.run(run())
+    assert result["models"] == ["gpt-4o", "gpt-4o-mini"]
+    assert upstream.requests[1].headers["if-none-match"] == '"3"'
+
+
+def test_changed_credentials_drop_the_entry(upstream):
+    async def run():
+        await get_model_catalog(provider("sk-old"))
+        upstream.models = ["gpt-5"]
+        return await get_model_catalog(provider("sk-new"))
+
+    result = asyncio.run(run())
+    assert result["models"] == ["gpt-5"] and not result["cached"]
+    assert "if-none-match" not in upstream.requests[1].headers
+
+
+def test_invalidate_and_static_catalogs(upstream):
+    async def run():
+        await get_model_catalog(provider())
+        invalidate_model_catalog("openai")
+        await get_model_catalog(provider())
+        static = ProviderSetting(id="pdf_text", provider_type="pdf_text")
+        return await get_model_catalog(static)
+
+    assert asyncio.run(run())["models"] == ["pdf-text"]
+    assert len(upstream.requests) == 2
@@ -0,0 +1,61 @@
+import asyncio
+
+from app.ocr_providers.pdf_text import PdfTextOcrProvider
+from benchmarks._harness import make_pdf, make_png
+
+
+def text_pdf(pages: list[list[tuple[int, int, str]]]) -> bytes:
+    """A PDF with a real text layer: per page, (font size, baseline y, text) lines in Helvetica."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", "", "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        ops = "".join(f"BT /F1 {size} Tf 72 {y} Td ({text}) Tj ET\n" for size, y, text in lines)
+        objects.append(f"<< /Length {len(ops)} >>\nstream\n{ops}endstream")
+        kids.append(len(objects) + 1)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {len(objects)} 0 R "
+            "/Resources << /Font << /F1 3 0 R >> >> >>"
+        )
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {len(kids)} >>"
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+
+REPORT = text_pdf([
+    [(24, 700, "Quarterly Report"), (11, 660, "Revenue grew by ten percent."), (11, 646, "Costs stayed flat.")],
+    [(11, 700, "- first point"), (11, 686, "- second point")],
+])
+
+
+def test_text_layer_as_markdown():
+    result = asyncio.run(PdfTextOcrProvider().process_image(REPORT, "application/pdf"))
+    assert result.error is None
+    assert result.text == (
+        "# Quarterly Report\n\nRevenue grew by ten percent. Costs stayed flat."
+        "\n\n---\n\n<!-- Page 2 -->\n\n- first point\n\n- second point"
+    )
+
+
+def test_stream_yields_one_chunk_per_page():
+    async def run():
+        return [chunk async for chunk in PdfTextOcrProvider().process_image_stream(REPORT, "application/pdf")]
+
+    chunks = asyncio.run(run())
+    assert len(chunks) == 2 and chunks[1].startswith("\n\n---\n\n<!-- Page 2 -->")
+
+
+def test_scanned_pdf_and_images_are_errors():
+    provider = PdfTextOcrProvider()
+    scanned = asyncio.run(provider.process_image(make_pdf(1, 200, 300), "application/pdf"))
+    assert scanned.error == "PDF has no text layer (scanned document?)"
+    image = asyncio.run(provider.process_image(make_png(50, 50), "image/png"))
+    assert "only reads PDF" in image.error
@@ -0,0 +1,62 @@
+import io
+
+import pytest
+from PIL import Image
+
+from app.services.image_profiles import PatchProfile
+from app.services.preprocessing import parse_preprocess_options, preprocess_image
+from benchmarks._harness import make_png
+
+PNG = make_png(400, 200)
+
+
+def size_of(data: bytes) -> tuple[int, int]:
+    return Image.open(io.BytesIO(data)).size
+
+
+def test_options_default_and_turn_off():
+    assert parse_preprocess_options(None) is None
+    assert parse_preprocess_options({"quality": 70}) is None  # nothing to do
+    assert parse_preprocess_options({"max_edge": 1024}) == {
+        "max_edge": 1024, "grayscale": False, "trim": False, "format": "", "quality": 85,
+    }
+
+
+@pytest.mark.parametrize("raw", [
+    [1], {"max_edge": True}, {"quality": True}, {"max_edge": -5}, {"format": "gif"},
+    {"format": "jpeg", "quality": 0}, {"resize": 1},
+])
+def test_options_reject_bad_values(raw):
+    with pytest.raises(ValueError):
+        parse_preprocess_options(raw)
+
+
+def test_image_that_fits_passes_through_untouched():
+    data, mime = preprocess_image(PNG, "image/png", None, PatchProfile("p", max_edge=1000))
+    assert data is PNG and mime == "image/png"
+
+
+def test_profile_fit_downscales():
+    data, mime = preprocess_image(PNG, "image/png", None, PatchProfile("p", max_edge=100))
+    assert size_of(data) == (100, 50) and mime == "image/png"
+
+
+def test_max_edge_and_format():
+    options = parse_preprocess_options({"max_edge": 200, "format": "jpeg", "quality": 80})
+    data, mime = preprocess_image(PNG, "image/png", options)
+    assert size_of(data) == (200, 100) and mime == "image/jpeg"
+
+
+def test_trim_crops_uniform_margins():
+    image = Image.new("RGB", (300, 300), "white")
+    image.paste((0, 0, 0), (100, 120, 150, 160))
+    buf = io.BytesIO()
+    image.save(buf, format="PNG")
+    data, _ = preprocess_image(buf.getvalue(), "image/png", parse_preprocess_options({"trim": True}))
+    assert size_of(data) == (50 + 16, 40 + 16)
+
+
+def test_undecodable_input_is_sent_as_is():
+    assert preprocess_image(b"not an image", "image/png", {"max_edge": 10, "grayscale": True}) == (
+        b"not an image", "image/png",
+    )
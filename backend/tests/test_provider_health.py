@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from app.models.database import init_db
+from app.services import provider_health
+from app.services.provider_health import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, ProviderHealth
+
+
+@pytest.fixture(autouse=True)
+def breaker_settings(settings, monkeypatch, clock):
+    settings(CIRCUIT_MIN_SAMPLES=3, CIRCUIT_ERROR_THRESHOLD=0.5, CIRCUIT_EWMA_ALPHA=0.2, CIRCUIT_OPEN_SECONDS=30)
+    monkeypatch.setattr(provider_health, "time", clock)
+
+
+def test_opens_after_min_samples_of_failures():
+    breaker = CircuitBreaker("p")
+    breaker.record(False, error="Error code: 503")
+    breaker.record(False, error="Error code: 503")
+    assert breaker.state == CLOSED  # too few samples to trust the rate
+    breaker.record(False, error="Error code: 503")
+    assert breaker.state == OPEN
+    assert breaker.last_error == "Error code: 503"
+
+
+def test_occasional_failures_keep_it_closed():
+    breaker = CircuitBreaker("p")
+    for ok in (True, True, False, True, True, False, True):
+        breaker.record(ok, latency_ms=100)
+    assert breaker.state == CLOSED
+    assert breaker.latency_ms == pytest.approx(100)
+
+
+def test_due_for_probe_after_cool_down(clock):
+    breaker = CircuitBreaker("p")
+    for _ in range(3):
+        breaker.record(False)
+    assert not breaker.due_for_probe()
+    clock.advance(30)
+    assert breaker.due_for_probe()
+
+
+def test_half_open_trial_call_decides():
+    breaker = CircuitBreaker("p")
+    breaker.state = HALF_OPEN
+    breaker.record(True)
+    assert breaker.state == CLOSED and breaker.samples == 0
+
+    breaker.state = HALF_OPEN
+    breaker.record(False, error="still down")
+    assert breaker.state == OPEN
+
+
+def test_open_circuits_are_unavailable_half_open_are_not():
+    health = ProviderHealth()
+    assert health.is_available("unknown")
+    for _ in range(3):
+        health.record("p", False)
+    assert not health.is_available("p")
+    health.breaker("p").state = HALF_OPEN
+    assert health.is_available("p")
+
+
+def test_check_results_close_or_reopen():
+    health = ProviderHealth()
+    for _ in range(3):
+        health.record("p", False)
+    health.record_check("p", True, "Connected (HTTP 200)")
+    assert health.breaker("p").state == CLOSED
+    assert health.stats()["p"]["last_probe"] == "Connected (HTTP 200)"
+    # A failed admin test does not open a healthy circuit
+    health.record_check("p", False, "Connection refused")
+    assert health.breaker("p").state == CLOSED
+
+
+def test_probe_without_provider_setting_stays_half_open(clock):
+    asyncio.run(init_db())
+    health = ProviderHealth()
+    for _ in range(3):
+        health.record("mock", False)
+    clock.advance(31)
+    asyncio.run(health.probe_open_circuits())
+    breaker = health.breaker("mock")
+    assert breaker.state == HALF_OPEN
+    assert "trial call" in breaker.last_probe
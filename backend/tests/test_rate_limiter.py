@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from app.services import rate_limiter
+from app.services.image_profiles import PROVIDER_PROFILES
+from app.services.rate_limiter import (
+    ProviderRateLimiter,
+    TokenBucket,
+    estimate_input_tokens,
+    expected_output_tokens,
+)
+from benchmarks._harness import make_pdf, make_png
+
+
+@pytest.fixture(autouse=True)
+def fake_time(monkeypatch, clock):
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    return clock
+
+
+def test_reserve_within_capacity_does_not_wait():
+    bucket = TokenBucket(60)
+    assert bucket.reserve(60) == 0.0
+    assert bucket.available() == 0
+
+
+def test_reserve_into_debt_waits_until_covered(clock):
+    bucket = TokenBucket(60)  # 1 token per second
+    bucket.reserve(60)
+    assert bucket.reserve(5) == pytest.approx(5.0)
+    # The next caller queues behind the debt
+    assert bucket.reserve(1) == pytest.approx(6.0)
+    clock.advance(6)
+    assert bucket.available() == pytest.approx(0.0)
+
+
+def test_refill_is_capped_at_capacity(clock):
+    bucket = TokenBucket(60)
+    bucket.reserve(30)
+    clock.advance(3600)
+    assert bucket.available() == 60
+
+
+def test_refund_returns_and_charges():
+    bucket = TokenBucket(100)
+    bucket.reserve(80)
+    bucket.refund(30)
+    assert bucket.available() == 50
+    bucket.refund(-20)  # used more than reserved
+    assert bucket.available() == 30
+    bucket.refund(500)
+    assert bucket.available() == 100
+
+
+def test_resize_keeps_fill_clamped():
+    bucket = TokenBucket(100)
+    bucket.reserve(40)
+    bucket.resize(200)
+    assert bucket.available() == 60
+    bucket.resize(10)
+    assert bucket.available() == 10
+    assert bucket.rate == pytest.approx(10 / 60)
+
+
+def test_acquire_caps_at_capacity_and_settles():
+    limiter = ProviderRateLimiter(rpm=0, tpm=1000)
+    reserved = asyncio.run(limiter.acquire(5000))
+    assert reserved == 1000
+    limiter.settle(reserved, 400)
+    assert limiter.usage()["tokens_available"] == 600
+    assert limiter.usage()["tokens_last_minute"] == 400
+
+
+def test_unlimited_limiter_only_meters():
+    limiter = ProviderRateLimiter()
+    assert not limiter.enabled
+    assert asyncio.run(limiter.acquire(123)) == 123
+    usage = limiter.usage()
+    assert usage["requests_last_minute"] == 1
+    assert usage["tokens_available"] is None
+
+
+def test_configure_resizes_existing_buckets():
+    limiter = ProviderRateLimiter(rpm=10, tpm=0)
+    bucket = limiter._requests
+    limiter.configure(20, 0)
+    assert limiter._requests is bucket
+    assert bucket.capacity == 20
+    limiter.configure(0, 0)
+    assert not limiter.enabled
+
+
+def test_image_estimate_follows_profile():
+    png = make_png(3000, 3000)
+    claude = PROVIDER_PROFILES["claude"]
+    tokens, pages = estimate_input_tokens(png, "image/png", "", claude)
+    assert pages == 1
+    assert tokens == claude.tokens(3000, 3000)
+
+
+def test_pdf_estimate_is_per_page():
+    pdf = make_pdf(3)
+    one, _ = estimate_input_tokens(make_pdf(1), "application/pdf", "")
+    three, pages = estimate_input_tokens(pdf, "application/pdf", "")
+    assert pages == 3
+    assert three == 3 * one
+
+
+def test_unreadable_input_falls_back_to_size():
+    assert estimate_input_tokens(b"x" * 4096, "image/png", "abcd" * 10) == (10 + 4, 1)
+
+
+def test_expected_output_tokens():
+    assert expected_output_tokens({"max_tokens": 500}, pages=4) == 500
+    assert expected_output_tokens({"max_completion_tokens": "700"}) == 700
+    assert expected_output_tokens({}, pages=3) == 3 * rate_limiter._DEFAULT_OUTPUT_TOKENS
+    assert expected_output_tokens({"max_tokens": "many"}) == rate_limiter._DEFAULT_OUTPUT_TOKENS
@@ -0,0 +1,73 @@
+import asyncio
+import io
+
+import pypdfium2 as pdfium
+import pytest
+from PIL import Image
+
+from app.services.regions import Region, _unrotate, check_region, extract_region, extract_region_sync, parse_region
+from benchmarks._harness import make_pdf, make_png
+
+
+def test_parse_region():
+    assert parse_region(None, None) is None
+    assert parse_region("", "0,0,1,1") is None  # whole document
+    region = parse_region("1-3, 5, 8-", "0,0.5,1,1")
+    assert region.pages == [(1, 3), (5, 5), (8, None)]
+    assert region.crop == (0, 0.5, 1, 1)
+    assert region.first_page == 1
+
+
+@pytest.mark.parametrize("pages, crop", [
+    ("0", None), ("3-1", None), ("a", None), ("1,,2", None),
+    (None, "0,0,1"), (None, "0.5,0,0.4,1"), (None, "0,0,1,1.2"), (None, "0,0,0.005,1"),
+])
+def test_parse_region_rejects(pages, crop):
+    with pytest.raises(ValueError):
+        parse_region(pages, crop)
+
+
+def test_page_indices():
+    region = parse_region("2-3,3,6-", None)
+    assert region.page_indices(7) == [1, 2, 5, 6]
+    with pytest.raises(ValueError, match="out of range"):
+        parse_region("9", None).page_indices(7)
+
+
+def test_round_trips_through_dict():
+    region = parse_region("2-4,7-", "0.1,0.2,0.9,0.8")
+    assert Region.from_dict(region.to_dict()).to_dict() == region.to_dict()
+
+
+@pytest.mark.parametrize("rotation, expected", [
+    (0, (0.1, 0.2, 0.5, 0.6)),
+    (90, (0.2, 0.5, 0.6, 0.9)),
+    (180, (0.5, 0.4, 0.9, 0.8)),
+    (270, (0.4, 0.1, 0.8, 0.5)),
+])
+def test_unrotate(rotation, expected):
+    assert _unrotate((0.1, 0.2, 0.5, 0.6), rotation) == pytest.approx(expected)
+
+
+def test_pdf_pages_and_cropbox():
+    data, mime = extract_region_sync(make_pdf(5, 200, 400), "application/pdf", parse_region("2,4-", "0,0.5,1,1"))
+    pdf = pdfium.PdfDocument(data)
+    assert mime == "application/pdf" and len(pdf) == 3
+    left, bottom, right, top = pdf[0].get_cropbox()
+    media_top = pdf[0].get_mediabox()[3]
+    assert (right - left) == pytest.approx(pdf[0].get_mediabox()[2])
+    assert (top - bottom) == pytest.approx(media_top / 2) and bottom == pytest.approx(0)
+    pdf.close()
+
+
+def test_image_crop_keeps_format():
+    data, mime = extract_region_sync(make_png(400, 200), "image/png", parse_region(None, "0.25,0,0.75,0.5"))
+    assert mime == "image/png"
+    assert Image.open(io.BytesIO(data)).size == (200, 100)
+
+
+def test_selection_limit_and_missing_region():
+    pdf = make_pdf(4, 100, 100)
+    with pytest.raises(ValueError, match="exceeding the maximum of 2"):
+        check_region(pdf, "application/pdf", parse_region("1-3", None), max_pages=2)
+    assert asyncio.run(extract_region(pdf, "application/pdf", None)) == (pdf, "application/pdf")
@@ -0,0 +1,65 @@
+import asyncio
+import os
+
+import pytest
+
+from app.models.schemas import OcrResult
+from app.ocr_providers.base import OcrProvider
+from app.ocr_providers.replay import RecordingOcrProvider, ReplayOcrProvider, replay_dir
+
+
+@pytest.fixture
+def recordings(settings, tmp_path):
+    settings(OCR_RECORDINGS_DIR=tmp_path, REPLAY_SPEED=0)
+    return os.path.realpath(tmp_path)
+
+
+class ScriptedProvider(OcrProvider):
+    def __init__(self, chunks: list[str], error: str | None = None):
+        self.extra_config = {}
+        self.chunks = chunks
+        self.error = error
+
+    async def process_image(self, image_data, mime_type, prompt=""):
+        return OcrResult(text="".join(self.chunks), latency_ms=5, error=self.error)
+
+    async def process_image_stream(self, image_data, mime_type, prompt=""):
+        for chunk in self.chunks:
+            yield chunk
+        if self.error:
+            raise RuntimeError(self.error)
+
+
+def test_replay_dir_stays_inside_the_recordings_root(recordings):
+    assert replay_dir() == recordings
+    assert replay_dir("nightly") == os.path.join(recordings, "nightly")
+    for escape in ("..", "../elsewhere", "/etc", "nightly/../../etc"):
+        with pytest.raises(ValueError):
+            replay_dir(escape)
+
+
+def test_recorded_stream_replays(recordings):
+    async def run():
+        recorder = RecordingOcrProvider(ScriptedProvider(["# Title", "\n\nBody"]), "gpt-4o", recordings)
+        recorded = [chunk async for chunk in recorder.process_image_stream(b"page", "image/png")]
+        replay = ReplayOcrProvider("gpt-4o")
+        replayed = [chunk async for chunk in replay.process_image_stream(b"page", "image/png")]
+        return recorded, replayed, await replay.process_image(b"page", "image/png")
+
+    recorded, replayed, result = asyncio.run(run())
+    assert replayed == recorded == ["# Title", "\n\nBody"]
+    assert result.text == "# Title\n\nBody" and result.error is None
+
+
+def test_recorded_errors_replay_as_errors(recordings):
+    async def run():
+        recorder = RecordingOcrProvider(ScriptedProvider([], error="HTTP 429"), "gpt-4o", recordings)
+        await recorder.process_image(b"page", "image/png")
+        return await ReplayOcrProvider("gpt-4o").process_image(b"page", "image/png")
+
+    assert asyncio.run(run()).error == "HTTP 429"
+
+
+def test_missing_recording(recordings):
+    result = asyncio.run(ReplayOcrProvider("gpt-4o").process_image(b"other", "image/png"))
+    assert "No recording" in result.error
@@ -0,0 +1,148 @@
+import asyncio
+
+import pytest
+
+from app.models.schemas import OcrResult
+from app.ocr_providers.base import OcrProvider
+from app.services import retry_policy
+from app.services.retry_policy import LatencyTracker, RetryingOcrProvider, backoff_delay, is_transient_error
+
+
+class HttpError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+
+
+class APIConnectionError(Exception):
+    pass
+
+
+@pytest.mark.parametrize("error", [
+    HttpError(429), HttpError(503), TimeoutError(), ConnectionResetError(), APIConnectionError("reset"),
+    "Error code: 529 - overloaded", "503 UNAVAILABLE", "upstream returned HTTP 502",
+])
+def test_transient_errors(error):
+    assert is_transient_error(error)
+
+
+@pytest.mark.parametrize("error", [
+    None, "", HttpError(400), HttpError(401), ValueError("bad image"),
+    "Error code: 400 - invalid", "image is 5030 px wide", "page 429 of the report",
+])
+def test_permanent_errors(error):
+    assert not is_transient_error(error)
+
+
+def test_status_code_wins_over_message():
+    # A 400 whose message happens to mention 503 is still a client error
+    error = HttpError(400)
+    error.args = ("HTTP 503 mentioned in a 400",)
+    assert not is_transient_error(error)
+
+
+def test_backoff_is_capped_and_jittered():
+    for attempt in range(10):
+        assert 0 <= backoff_delay(attempt, 500) <= retry_policy._MAX_BACKOFF_S
+    assert backoff_delay(0, 0) == 0
+
+
+def test_latency_tracker_p95():
+    tracker = LatencyTracker(window=100)
+    assert tracker.p95("m", min_samples=1) is None
+    for i in range(100):
+        tracker.record("m", i / 100)
+    assert tracker.p95("m", min_samples=200) is None
+    assert tracker.p95("m", min_samples=10) == pytest.approx(0.95)
+
+
+class FlakyProvider(OcrProvider):
+    def __init__(self, errors: list[str | None], chunks: tuple[str, ...] = ("a", "b")):
+        self.errors = list(errors)
+        self.chunks = chunks
+        self.calls = 0
+
+    async def process_image(self, image_data, mime_type, prompt=""):
+        self.calls += 1
+        error = self.errors.pop(0) if self.errors else None
+        return OcrResult(text="" if error else "".join(self.chunks), latency_ms=1, error=error)
+
+    async def process_image_stream(self, image_data, mime_type, prompt=""):
+        self.calls += 1
+        error = self.errors.pop(0) if self.errors else None
+        if error:
+            raise RuntimeError(error)
+        for chunk in self.chunks:
+            yield chunk
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(retry_policy, "backoff_delay", lambda attempt, base_ms: 0)
+
+
+def test_retries_transient_failures_until_success():
+    inner = FlakyProvider(["Error code: 503", "Error code: 429"])
+    result = asyncio.run(RetryingOcrProvider(inner, "m", max_retries=3).process_image(b"", "image/png"))
+    assert result.error is None and result.text == "ab"
+    assert inner.calls == 3
+
+
+def test_gives_up_after_max_retries():
+    inner = FlakyProvider(["Error code: 503"] * 5)
+    result = asyncio.run(RetryingOcrProvider(inner, "m", max_retries=2).process_image(b"", "image/png"))
+    assert result.error == "Error code: 503"
+    assert inner.calls == 3
+
+
+def test_does_not_retry_permanent_failures():
+    inner = FlakyProvider(["Error code: 400 - bad request"])
+    result = asyncio.run(RetryingOcrProvider(inner, "m", max_retries=3).process_image(b"", "image/png"))
+    assert result.error
+    assert inner.calls == 1
+
+
+def test_stream_retries_before_first_token():
+    inner = FlakyProvider(["HTTP 502"])
+
+    async def collect():
+        return [c async for c in RetryingOcrProvider(inner, "m", max_retries=1).process_image_stream(b"", "x")]
+
+    assert asyncio.run(collect()) == ["a", "b"]
+    assert inner.calls == 2
+
+
+class SlowThenFastProvider(OcrProvider):
+    """The first stream stalls before its first token; later ones answer at once."""
+
+    def __init__(self):
+        self.started = 0
+        self.closed = 0
+
+    async def process_image(self, image_data, mime_type, prompt=""):
+        raise NotImplementedError
+
+    async def process_image_stream(self, image_data, mime_type, prompt=""):
+        self.started += 1
+        try:
+            if self.started == 1:
+                await asyncio.sleep(10)
+            yield "fast"
+            yield " answer"
+        finally:
+            self.closed += 1
+
+
+def test_hedge_races_a_slow_stream(monkeypatch, settings):
+    settings(HEDGE_MIN_SAMPLES=1)
+    tracker = LatencyTracker()
+    tracker.record("hedged", 0.01)
+    monkeypatch.setattr(retry_policy, "_ttft", tracker)
+    inner = SlowThenFastProvider()
+
+    result = asyncio.run(asyncio.wait_for(
+        RetryingOcrProvider(inner, "hedged", hedge=True).process_image(b"", "image/png"), timeout=5,
+    ))
+    assert result.text == "fast answer"
+    assert inner.started == 2
+    assert inner.closed == 2  # the losing stream is closed, not leaked
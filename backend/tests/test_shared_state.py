@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from app.services import shared_state
+from app.services.shared_state import MemoryStateBackend, SqliteStateBackend
+from app.utils import byte_lru
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path, monkeypatch, clock):
+    monkeypatch.setattr(shared_state, "time", clock)
+    monkeypatch.setattr(byte_lru, "time", clock)
+    if request.param == "memory":
+        store = MemoryStateBackend(max_entries=10, max_bytes=1000)
+    else:
+        store = SqliteStateBackend(str(tmp_path / "state.db"))
+    yield store
+    store.close()
+
+
+def test_put_get_delete(backend):
+    async def run():
+        await backend.put("ns", "k", b"v")
+        assert await backend.get("ns", "k") == b"v"
+        assert await backend.get("other", "k") is None
+        await backend.delete("ns", "k")
+        return await backend.get("ns", "k")
+
+    assert asyncio.run(run()) is None
+
+
+def test_add_only_when_absent_or_expired(backend, clock):
+    async def run():
+        assert await backend.add("ns", "claim", b"1", ttl=10)
+        assert not await backend.add("ns", "claim", b"2", ttl=10)
+        clock.advance(11)
+        return await backend.add("ns", "claim", b"3", ttl=10)
+
+    assert asyncio.run(run())
+
+
+def test_ttl_touch_and_purge(backend, clock):
+    async def run():
+        await backend.put("ns", "a", b"1", ttl=10)
+        await backend.put("ns", "b", b"2", ttl=10)
+        clock.advance(8)
+        assert await backend.touch("ns", "a", 10)
+        assert not await backend.touch("ns", "missing", 10)
+        clock.advance(5)
+        assert await backend.get("ns", "b") is None
+        assert await backend.get("ns", "a") == b"1"
+        clock.advance(10)
+        await backend.purge_expired()
+        return await backend.get("ns", "a")
+
+    assert asyncio.run(run()) is None
+
+
+def test_setdefault_keeps_the_first_value(backend):
+    assert backend.setdefault("secret", "jwt", b"first") == b"first"
+    assert backend.setdefault("secret", "jwt", b"second") == b"first"
+
+
+def test_memory_namespaces_have_their_own_budget():
+    store = MemoryStateBackend(max_entries=10, max_bytes=100, limits={"preview": (1, 100)})
+
+    async def run():
+        await store.put("document", "a", b"x" * 50, ttl=60)
+        await store.put("preview", "p1", b"p", ttl=60)
+        await store.put("preview", "p2", b"p", ttl=60)
+        return await store.get("document", "a"), await store.get("preview", "p1"), await store.get("preview", "p2")
+
+    assert asyncio.run(run()) == (b"x" * 50, None, b"p")
@@ -0,0 +1,103 @@
+import asyncio
+import io
+
+import pytest
+from PIL import Image
+
+from app.models.schemas import OcrResult
+from app.ocr_providers.base import OcrProvider
+from app.services.tiling import TilingOcrProvider, _plan, merge_overlap, parse_tiling_options, split_image, stitch
+from benchmarks._harness import make_png
+
+DEFAULTS = parse_tiling_options(True)
+
+
+def test_options():
+    assert parse_tiling_options(None) is None
+    assert parse_tiling_options({"max_tiles": 4})["max_tiles"] == 4
+
+
+@pytest.mark.parametrize("raw", [
+    "yes", {"tiles": 3}, {"overlap": True}, {"overlap": 0.5}, {"tile_aspect": 3},
+    {"max_tiles": 1}, {"max_tiles": 4.0},
+])
+def test_options_reject_bad_values(raw):
+    with pytest.raises(ValueError):
+        parse_tiling_options(raw)
+
+
+def test_plan_covers_the_length_with_overlap():
+    spans = _plan(5000, 1000, DEFAULTS)
+    assert spans[0][0] == 0 and spans[-1][1] == 5000
+    for current, following in zip(spans, spans[1:]):
+        assert following[0] < current[1]  # overlapping
+    assert len(spans) == 4
+
+
+def test_plan_respects_max_tiles():
+    spans = _plan(100_000, 1000, {**DEFAULTS, "max_tiles": 3})
+    assert len(spans) == 3 and spans[-1][1] == 100_000
+
+
+def test_split_only_long_images():
+    assert split_image(make_png(400, 800), "image/png", DEFAULTS) is None
+    tiles = split_image(make_png(400, 2400), "image/png", DEFAULTS)
+    assert len(tiles) == len(_plan(2400, 400, DEFAULTS)) == 5
+    heights = [Image.open(io.BytesIO(data)).height for data, mime in tiles]
+    assert sum(heights) > 2400 and all(mime == "image/png" for _, mime in tiles)
+
+
+def test_merge_keeps_overlap_once_and_drops_cut_lines():
+    text = "Line one of the page\nLine two of the page\nLine three of the page\nLine fo"
+    following = "ne three of the pa\nLine three of the page\nLine four of the page"
+    assert merge_overlap(text, following) == (
+        "Line one of the page\nLine two of the page\nLine three of the page\nLine four of the page"
+    )
+
+
+def test_merge_without_overlap_joins_paragraphs():
+    assert merge_overlap("First tile text", "Second tile text") == "First tile text\n\nSecond tile text"
+    assert merge_overlap("", "Only") == "Only"
+    # short matches like a blank line or a rule are not treated as overlap
+    assert merge_overlap("Alpha\n---", "---\nBeta") == "Alpha\n---\n\n---\nBeta"
+
+
+def test_stitch():
+    assert stitch(["  A long enough line\nmore\n", "A long enough line\nmore\nnext  "]) == (
+        "A long enough line\nmore\nnext"
+    )
+
+
+class TileProvider(OcrProvider):
+    def __init__(self, fail_on: int | None = None):
+        self.extra_config = {}
+        self.calls = 0
+        self.fail_on = fail_on
+
+    async def process_image(self, image_data, mime_type, prompt=""):
+        self.calls += 1
+        call = self.calls
+        await asyncio.sleep(0.01 * call)
+        if call == self.fail_on:
+            return OcrResult(text="", latency_ms=1, error="HTTP 500")
+        return OcrResult(text=f"tile {call} has some text", latency_ms=1)
+
+    async def process_image_stream(self, image_data, mime_type, prompt=""):
+        yield (await self.process_image(image_data, mime_type, prompt)).text
+
+
+def test_failed_tile_fails_the_image_and_stops_the_rest(settings):
+    settings(TILE_CONCURRENCY=2)
+    inner = TileProvider(fail_on=1)
+    provider = TilingOcrProvider(inner, "m", {**DEFAULTS, "max_tiles": 8})
+    result = asyncio.run(provider.process_image(make_png(200, 4000), "image/png"))
+    assert result.error == "Tile 1: HTTP 500"
+    assert inner.calls < 8
+
+
+def test_tiles_are_stitched_in_order(settings):
+    settings(TILE_CONCURRENCY=5)
+    provider = TilingOcrProvider(TileProvider(), "m", DEFAULTS)
+    result = asyncio.run(provider.process_image(make_png(400, 2400), "image/png"))
+    assert result.error is None
+    assert result.text.split("\n\n") == [f"tile {i} has some text" for i in range(1, 6)]
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from app.utils import url_guard
+from app.utils.url_guard import is_private_url, resolve_host
+
+
+@pytest.fixture(autouse=True)
+def fake_dns(monkeypatch):
+    """Resolve from a table instead of the network, counting lookups."""
+    table = {"public.example": ("93.184.216.34",), "internal.example": ("10.0.0.5",)}
+    lookups = []
+
+    async def lookup(hostname):
+        lookups.append(hostname)
+        await asyncio.sleep(0)
+        return table.get(hostname, ())
+
+    monkeypatch.setattr(url_guard, "_lookup", lookup)
+    monkeypatch.setattr(url_guard, "_cache", {})
+    monkeypatch.setattr(url_guard, "_inflight", {})
+    return lookups
+
+
+@pytest.mark.parametrize("url, private", [
+    ("http://127.0.0.1:8000/v1", True),
+    ("http://[::1]/v1", True),
+    ("http://169.254.169.254/latest", True),
+    ("http://192.168.1.10/v1", True),
+    ("https://8.8.8.8/v1", False),
+    ("https://public.example/v1", False),
+    ("https://internal.example/v1", True),
+    ("https://unresolvable.example/v1", True),
+    ("not a url", True),
+    ("http://[bad/v1", True),
+])
+def test_is_private_url(url, private):
+    assert asyncio.run(is_private_url(url)) is private
+
+
+def test_lookups_are_cached(fake_dns):
+    async def run():
+        await resolve_host("public.example")
+        await resolve_host("public.example")
+
+    asyncio.run(run())
+    assert fake_dns == ["public.example"]
+
+
+def test_concurrent_callers_share_one_lookup(fake_dns):
+    async def run():
+        return await asyncio.gather(*(resolve_host("public.example") for _ in range(5)))
+
+    assert asyncio.run(run()) == [("93.184.216.34",)] * 5
+    assert fake_dns == ["public.example"]
@@ -40,6 +40,8 @@ export default function PlaygroundPage() {
   const [promptSource, setPromptSource] = useState<string>("builtin");
   const [loadingPrompt, setLoadingPrompt] = useState(false);
   const [temperature, setTemperature] = useState<string>("");
+  const [pages, setPages] = useState("");
+  const [crop, setCrop] = useState("");
 
   useEffect(() => {
     getModels().then((m) => {
@@ -80,6 +82,7 @@ export default function PlaygroundPage() {
         !uploadedFile ? selectedDoc || undefined : undefined,
         prompt || undefined,
         tempValue,
+        { pages: pages.trim() || undefined, crop: crop.trim() || undefined },
       );
       setResult(res);
     } catch (e) {
@@ -152,6 +155,26 @@ export default function PlaygroundPage() {
                   className="font-mono text-sm"
                 />
               </div>
+              <div className="grid grid-cols-2 gap-3">
+                <div className="space-y-2">
+                  <Label className="text-xs">Pages</Label>
+                  <Input
+                    value={pages}
+                    onChange={(e) => setPages(e.target.value)}
+                    placeholder="all (e.g. 1-3,5)"
+                    className="font-mono text-sm"
+                  />
+                </div>
+                <div className="space-y-2">
+                  <Label className="text-xs">Crop (x0,y0,x1,y1)</Label>
+                  <Input
+                    value={crop}
+                    onChange={(e) => setCrop(e.target.value)}
+                    placeholder="full page (e.g. 0,0.5,1,1)"
+                    className="font-mono text-sm"
+                  />
+                </div>
+              </div>
             </CardContent>
           </Card>
 
@@ -173,7 +196,7 @@ export default function PlaygroundPage() {
                   ref={fileInputRef}
                   type="file"
                   className="hidden"
-                  accept=".pdf,.jpg,.jpeg,.png,.webp,.tiff,.bmp"
+                  accept=".pdf,.jpg,.jpeg,.png,.webp,.tif,.tiff,.bmp"
                   onChange={(e) => {
                     const file = e.target.files?.[0];
                     if (file) {
@@ -16,6 +16,7 @@ import {
   streamBattle,
   voteBattle,
   getApiBase,
+  getRandomDocumentInfo,
   type VoteResponse,
 } from "@/lib/api";
 
@@ -23,6 +24,7 @@ interface BattleState {
   battleId: string | null;
   documentUrl: string | null;
   documentName: string | null;
+  documentPageCount: number | null;
   modelAText: string | null;
   modelBText: string | null;
   modelALatency: number | null;
@@ -36,6 +38,7 @@ interface BattleState {
   modelAStreamText: string;
   modelBStreamText: string;
   voteResult: VoteResponse | null;
+  queuePosition: number | null;
   isStarting: boolean;
   isVoting: boolean;
 }
@@ -44,6 +47,7 @@ const initialState: BattleState = {
   battleId: null,
   documentUrl: null,
   documentName: null,
+  documentPageCount: null,
   modelAText: null,
   modelBText: null,
   modelALatency: null,
@@ -57,6 +61,7 @@ const initialState: BattleState = {
   modelAStreamText: "",
   modelBStreamText: "",
   voteResult: null,
+  queuePosition: null,
   isStarting: false,
   isVoting: false,
 };
@@ -81,13 +86,14 @@ export default function BattleArena() {
     };
   }, []);
 
-  const handleStartBattle = useCallback(async (file?: File, documentName?: string) => {
+  const handleStartBattle = useCallback(async (file?: File, documentName?: string, pageCount?: number | null) => {
     setState({ ...initialState, isStarting: true });
 
     try {
       const response = await startBattle(file, documentName);
 
-      // Use local blob URL — files are NOT stored on the server
+      // Uploads are shown from a local blob URL; sample documents from the
+      // server-rendered page preview, so the full file never crosses the wire
       const docUrl = file
         ? URL.createObjectURL(file)
         : `${getApiBase()}${response.document_url}`;
@@ -97,6 +103,7 @@ export default function BattleArena() {
         battleId: response.battle_id,
         documentUrl: docUrl,
         documentName: documentName || file?.name || "Uploaded document",
+        documentPageCount: file ? null : pageCount ?? null,
         isStarting: false,
         modelALoading: true,
         modelBLoading: true,
@@ -104,12 +111,16 @@ export default function BattleArena() {
 
       eventSourceRef.current?.close();
       eventSourceRef.current = streamBattle(response.battle_id, (event, data: unknown) => {
-        const d = data as { text?: string; token?: string; latency_ms?: number; error?: string };
+        const d = data as { text?: string; token?: string; latency_ms?: number; error?: string; position?: number };
 
         switch (event) {
+          case "queue":
+            setState((prev) => ({ ...prev, queuePosition: d.position || null }));
+            break;
           case "model_a_token":
             setState((prev) => ({
               ...prev,
+              queuePosition: null,
               modelALoading: false,
               modelAStreaming: true,
               modelAStreamText: prev.modelAStreamText + (d.token || ""),
@@ -118,6 +129,7 @@ export default function BattleArena() {
           case "model_b_token":
             setState((prev) => ({
               ...prev,
+              queuePosition: null,
               modelBLoading: false,
               modelBStreaming: true,
               modelBStreamText: prev.modelBStreamText + (d.token || ""),
@@ -126,6 +138,7 @@ export default function BattleArena() {
           case "model_a_done":
             setState((prev) => ({
               ...prev,
+              queuePosition: null,
               modelAText: prev.modelAStreamText || null,
               modelALatency: d.latency_ms || null,
               modelAError: d.error || null,
@@ -136,6 +149,7 @@ export default function BattleArena() {
           case "model_b_done":
             setState((prev) => ({
               ...prev,
+              queuePosition: null,
               modelBText: prev.modelBStreamText || null,
               modelBLatency: d.latency_ms || null,
               modelBError: d.error || null,
@@ -196,18 +210,13 @@ export default function BattleArena() {
   const handleRandomDoc = useCallback(async () => {
     setState((prev) => ({ ...prev, isStarting: true }));
     try {
-      const res = await fetch(`${getApiBase()}/api/documents/random`);
-      if (!res.ok) {
-        throw new Error(
-          res.status === 404
-            ? "No sample documents available. Upload a file instead."
-            : `Server error (${res.status})`
-        );
+      let doc;
+      try {
+        doc = await getRandomDocumentInfo();
+      } catch {
+        throw new Error("No sample documents available. Upload a file instead.");
       }
-      const name = res.headers.get("X-Document-Name") || "random.png";
-      const blob = await res.blob();
-      const file = new File([blob], name, { type: blob.type });
-      await handleStartBattle(file);
+      await handleStartBattle(undefined, doc.name, doc.page_count);
     } catch (err) {
       toast.error("Failed to fetch random document", { description: err instanceof Error ? err.message : undefined });
       setState((prev) => ({ ...prev, isStarting: false }));
@@ -256,11 +265,21 @@ export default function BattleArena() {
 
   return (
     <div className="flex flex-col h-[calc(100vh-3.5rem)]">
+      {state.queuePosition !== null && (
+        <div className="px-4 py-1.5 text-center text-sm text-muted-foreground border-b">
+          Server is busy — waiting for a free slot (position {state.queuePosition} in queue)
+        </div>
+      )}
       <ResizablePanelGroup orientation="horizontal" className="flex-1 min-h-0 p-2">
         <ResizablePanel defaultSize={33} minSize={15}>
           <div className="relative h-full border rounded-lg overflow-hidden">
             {state.documentUrl ? (
-              <DocumentViewer imageUrl={state.documentUrl} documentName={state.documentName || undefined} />
+              <DocumentViewer
+                imageUrl={state.documentUrl}
+                documentName={state.documentName || undefined}
+                preview={!state.documentUrl.startsWith("blob:")}
+                pageCount={state.documentPageCount ?? undefined}
+              />
             ) : (
               <div className="flex items-center justify-center h-full">
                 <span className="text-sm text-muted-foreground">Loading document...</span>
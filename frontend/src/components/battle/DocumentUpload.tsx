@@ -72,7 +72,7 @@ export default function DocumentUpload({ onFileSelect, onRandomDoc, isLoading }:
           ref={inputRef}
           type="file"
           className="hidden"
-          accept=".pdf,.jpg,.jpeg,.png,.webp,.tiff,.bmp"
+          accept=".pdf,.jpg,.jpeg,.png,.webp,.tif,.tiff,.bmp"
           onChange={handleChange}
         />
       </div>
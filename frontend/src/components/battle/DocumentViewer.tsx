@@ -1,12 +1,16 @@
 "use client";
 
+import { useEffect, useState } from "react";
 import { TransformWrapper, TransformComponent } from "react-zoom-pan-pinch";
-import { ZoomIn, ZoomOut, RotateCcw } from "lucide-react";
+import { ZoomIn, ZoomOut, RotateCcw, ChevronLeft, ChevronRight } from "lucide-react";
 import { Button } from "@/components/ui/button";
 
 interface DocumentViewerProps {
   imageUrl: string;
   documentName?: string;
+  /** imageUrl is a server-rendered page preview (always an image, paged via &page=N) */
+  preview?: boolean;
+  pageCount?: number;
 }
 
 function isPdf(url: string, name?: string): boolean {
@@ -19,8 +23,13 @@ function isPdf(url: string, name?: string): boolean {
   }
 }
 
-export default function DocumentViewer({ imageUrl, documentName }: DocumentViewerProps) {
-  const pdf = isPdf(imageUrl, documentName);
+export default function DocumentViewer({ imageUrl, documentName, preview, pageCount }: DocumentViewerProps) {
+  const pdf = !preview && isPdf(imageUrl, documentName);
+  const [page, setPage] = useState(1);
+  const pages = preview ? pageCount ?? 1 : 1;
+  const src = preview && page > 1 ? `${imageUrl}&page=${page}` : imageUrl;
+
+  useEffect(() => setPage(1), [imageUrl]);
 
   return (
     <div className="flex flex-col h-full">
@@ -28,6 +37,19 @@ export default function DocumentViewer({ imageUrl, documentName }: DocumentViewe
         <span className="text-xs font-medium text-muted-foreground truncate px-2">
           {documentName || "Document"}
         </span>
+        {pages > 1 && (
+          <div className="flex items-center gap-1">
+            <Button variant="ghost" size="icon" className="h-6 w-6" disabled={page <= 1} onClick={() => setPage(page - 1)}>
+              <ChevronLeft className="h-3.5 w-3.5" />
+            </Button>
+            <span className="text-xs text-muted-foreground tabular-nums">
+              {page} / {pages}
+            </span>
+            <Button variant="ghost" size="icon" className="h-6 w-6" disabled={page >= pages} onClick={() => setPage(page + 1)}>
+              <ChevronRight className="h-3.5 w-3.5" />
+            </Button>
+          </div>
+        )}
       </div>
       <div className="flex-1 overflow-hidden bg-muted/10 relative">
         {pdf ? (
@@ -58,7 +80,7 @@ export default function DocumentViewer({ imageUrl, documentName }: DocumentViewe
                 <TransformComponent wrapperClass="!w-full !h-full" contentClass="!w-full !h-full flex items-center justify-center">
                   {/* eslint-disable-next-line @next/next/no-img-element */}
                   <img
-                    src={imageUrl}
+                    src={src}
                     alt="Document"
                     className="max-w-full max-h-full object-contain"
                   />
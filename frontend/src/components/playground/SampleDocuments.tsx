@@ -1,7 +1,7 @@
 "use client";
 
 import { useEffect, useState } from "react";
-import { listDocuments, getApiBase, type DocumentInfo } from "@/lib/api";
+import { listDocuments, documentPreviewUrl, type DocumentInfo } from "@/lib/api";
 import { FileImage } from "lucide-react";
 
 interface SampleDocumentsProps {
@@ -34,17 +34,17 @@ export default function SampleDocuments({ onSelect, selected }: SampleDocumentsP
             selected === doc.name ? "border-primary ring-1 ring-primary" : ""
           }`}
         >
-          <div className="aspect-[3/4] bg-muted/30 rounded flex items-center justify-center overflow-hidden">
-            {[".png", ".jpg", ".jpeg", ".webp", ".bmp"].includes(doc.extension) ? (
-              // eslint-disable-next-line @next/next/no-img-element
-              <img
-                src={`${getApiBase()}${doc.path}`}
-                alt={doc.name}
-                className="w-full h-full object-cover"
-              />
-            ) : (
-              <FileImage className="h-8 w-8 text-muted-foreground" />
-            )}
+          <div className="relative aspect-[3/4] bg-muted/30 rounded flex items-center justify-center overflow-hidden">
+            <FileImage className="h-8 w-8 text-muted-foreground absolute" />
+            {/* Server-rendered WebP thumbnail; the icon shows while it loads or if it fails */}
+            {/* eslint-disable-next-line @next/next/no-img-element */}
+            <img
+              src={documentPreviewUrl(doc.name)}
+              alt={doc.name}
+              loading="lazy"
+              className="relative w-full h-full object-cover"
+              onError={(e) => { e.currentTarget.style.display = "none"; }}
+            />
           </div>
           <p className="text-xs mt-1 truncate text-muted-foreground">{doc.name}</p>
         </button>
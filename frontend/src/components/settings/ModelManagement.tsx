@@ -56,10 +56,11 @@ import {
   WifiOff,
   Zap,
   Info,
+  RefreshCw,
 } from "lucide-react";
 import { cn } from "@/lib/utils";
 
-const BUILTIN_IDS = new Set(["claude", "openai", "gemini", "mistral", "ollama"]);
+const BUILTIN_IDS = new Set(["claude", "openai", "gemini", "mistral", "ollama", "pdf_text"]);
 
 const EMPTY_FORM: OcrModelCreate & { config: Record<string, unknown> } = {
   name: "",
@@ -134,11 +135,11 @@ export default function ModelManagement() {
     setConfigText(Object.keys(cfg).length > 0 ? JSON.stringify(cfg, null, 2) : "{}");
   };
 
-  const fetchProviderModels = useCallback(async (providerId: string) => {
+  const fetchProviderModels = useCallback(async (providerId: string, refresh = false) => {
     if (!providerId) return;
     setLoadingModels(true);
     try {
-      const modelIds = await getProviderModels(providerId);
+      const modelIds = await getProviderModels(providerId, refresh);
       setAvailableModels(modelIds);
     } catch {
       setAvailableModels([]);
@@ -430,7 +431,20 @@ export default function ModelManagement() {
             <div className="space-y-1.5">
               <Label className="text-xs flex items-center gap-2">
                 Model ID
-                {loadingModels && <Loader2 className="h-3 w-3 animate-spin" />}
+                {loadingModels ? (
+                  <Loader2 className="h-3 w-3 animate-spin" />
+                ) : (
+                  form.provider && (
+                    <button
+                      type="button"
+                      onClick={() => fetchProviderModels(form.provider, true)}
+                      className="text-muted-foreground hover:text-foreground"
+                      title="Refresh model list from provider"
+                    >
+                      <RefreshCw className="h-3 w-3" />
+                    </button>
+                  )
+                )}
               </Label>
               {availableModels.length > 0 ? (
                 <div className="space-y-1.5">
@@ -570,7 +584,10 @@ export default function ModelManagement() {
               />
               {configError && <p className="text-[11px] text-destructive">{configError}</p>}
               <p className="text-[11px] text-muted-foreground">
-                Additional API call parameters as JSON. e.g. max_completion_tokens, temperature
+                Additional API call parameters as JSON. e.g. max_completion_tokens, temperature.
+                Add &quot;preprocess&quot; (max_edge, grayscale, trim, format, quality) to shrink images before upload.
+                &quot;native_pdf&quot;: true sends PDFs whole in one request instead of page by page (off by default).
+                &quot;tiling&quot;: true splits very tall or wide images into overlapping tiles read in parallel.
               </p>
             </div>
           </div>
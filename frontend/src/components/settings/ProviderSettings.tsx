@@ -8,8 +8,12 @@ import {
   updateProvider,
   deleteProvider,
   testProvider,
-  testAllProviders,
+  testAllProvidersStream,
+  getProviderUsage,
+  getProviderHealth,
   type ProviderSetting,
+  type ProviderUsage,
+  type ProviderHealth,
 } from "@/lib/api";
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from "@/components/ui/card";
 import { Button } from "@/components/ui/button";
@@ -36,7 +40,7 @@ import {
   Zap,
 } from "lucide-react";
 
-const BUILTIN_IDS = new Set(["claude", "openai", "gemini", "mistral", "ollama"]);
+const BUILTIN_IDS = new Set(["claude", "openai", "gemini", "mistral", "ollama", "pdf_text"]);
 
 export default function ProviderSettings() {
   const [providers, setProviders] = useState<ProviderSetting[]>([]);
@@ -47,6 +51,8 @@ export default function ProviderSettings() {
   const [testing, setTesting] = useState<string | null>(null);
   const [testResults, setTestResults] = useState<Record<string, { ok: boolean; message: string }>>({});
   const [testingAll, setTestingAll] = useState(false);
+  const [usage, setUsage] = useState<Record<string, ProviderUsage>>({});
+  const [health, setHealth] = useState<Record<string, ProviderHealth>>({});
 
   const [addDialogOpen, setAddDialogOpen] = useState(false);
   const [newProvider, setNewProvider] = useState({ display_name: "", base_url: "", api_key: "" });
@@ -61,6 +67,17 @@ export default function ProviderSettings() {
 
   useEffect(() => { loadProviders(); }, [loadProviders]);
 
+  // Rate-limit usage and circuit state change with live traffic, so refresh them periodically
+  useEffect(() => {
+    const load = () => {
+      getProviderUsage().then(setUsage).catch(() => {});
+      getProviderHealth().then(setHealth).catch(() => {});
+    };
+    load();
+    const timer = setInterval(load, 5000);
+    return () => clearInterval(timer);
+  }, []);
+
   const handleSave = async (id: string) => {
     const changes = edits[id];
     if (!changes) return;
@@ -80,7 +97,7 @@ export default function ProviderSettings() {
     setSaving(null);
   };
 
-  const setEdit = (id: string, field: string, value: string | boolean) => {
+  const setEdit = (id: string, field: string, value: string | boolean | number) => {
     setEdits((prev) => ({
       ...prev,
       [id]: { ...prev[id], [field]: value },
@@ -110,12 +127,10 @@ export default function ProviderSettings() {
   const handleTestAll = async () => {
     setTestingAll(true);
     try {
-      const result = await testAllProviders();
-      const newResults: Record<string, { ok: boolean; message: string }> = {};
-      for (const r of result.results) {
-        newResults[r.provider_id] = { ok: r.ok, message: r.message };
-      }
-      setTestResults(newResults);
+      setTestResults({});
+      const result = await testAllProvidersStream((r) => {
+        setTestResults((prev) => ({ ...prev, [r.provider_id]: { ok: r.ok, message: r.message } }));
+      });
       if (result.total_disabled.length > 0) {
         toast.warning(`Disabled models:\n${result.total_disabled.join(", ")}`);
       }
@@ -158,6 +173,7 @@ export default function ProviderSettings() {
 
   const isUrlBased = (p: ProviderSetting) =>
     p.provider_type === "ollama" || p.provider_type === "custom";
+  const isKeyless = (p: ProviderSetting) => p.provider_type === "pdf_text";
 
   if (loading) return <div className="text-center py-8 text-muted-foreground">Loading providers...</div>;
 
@@ -205,6 +221,16 @@ export default function ProviderSettings() {
                 )}
               </div>
               <div className="flex items-center gap-2">
+                {health[provider.id] && health[provider.id].state !== "closed" && (
+                  <Badge
+                    variant="destructive"
+                    className="text-[10px] shrink-0"
+                    title={health[provider.id].last_error || health[provider.id].last_probe}
+                  >
+                    {health[provider.id].state === "open" ? "Circuit open" : "Probing"}
+                    {" · "}{Math.round(health[provider.id].error_rate * 100)}% errors
+                  </Badge>
+                )}
                 {testResults[provider.id] && (
                   <Badge variant={testResults[provider.id].ok ? "default" : "destructive"} className="text-[10px] gap-1 shrink-0">
                     {testResults[provider.id].ok ? <Wifi className="h-3 w-3" /> : <WifiOff className="h-3 w-3" />}
@@ -228,30 +254,32 @@ export default function ProviderSettings() {
             </div>
           </CardHeader>
           <CardContent className="space-y-3">
-            <div className="space-y-1.5">
-              <Label className="text-xs">API Key</Label>
-              <div className="flex gap-2">
-                <div className="relative flex-1">
-                  <Input
-                    type={showKeys[provider.id] ? "text" : "password"}
-                    value={(getValue(provider, "api_key") as string) || ""}
-                    onChange={(e) => setEdit(provider.id, "api_key", e.target.value)}
-                    placeholder={provider.provider_type === "ollama" ? "(not required)" : "Enter API key..."}
-                    className="pr-10 font-mono text-sm"
-                  />
-                  <Button
-                    variant="ghost"
-                    size="icon"
-                    className="absolute right-0 top-0 h-full w-9"
-                    onClick={() =>
-                      setShowKeys((prev) => ({ ...prev, [provider.id]: !prev[provider.id] }))
-                    }
-                  >
-                    {showKeys[provider.id] ? <EyeOff className="h-3.5 w-3.5" /> : <Eye className="h-3.5 w-3.5" />}
-                  </Button>
+            {!isKeyless(provider) && (
+              <div className="space-y-1.5">
+                <Label className="text-xs">API Key</Label>
+                <div className="flex gap-2">
+                  <div className="relative flex-1">
+                    <Input
+                      type={showKeys[provider.id] ? "text" : "password"}
+                      value={(getValue(provider, "api_key") as string) || ""}
+                      onChange={(e) => setEdit(provider.id, "api_key", e.target.value)}
+                      placeholder={provider.provider_type === "ollama" ? "(not required)" : "Enter API key..."}
+                      className="pr-10 font-mono text-sm"
+                    />
+                    <Button
+                      variant="ghost"
+                      size="icon"
+                      className="absolute right-0 top-0 h-full w-9"
+                      onClick={() =>
+                        setShowKeys((prev) => ({ ...prev, [provider.id]: !prev[provider.id] }))
+                      }
+                    >
+                      {showKeys[provider.id] ? <EyeOff className="h-3.5 w-3.5" /> : <Eye className="h-3.5 w-3.5" />}
+                    </Button>
+                  </div>
                 </div>
               </div>
-            </div>
+            )}
 
             {isUrlBased(provider) && (
               <div className="space-y-1.5">
@@ -265,6 +293,72 @@ export default function ProviderSettings() {
               </div>
             )}
 
+            <div className="grid grid-cols-2 gap-3">
+              <div className="space-y-1.5">
+                <Label className="text-xs">Requests / min</Label>
+                <Input
+                  type="number"
+                  min={0}
+                  value={(getValue(provider, "rpm_limit") as number) ?? 0}
+                  onChange={(e) => setEdit(provider.id, "rpm_limit", Math.max(0, parseInt(e.target.value) || 0))}
+                  className="font-mono text-sm"
+                />
+              </div>
+              <div className="space-y-1.5">
+                <Label className="text-xs">Tokens / min</Label>
+                <Input
+                  type="number"
+                  min={0}
+                  value={(getValue(provider, "tpm_limit") as number) ?? 0}
+                  onChange={(e) => setEdit(provider.id, "tpm_limit", Math.max(0, parseInt(e.target.value) || 0))}
+                  className="font-mono text-sm"
+                />
+              </div>
+            </div>
+            <div className="grid grid-cols-3 gap-3 items-end">
+              <div className="space-y-1.5">
+                <Label className="text-xs">Retries</Label>
+                <Input
+                  type="number"
+                  min={0}
+                  max={10}
+                  value={(getValue(provider, "max_retries") as number) ?? 0}
+                  onChange={(e) => setEdit(provider.id, "max_retries", Math.min(10, Math.max(0, parseInt(e.target.value) || 0)))}
+                  className="font-mono text-sm"
+                />
+              </div>
+              <div className="space-y-1.5">
+                <Label className="text-xs">Backoff (ms)</Label>
+                <Input
+                  type="number"
+                  min={0}
+                  value={(getValue(provider, "retry_backoff_ms") as number) ?? 0}
+                  onChange={(e) => setEdit(provider.id, "retry_backoff_ms", Math.max(0, parseInt(e.target.value) || 0))}
+                  className="font-mono text-sm"
+                />
+              </div>
+              <div className="flex items-center gap-2 h-9">
+                <Switch
+                  checked={getValue(provider, "hedge_requests") as boolean}
+                  onCheckedChange={(v) => setEdit(provider.id, "hedge_requests", v)}
+                />
+                <Label className="text-xs">Hedge slow requests</Label>
+              </div>
+            </div>
+
+            <p className="text-[11px] text-muted-foreground">
+              0 = unlimited. Requests over the limit wait for capacity instead of failing.
+              {usage[provider.id] && (
+                <>
+                  {" "}Last minute: {usage[provider.id].requests_last_minute}
+                  {usage[provider.id].rpm_limit ? ` / ${usage[provider.id].rpm_limit}` : ""} requests,{" "}
+                  {usage[provider.id].tokens_last_minute.toLocaleString()}
+                  {usage[provider.id].tpm_limit ? ` / ${usage[provider.id].tpm_limit.toLocaleString()}` : ""} tokens
+                  {usage[provider.id].waiting > 0 && `, ${usage[provider.id].waiting} waiting`}
+                </>
+              )}
+            </p>
+
             {edits[provider.id] && (
               <div className="flex justify-end">
                 <Button
@@ -113,6 +113,10 @@ export interface DocumentInfo {
   name: string;
   path: string;
   extension: string;
+  mime: string;
+  size: number;
+  page_count: number | null;
+  sha256: string | null;
 }
 
 export interface PlaygroundResponse {
@@ -128,9 +132,15 @@ export interface ResolvedPrompt {
   default_prompt: string;
 }
 
+/** Region-of-interest OCR: only these pages / this part of each page is sent to the models. */
+export interface DocumentRegion {
+  pages?: string; // e.g. "1-3,5" or "10-"
+  crop?: string; // "x0,y0,x1,y1" as fractions of the page, from the top-left corner
+}
+
 // ── Public API ──────────────────────────────────────────
 
-export async function startBattle(file?: File, documentName?: string): Promise<BattleStartResponse> {
+export async function startBattle(file?: File, documentName?: string, region?: DocumentRegion): Promise<BattleStartResponse> {
   const formData = new FormData();
   if (file) {
     formData.append("file", file);
@@ -143,8 +153,15 @@ export async function startBattle(file?: File, documentName?: string): Promise<B
   if (documentName && !file) {
     params.set("document_name", documentName);
   }
+  if (region?.pages) {
+    params.set("pages", region.pages);
+  }
+  if (region?.crop) {
+    params.set("crop", region.crop);
+  }
+  const query = params.toString();
 
-  const res = await fetch(`${API_BASE}/api/battle/start${!file && documentName ? `?document_name=${encodeURIComponent(documentName)}` : ""}`, {
+  const res = await fetch(`${API_BASE}/api/battle/start${query ? `?${query}` : ""}`, {
     method: "POST",
     body: file ? formData : undefined,
   });
@@ -164,6 +181,7 @@ export function streamBattle(battleId: string, onEvent: (event: string, data: un
     currentEs = es;
 
     const events = [
+      "queue",
       "model_a_token", "model_b_token",
       "model_a_done", "model_b_done",
       "model_a_replace", "model_b_replace",
@@ -232,8 +250,25 @@ export async function getRandomDocument(): Promise<{ url: string; name: string }
   return { url, name };
 }
 
-export async function listDocuments(): Promise<DocumentInfo[]> {
-  const res = await fetch(`${API_BASE}/api/documents/list`);
+export async function getRandomDocumentInfo(): Promise<DocumentInfo> {
+  const res = await fetch(`${API_BASE}/api/documents/random/info`);
+  if (!res.ok) throw new Error(await res.text());
+  return res.json();
+}
+
+export function documentPreviewUrl(name: string, size: "thumb" | "preview" = "thumb", page = 1): string {
+  return `${API_BASE}/api/documents/preview/${encodeURIComponent(name)}?size=${size}&page=${page}`;
+}
+
+export async function listDocuments(
+  params: { q?: string; extension?: string; offset?: number; limit?: number } = {},
+): Promise<DocumentInfo[]> {
+  const query = new URLSearchParams();
+  for (const [key, value] of Object.entries(params)) {
+    if (value !== undefined && value !== "") query.set(key, String(value));
+  }
+  const qs = query.toString();
+  const res = await fetch(`${API_BASE}/api/documents/list${qs ? `?${qs}` : ""}`);
   if (!res.ok) throw new Error(await res.text());
   const data = await res.json();
   return data.documents;
@@ -257,6 +292,7 @@ export async function runPlaygroundOcr(
   documentName?: string,
   prompt?: string,
   temperature?: number,
+  region?: DocumentRegion,
 ): Promise<PlaygroundResponse> {
   const formData = new FormData();
   formData.append("model_id", modelId);
@@ -272,6 +308,12 @@ export async function runPlaygroundOcr(
   if (temperature !== undefined && temperature !== null) {
     formData.append("temperature", String(temperature));
   }
+  if (region?.pages) {
+    formData.append("pages", region.pages);
+  }
+  if (region?.crop) {
+    formData.append("crop", region.crop);
+  }
   const res = await fetch(`${API_BASE}/api/playground/ocr`, {
     method: "POST",
     body: formData,
@@ -297,6 +339,33 @@ export interface ProviderSetting {
   api_key: string;
   base_url: string;
   is_enabled: boolean;
+  rpm_limit: number;
+  tpm_limit: number;
+  max_retries: number;
+  retry_backoff_ms: number;
+  hedge_requests: boolean;
+}
+
+export interface ProviderUsage {
+  rpm_limit: number;
+  tpm_limit: number;
+  requests_last_minute: number;
+  tokens_last_minute: number;
+  requests_available: number | null;
+  tokens_available: number | null;
+  waiting: number;
+  throttled: number;
+  total_wait_s: number;
+}
+
+export interface ProviderHealth {
+  state: "closed" | "open" | "half_open";
+  error_rate: number;
+  latency_ms: number | null;
+  samples: number;
+  consecutive_failures: number;
+  last_error: string;
+  last_probe: string;
 }
 
 export interface ProviderSettingCreate {
@@ -313,14 +382,16 @@ export interface ProviderTestResult {
   disabled_models: string[];
 }
 
+export interface ProviderTestAllItem {
+  provider_id: string;
+  display_name: string;
+  ok: boolean;
+  message: string;
+  disabled_models: string[];
+}
+
 export interface TestAllResult {
-  results: {
-    provider_id: string;
-    display_name: string;
-    ok: boolean;
-    message: string;
-    disabled_models: string[];
-  }[];
+  results: ProviderTestAllItem[];
   total_disabled: string[];
 }
 
@@ -381,6 +452,18 @@ export async function updateProvider(id: string, data: Partial<ProviderSetting>)
   return res.json();
 }
 
+export async function getProviderUsage(): Promise<Record<string, ProviderUsage>> {
+  const res = await adminFetch(`${API_BASE}/api/admin/providers/usage`);
+  if (!res.ok) throw new Error(await res.text());
+  return res.json();
+}
+
+export async function getProviderHealth(): Promise<Record<string, ProviderHealth>> {
+  const res = await adminFetch(`${API_BASE}/api/admin/providers/health`);
+  if (!res.ok) throw new Error(await res.text());
+  return res.json();
+}
+
 export async function deleteProvider(id: string): Promise<void> {
   const res = await adminFetch(`${API_BASE}/api/admin/providers/${id}`, {
     method: "DELETE",
@@ -404,8 +487,44 @@ export async function testAllProviders(): Promise<TestAllResult> {
   return res.json();
 }
 
-export async function getProviderModels(providerId: string): Promise<string[]> {
-  const res = await adminFetch(`${API_BASE}/api/admin/providers/${providerId}/models`);
+/** Test all providers concurrently; `onResult` fires as each provider finishes. */
+export async function testAllProvidersStream(
+  onResult: (result: ProviderTestAllItem) => void,
+): Promise<TestAllResult> {
+  const res = await adminFetch(`${API_BASE}/api/admin/providers/test-all/stream`, {
+    method: "POST",
+  });
+  if (!res.ok || !res.body) throw new Error(await res.text());
+
+  const results: ProviderTestAllItem[] = [];
+  let totalDisabled: string[] = [];
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (value) buffer += decoder.decode(value, { stream: true });
+    let nl: number;
+    while ((nl = buffer.indexOf("\n")) >= 0) {
+      const line = buffer.slice(0, nl).trim();
+      buffer = buffer.slice(nl + 1);
+      if (!line) continue;
+      const item = JSON.parse(line);
+      if (item.done) {
+        totalDisabled = item.total_disabled;
+      } else {
+        results.push(item);
+        onResult(item);
+      }
+    }
+    if (done) break;
+  }
+  return { results, total_disabled: totalDisabled };
+}
+
+export async function getProviderModels(providerId: string, refresh = false): Promise<string[]> {
+  const query = refresh ? "?refresh=true" : "";
+  const res = await adminFetch(`${API_BASE}/api/admin/providers/${providerId}/models${query}`);
   if (!res.ok) return [];
   const data = await res.json();
   return data.models || [];
@@ -469,6 +588,7 @@ export interface RegistryEntry {
   postprocessor: string | null;
   notes: string;
   recommended_config: Record<string, unknown>;
+  image_profile: { max_edge?: number; max_pixels?: number; patch?: number; base_tokens?: number } | null;
 }
 
 export async function getRegistry(): Promise<RegistryEntry[]> {